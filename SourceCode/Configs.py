@@ -1,6 +1,6 @@
 # Global Script Configuration Values
 
-# Input data file name
+# Input data file name - may be a glob pattern (several files, e.g. 'US_Accidents_*.csv.gz') & compressed (.gz, .bz2, .zst - decompressed as a stream)
 inputFileName = 'US_Accidents.csv'
 
 # Input data file path
@@ -9,8 +9,146 @@ inputFilePath = '../Resources/'
 # Output data file path
 outputFilePath = '../Output/'
 
+# Output path of the analyses results (json & csv files)
+metricsFilePath = '../Output/Metrics/'
+
+# Years of data analysed: from - to (rows of other years are removed)
+yearFrom = 2017
+yearTo = 2018
+
+# Run report: measures of each stage of a run (wall & CPU time, rows in & out, peak RSS increase) appended as JSON lines (off by default: the file grows with each run; --run-report)
+runReportEnabled = False
+runReportFile = '../Output/Metrics/RunReport.jsonl'
+
+# Path of the profiles of the runs with --profile (cProfile stats files)
+profileFilePath = '../Output/Metrics/'
+
 # Number of years of data
-numOfYears = 2
+numOfYears = yearTo - yearFrom + 1
+
+# Format of Start_Time values in the input file (parsed once to derive the date columns)
+startTimeFormat = '%Y-%m-%d %H:%M:%S'
+
+# Severity weights (by severity 0 - 4) for the weighted severity index
+severityWeightsList = [10, 20, 40, 80, 160]
+
+# Number of weather conditions kept in the accidents cube (others are added up as 1 bucket)
+weatherTopN = 20
+
+# Drill-down analyses (County, City, Zipcode): number of keys in the results & charts (top N by count & by weighted severity index)
+drillDownTopN = 20
+
+# Drill-down analyses: minimum number of accidents of a key to be ranked by weighted severity index
+drillDownMinCount = 100
+
+# Columns that must have a value for a row to be analysed (rows with na/null in any of these columns are removed)
+requiredColumnsList = ['ID', 'State', 'Start_Time', 'Start_Lat', 'Start_Lng', 'Timezone', 'Weather_Condition', 'Sunrise_Sunset']
+
+# Columns used by the analysis functions
+analysisColumnsList = ['Severity', 'State', 'Timezone', 'Weather_Condition', 'Start_Time', 'County', 'City', 'Zipcode']
+
+# Typed ingest: parse only the required & analysis columns with compact data types (False = parse all columns as is)
+typedIngest = True
+
+# Data types used for the input columns in typed ingest
+inputColumnsDtypeDict = {"ID" : "object", 
+                        "Severity" : "int8", 
+                        "Start_Time" : "object", 
+                        "Start_Lat" : "float32", 
+                        "Start_Lng" : "float32", 
+                        "State" : "category", 
+                        "Timezone" : "category", 
+                        "Weather_Condition" : "category", 
+                        "Sunrise_Sunset" : "category", 
+                        "County" : "category", 
+                        "City" : "category", 
+                        "Zipcode" : "category"}
+
+# Streaming mode: read & process the input file in chunks of rows (memory stays bounded by the chunk size)
+streamingMode = False
+
+# Number of rows per chunk in streaming mode
+streamingChunkSize = 500000
+
+# Pipelined mode: read, clean up & aggregate the chunks at the same time (1 thread per stage) - number of chunks waiting between 2 stages (at most)
+pipelineQueueSize = 2
+
+# Dataframe backend of the pipeline (ingest, clean up, date columns & aggregation) without the cache: 'pandas', 'polars' or 'pyarrow' (optional packages)
+dataframeBackend = 'pandas'
+
+# Approximate mode (--approximate): the input is streamed once into fixed size sketches - preview charts with error bounds, no exact counts
+# Count-min sketches (counts by key): over-estimate by at most sketchErrorRate x rows, with a probability of sketchConfidence
+sketchErrorRate = 0.001
+sketchConfidence = 0.99
+
+# Space-Saving (top weather conditions & cities): number of counters kept
+sketchTopCounters = 200
+
+# HyperLogLog (distinct cities & zipcodes): 2^sketchHllPrecision registers (standard error: 1.04 / sqrt(registers))
+sketchHllPrecision = 12
+
+# Rows sampled per state (reservoir) for the average severity
+sketchReservoirSize = 1000
+
+# Fraction of the input file read in approximate mode (< 1 = a random sample of sketchSampleBlocks blocks of lines, counts scaled up; 1 = all rows, as much work as the exact streaming mode)
+sketchSampleFraction = 0.1
+sketchSampleBlocks = 100
+
+# Number of processes to read several input files at the same time (0 = 1 per CPU core)
+inputFileProcesses = 0
+
+# Number of processes to parse the input file (1 = read as a whole; >1 = the file is split into shards of lines parsed in parallel)
+parseProcesses = 1
+
+# Minimum size of a shard of the input file parsed by 1 process (in MB)
+parseShardMinMB = 16
+
+# Cache: save the cleaned data (with date columns) as column files, reloaded while the input file & clean up settings are unchanged
+useCache = True
+
+# Cache file path
+cacheFilePath = '../Cache/'
+
+# Columns the cached data is partitioned by (1 directory per year, or per year & month) - only the partitions of the years analysed are loaded
+cachePartitionColumnsList = ['Year']
+
+# Results cache: the results & charts of each analysis are memoized - reused while the data analysed, the analysis settings & the code are unchanged
+useResultsCache = True
+
+# Results cache file path (least recently used analyses removed over the maximum size, in MB)
+resultsCacheFilePath = '../ResultsCache/'
+resultsCacheMaxMB = 256
+
+# Incremental mode: process only the input files / rows added since the last run - merged into the saved running aggregates
+incrementalMode = False
+
+# Input files processed in incremental mode along with the input file(s) above: files dropped next to it, named like it with a suffix (e.g. monthly drops US_Accidents_2019_01.csv)
+# Derived from the input file name - other copies of the input file (e.g. US_Accidents.csv.gz) are not matched, their rows would be counted again
+incrementalInputPattern = inputFilePath + inputFileName.replace('.', '_*.', 1)
+
+# State of incremental mode: running aggregates (accidents cube) & manifest of the input processed
+stateFilePath = '../State/'
+
+# Number of processes to plot the charts (1 = one after another)
+renderProcesses = 1
+
+# Benchmarks: path of the generated data files & benchmark results
+benchmarkFilePath = '../Benchmarks/'
+
+# Benchmarks: sizes (numbers of rows) of the generated data files benchmarked by default
+benchmarkSizesList = ['100k', '1M', '5M', '10M']
+
+# Number of rows read to estimate the memory saved by typed ingest (0 = do not estimate)
+ingestSampleRows = 10000
+
+# Reference data (optional csv files): population by State / Timezone & Year - columns: State (or Timezone), Year, Population
+# The population of a year in a file is used for that year, otherwise the population below (same for all years)
+statesPopulationFile = '../Resources/StatesPopulation.csv'
+timezonePopulationFile = '../Resources/TimezonePopulation.csv'
+
+# Reference data of the drill-down analyses (optional csv files, no population in Configs): columns County-State (e.g. 'Orange, CA') or City-State, Year, Population
+countiesPopulationFile = '../Resources/CountiesPopulation.csv'
+citiesPopulationFile = '../Resources/CitiesPopulation.csv'
 
 # Population by Timezone
 timezonePopulationDict = {"US/Eastern" : 155747200, "US/Central" : 95215200, "US/Mountain" : 21922400, "US/Pacific" : 54315200}
@@ -3,56 +3,209 @@
 ####################################################################################################################################################################################
 
 # Import Python Dependencies
-import numpy as np
+import argparse
+import cProfile
+import pstats
+import os
+import sys
+
+# Import configurations
+from Configs import streamingMode
+from Configs import useCache
+from Configs import incrementalMode
+from Configs import useResultsCache
+
+from Configs import dataframeBackend
+from Configs import parseProcesses
+from Configs import inputFileProcesses
+from Configs import sketchSampleFraction
+from Configs import renderProcesses
+from Configs import runReportEnabled
+from Configs import runReportFile
+from Configs import profileFilePath
 
 # Import functions
-from UsAccidentsAnalysisFunctions import getInputFile
-from UsAccidentsAnalysisFunctions import getInputData
-from UsAccidentsAnalysisFunctions import cleanInputData
-from UsAccidentsAnalysisFunctions import addDateColumns
-from UsAccidentsAnalysisFunctions import accidentsByTimezone
-from UsAccidentsAnalysisFunctions import accidentsByHour
-from UsAccidentsAnalysisFunctions import accidentsByDay
-from UsAccidentsAnalysisFunctions import accidentsByMonth
-from UsAccidentsAnalysisFunctions import accidentsByState
-from UsAccidentsAnalysisFunctions import accidentsByWeather
-from UsAccidentsAnalysisFunctions import accidentsByMonthByHours
+from UsAccidentsAnalysisFunctions import getInputFiles
+from UsAccidentsAnalysisFunctions import getCubeParts
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisFunctions import getStreamedCube
+from UsAccidentsAnalysisFunctions import analysisResultsDict
+from UsAccidentsAnalysisFunctions import getAnalysisResults
+from UsAccidentsAnalysisFunctions import exportAnalysisResults
+from UsAccidentsAnalysisCache import getCachedAccidentsCube
+from UsAccidentsAnalysisParallel import getParallelCube
+from UsAccidentsAnalysisParallel import getFilesCube
+from UsAccidentsAnalysisPipeline import getPipelinedCube
+from UsAccidentsAnalysisBackends import getBackendCube
+from UsAccidentsAnalysisBackends import isBackendAvailable
+from UsAccidentsAnalysisBackends import backendsDict
+from UsAccidentsAnalysisBackends import backendPackagesDict
+from UsAccidentsAnalysisSketches import getFilesSketches
+from UsAccidentsAnalysisSketches import getPreviewResults
+from UsAccidentsAnalysisIncremental import getIncrementalCube
+from UsAccidentsAnalysisIncremental import getChangedResults
+from UsAccidentsAnalysisIncremental import saveResultsDigests
+from UsAccidentsAnalysisMemo import getMemoizedResults
+from UsAccidentsAnalysisMemo import getUnplottedResults
+from UsAccidentsAnalysisMemo import saveRenderedCharts
+from UsAccidentsAnalysisMemo import closeResultsCache
+from UsAccidentsAnalysisInstrumentation import startRunReport
+from UsAccidentsAnalysisInstrumentation import runStage
 
 ####################################################################################################################################################################################
 # Main logic
 ####################################################################################################################################################################################
 
-# Get input file 
-inputFile = getInputFile()
+def main():
+
+    # Command line arguments
+    argParser = argparse.ArgumentParser(description="Analysis of US Accidents data")
+    argParser.add_argument('analyses', nargs='?', default=','.join(analysisResultsDict.keys()), help="analyses to run, comma separated (default: all): " + ', '.join(analysisResultsDict.keys()))
+    argParser.add_argument('--rebuild-cache', action='store_true', help="rebuild the cached cleaned data from the input file")
+    argParser.add_argument('--no-cache', action='store_true', help="do not use the cached cleaned data")
+    argParser.add_argument('--no-results-cache', action='store_true', default=not useResultsCache, help="do not reuse the memoized results & charts of the analyses (results cache)")
+    argParser.add_argument('--incremental', action='store_true', default=incrementalMode, help="process only the input files / rows added since the last run & plot only the charts that changed")
+    argParser.add_argument('--rebuild-state', action='store_true', help="rebuild the incremental mode state from all input files")
+    argParser.add_argument('--backend', choices=list(backendsDict.keys()), default=dataframeBackend, help="dataframe backend from the input file to the accidents cube (polars & pyarrow: without the cache)")
+    argParser.add_argument('--streaming', action='store_true', default=streamingMode, help="streaming mode: read, clean up & aggregate the input file chunk by chunk (memory bounded by the chunk size)")
+    argParser.add_argument('--pipeline', action='store_true', help="pipelined mode: read, clean up & aggregate the input file chunk by chunk with the stages overlapping (1 thread each)")
+    argParser.add_argument('--approximate', action='store_true', help="approximate mode: stream the input once into sketches & plot preview charts with error bounds (the analyses named are not used)")
+    argParser.add_argument('--sample-fraction', type=float, default=sketchSampleFraction, help="approximate mode: fraction of the input file read (a random sample of blocks of lines, counts scaled up)")
+    argParser.add_argument('--parse-processes', type=int, default=parseProcesses, help="number of processes to parse the input file (1 = read as a whole; >1 = split into shards parsed in parallel)")
+    argParser.add_argument('--processes', type=int, default=renderProcesses, help="number of processes to plot the charts (1 = one after another)")
+    argParser.add_argument('--no-charts', action='store_true', help="do not plot the charts, only save the analyses results (json & csv)")
+    argParser.add_argument('--metrics', action='store_true', help="save the analyses results (json & csv) along with the charts")
+    argParser.add_argument('--run-report', action='store_true', default=runReportEnabled, help="append the measures of each stage (wall & CPU time, rows in & out, peak memory) to the run report (JSON lines)")
+    argParser.add_argument('--profile', action='store_true', help="profile the run (cProfile stats file, e.g. for snakeviz / flameprof; charts plotted in other processes are not profiled)")
+    args = argParser.parse_args()
+
+    analysisNames = [analysisName.strip().lower() for analysisName in args.analyses.split(',') if analysisName.strip()]
+    unknownNames = [analysisName for analysisName in analysisNames if analysisName not in analysisResultsDict]
+    if len(analysisNames) == 0 or len(unknownNames) > 0:
+        argParser.error("unknown analyses: {} (choose from: {})".format(', '.join(unknownNames), ', '.join(analysisResultsDict.keys())))
+    if not 0 < args.sample_fraction <= 1:
+        argParser.error("sample fraction must be > 0 and <= 1")
+    if not isBackendAvailable(args.backend):
+        argParser.error("backend {} needs the {} package (pip install {})".format(args.backend, backendPackagesDict[args.backend], backendPackagesDict[args.backend]))
+
+    # Run report: measures of each stage appended as JSON lines
+    if args.run_report:
+        runId = startRunReport(runReportFile, {"args": sys.argv[1:]})
+        print("Run report: {} (run id: {})".format(runReportFile, runId))
+
+    # Profile of the run
+    if args.profile:
+        runProfile = cProfile.Profile()
+        runProfile.enable()
+
+    runStage('run', runAnalyses, args, analysisNames)
+
+    if args.profile:
+        runProfile.disable()
+        saveRunProfile(runProfile)
+
+####################################################################################################################################################################################
+# Function: Run the analyses - from the input file to the charts
+####################################################################################################################################################################################
+def runAnalyses(args, analysisNames: list):
+
+    # Parts of the accidents cube needed by the analyses (the cache always has the full cube - it covers any analyses)
+    cubeParts = getCubeParts(analysisNames)
 
-# Get initial input Data into a DataFrame
-accidentsDataDF = getInputData(inputFile)
+    # Get input file(s) 
+    inputFiles = runStage('getInputFiles', getInputFiles)
+    inputFile = inputFiles[0]
 
-# Clean up the dataframe before further processing:
-accidentsDataDF = cleanInputData(accidentsDataDF)
+    if args.approximate:
+        # Approximate mode: the input streamed once into sketches - preview of the analyses with error bounds instead of exact counts
+        runStage('runPreview', runPreview, args, inputFiles)
+        return
 
-# Add the required date columns to the dataframe for further analysis
-accidentsDataDF = addDateColumns(accidentsDataDF)
+    if args.incremental:
+        # Incremental mode: new input files / rows merged into the saved accidents cube (full cube - covers any analyses)
+        accidentsCube = runStage('getIncrementalCube', getIncrementalCube, rebuildState=args.rebuild_state)
+    elif len(inputFiles) > 1:
+        # Several input files: each read, cleaned & aggregated in chunks by a pool of processes & the cubes merged (the cache covers 1 input file)
+        accidentsCube = runStage('getFilesCube', getFilesCube, inputFiles, inputFileProcesses, cubeParts)
+    elif args.backend != 'pandas':
+        # Polars / PyArrow backend: from the input file to the accidents cube in the (multi-threaded) engine
+        accidentsCube = finalizeAccidentsCube(runStage('getBackendCube', getBackendCube, inputFile, cubeParts, args.backend))
+    elif args.parse_processes > 1 and (args.streaming or args.no_cache or not useCache):
+        # Parallel ingest: the input file split into shards - each read, cleaned & aggregated by a pool of processes & the cubes merged
+        accidentsCube = runStage('getParallelCube', getParallelCube, inputFile, args.parse_processes, cubeParts)
+    elif args.pipeline:
+        # Pipelined mode: streaming mode with the read, clean up & aggregation of the chunks overlapping (bounded queues between the stages)
+        accidentsCube = runStage('getPipelinedCube', getPipelinedCube, inputFile, cubeParts)
+    elif args.streaming:
+        # Streaming mode: read, clean, add date columns & aggregate the input file chunk by chunk (bounded memory)
+        accidentsCube = runStage('getStreamedCube', getStreamedCube, inputFile, cubeParts)
+    elif useCache and not args.no_cache:
+        # Accidents cube from the cache - rebuilt from the input file if changed
+        accidentsCube = runStage('getCachedAccidentsCube', getCachedAccidentsCube, inputFile, rebuildCache=args.rebuild_cache, parseProcesses=args.parse_processes)
+    else:
+        # Get initial input Data into a DataFrame (only the columns needed by the analyses), clean it up, add the date columns & aggregate it into the accidents cube
+        accidentsCube = finalizeAccidentsCube(runStage('getBackendCube', getBackendCube, inputFile, cubeParts, 'pandas'))
 
-# Analyze & Chart the data
+    # Analyze the data (accidents cube as input): by Weather condition, State, Time zone, Month, Day of the week & Time of the day (or the analyses selected)
+    # Results cache: the analyses memoized for the same data, settings & code are served from the cache
+    if args.no_results_cache:
+        analysisResults = getAnalysisResults(accidentsCube, analysisNames)
+    else:
+        analysisResults, analysisKeys = runStage('getMemoizedResults', getMemoizedResults, accidentsCube, analysisNames)
 
-# Call Function - Analyze by Weather condition (DF as input)
-accidentsByWeather(accidentsDataDF)
+    # Save the results
+    if args.no_charts or args.metrics:
+        runStage('exportAnalysisResults', exportAnalysisResults, analysisResults)
 
-# Call Function - Analyze by State (DF as input)
-accidentsByState(accidentsDataDF)
+    # Chart the results (charts module imported only when needed - it loads matplotlib)
+    # Incremental mode: only the analyses whose results changed since last plotted
+    # Results cache: only the analyses whose charts are not in the cache (the others are reused or restored from the cache) - the charts plotted are added to the cache
+    if not args.no_charts:
+        changedResults = getChangedResults(analysisResults) if args.incremental else analysisResults
+        renderResults = changedResults if args.no_results_cache else runStage('getUnplottedResults', getUnplottedResults, changedResults, analysisKeys)
+        if len(renderResults) > 0:
+            from UsAccidentsAnalysisCharts import renderAnalyses
+            renderedCharts = runStage('renderAnalyses', renderAnalyses, renderResults, processes=args.processes)
+            if not args.no_results_cache:
+                runStage('saveRenderedCharts', saveRenderedCharts, renderedCharts, analysisKeys)
+        if args.incremental:
+            saveResultsDigests(changedResults)
+
+    # Results cache: least recently used entries removed over the maximum size & hit / miss stats
+    if not args.no_results_cache:
+        runStage('closeResultsCache', closeResultsCache)
+
+
+####################################################################################################################################################################################
+# Function: Run the approximate mode - from the input file(s) to the sketches & the preview charts
+####################################################################################################################################################################################
+def runPreview(args, inputFiles: list):
+
+    # Sketches of all rows, or of a random sample of blocks of lines (read by a pool of processes with --parse-processes)
+    sketches = runStage('getFilesSketches', getFilesSketches, inputFiles, args.sample_fraction, args.parse_processes)
+    analysisResults = {"preview": runStage('getPreviewResults', getPreviewResults, sketches)}
+
+    if args.no_charts or args.metrics:
+        runStage('exportAnalysisResults', exportAnalysisResults, analysisResults)
+
+    if not args.no_charts:
+        from UsAccidentsAnalysisCharts import renderAnalyses
+        runStage('renderAnalyses', renderAnalyses, analysisResults, processes=args.processes)
+
+####################################################################################################################################################################################
+# Function: Save the profile of the run (cProfile stats file) & print the top functions
+####################################################################################################################################################################################
+def saveRunProfile(runProfile: cProfile.Profile):
 
-# Call Function - Analyze by Time zone (DF as input)
-accidentsByTimezone(accidentsDataDF)
+    os.makedirs(profileFilePath, exist_ok=True)
+    profileFile = os.path.join(profileFilePath, 'RunProfile.prof')
+    runProfile.dump_stats(profileFile)
 
-# Call Function - Analyze by Month (DF as input)
-accidentsByMonth(accidentsDataDF)
-accidentsByMonthByHours(accidentsDataDF)
+    pstats.Stats(runProfile).sort_stats('cumulative').print_stats(20)
+    print("Run profile saved: " + profileFile)
 
-# Call Function - Analyze by Day of the week (DF as input)
-accidentsByDay(accidentsDataDF)
 
-# Call Function - Analyze by Time of the day (DF as input)
-accidentsByHour(accidentsDataDF)
+if __name__ == '__main__':
+    main()
 
 ####################################################################################################################################################################################
@@ -0,0 +1,289 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import numpy as np
+import io
+import importlib.util
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getInputData
+from UsAccidentsAnalysisFunctions import getInputColumns
+from UsAccidentsAnalysisFunctions import cleanInputData
+from UsAccidentsAnalysisFunctions import addDateColumns
+from UsAccidentsAnalysisFunctions import getAccidentsCube
+from UsAccidentsAnalysisFunctions import mergeAccidentsCubes
+from UsAccidentsAnalysisFunctions import getCodesCounts
+from UsAccidentsAnalysisFunctions import getLabelsArray
+from UsAccidentsAnalysisFunctions import getTimeKeyCodes
+from UsAccidentsAnalysisFunctions import cubePartsDict
+from UsAccidentsAnalysisFunctions import timeDimsList
+from UsAccidentsAnalysisFunctions import compoundDimsDict
+from UsAccidentsAnalysisFunctions import unknownKeyLabel
+from UsAccidentsAnalysisFunctions import isCompressedFile
+from UsAccidentsAnalysisFunctions import openInputFile
+from UsAccidentsAnalysisInstrumentation import runStage
+
+# Import configurations & global data
+from Configs import requiredColumnsList
+from Configs import inputColumnsDtypeDict
+from Configs import startTimeFormat
+from Configs import yearFrom
+from Configs import yearTo
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Dataframe backends: ingest, clean up, date columns & aggregation of the input file into the accidents cube (not finalized) - the analyses & charts only use the cube
+#   pandas  : default (see UsAccidentsAnalysisFunctions)
+#   polars  : optional - 1 lazy query (only the columns needed, filters & group by pushed into the multi-threaded engine)
+#   pyarrow : optional - multi-threaded csv reader & compute functions (filters & group by on the arrow table)
+# All backends apply the same clean up rules & give the same cube (see the parity check of the benchmark - UsAccidentsBenchmark.py)
+# Compressed input files (.gz, .bz2, .zst): decompressed by the csv reader of pandas & pyarrow; for polars (scans uncompressed files only) decompressed as a stream
+# & read in batches of whole lines (polarsBatchMB of decompressed bytes each) - the cubes of the batches are merged, memory stays bounded by the batch size
+# Note: polars & pyarrow parse Start_Time with the configured format only (values in another format are not dates), pandas infers any other format
+
+# Values read as null (same as pandas read_csv)
+csvNullValuesList = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Polars backend, compressed input: size of the batches of decompressed lines read (in MB)
+polarsBatchMB = 64
+
+# Package needed by each backend
+backendPackagesDict = {"pandas" : "pandas",
+                       "polars" : "polars",
+                       "pyarrow" : "pyarrow"}
+
+
+####################################################################################################################################################################################
+# Function: Get the accidents cube (not finalized) of the input file with a backend
+####################################################################################################################################################################################
+def getBackendCube(inputFile: str, cubeParts: dict = None, backend: str = 'pandas') -> dict:
+
+    if cubeParts is None:
+        cubeParts = cubePartsDict
+
+    return backendsDict[backend](inputFile, cubeParts)
+
+####################################################################################################################################################################################
+# Function: Check if the package of a backend is installed
+####################################################################################################################################################################################
+def isBackendAvailable(backend: str) -> bool:
+    return importlib.util.find_spec(backendPackagesDict[backend]) is not None
+
+####################################################################################################################################################################################
+# Function: pandas backend - dataframe of the columns needed, cleaned, with date columns & aggregated
+####################################################################################################################################################################################
+def getPandasCube(inputFile: str, cubeParts: dict) -> dict:
+
+    # Get initial input Data into a DataFrame (only the columns needed by the analyses)
+    inputDF = runStage('getInputData', getInputData, inputFile, getInputColumns(cubeParts))
+
+    # Clean up the dataframe before further processing:
+    inputDF = runStage('cleanInputData', cleanInputData, inputDF)
+
+    # Add the required date columns to the dataframe for further analysis
+    inputDF = runStage('addDateColumns', addDateColumns, inputDF)
+
+    # Aggregate the data for the analysis into the accidents cube
+    return runStage('getAccidentsCube', getAccidentsCube, inputDF, cubeParts)
+
+####################################################################################################################################################################################
+# Function: polars backend - 1 lazy query per cube part (the scan & clean up are shared); compressed input: batches of lines decompressed as a stream
+####################################################################################################################################################################################
+def getPolarsCube(inputFile: str, cubeParts: dict) -> dict:
+
+    import polars as pl
+
+    # Only the columns needed, typed (strings for the categoricals - dictionary encoding is not needed to group by)
+    inputColumns = getInputColumns(cubeParts)
+    polarsDtypes = {"int8": pl.Int8, "float32": pl.Float32}
+    inputDtypes = {col: polarsDtypes.get(inputColumnsDtypeDict.get(col), pl.String) for col in inputColumns}
+
+    if not isCompressedFile(inputFile):
+        return getPolarsQueryCube(pl.scan_csv(inputFile, schema_overrides=inputDtypes, null_values=csvNullValuesList).select(inputColumns), cubeParts)
+
+    # Compressed: the cube of each batch of lines merged with the cube so far
+    accidentsCube = {}
+    with openInputFile(inputFile) as f:
+        for batchBytes in getLineBatches(f, int(polarsBatchMB * 1024 * 1024)):
+            batchDF = pl.read_csv(io.BytesIO(batchBytes), columns=inputColumns, schema_overrides=inputDtypes, null_values=csvNullValuesList)
+            accidentsCube = mergeAccidentsCubes(accidentsCube, getPolarsQueryCube(batchDF.lazy(), cubeParts))
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Read a stream of lines (e.g. decompressed) in batches of whole lines of about a number of bytes - each batch with the header line
+####################################################################################################################################################################################
+def getLineBatches(inputStream, batchBytes: int):
+
+    headerLine = inputStream.readline()
+    partialLine = b''
+
+    for block in iter(lambda: inputStream.read(batchBytes), b''):
+        block = partialLine + block
+        batchEnd = block.rfind(b'\n') + 1
+        partialLine = block[batchEnd:]
+        if batchEnd > 0:
+            yield headerLine + block[:batchEnd]
+
+    # Last line (without a newline at the end of the file)
+    if len(partialLine) > 0:
+        yield headerLine + partialLine
+
+####################################################################################################################################################################################
+# Function: polars backend - accidents cube (not finalized) of a lazy frame of the input columns: clean up, date columns & counts by the dimensions of each part
+####################################################################################################################################################################################
+def getPolarsQueryCube(inputDF, cubeParts: dict) -> dict:
+
+    import polars as pl
+
+    # Start_Time parsed once (null if not a date)
+    inputDF = inputDF.with_columns(pl.col('Start_Time').str.strptime(pl.Datetime, startTimeFormat, strict=False))
+
+    # Clean up rules (as getCleanupMask): all columns null, required column null (Start_Time: or not a date), outside years
+    inputDF = inputDF.filter(pl.any_horizontal(pl.all().is_not_null()) &
+                             pl.all_horizontal([pl.col(col).is_not_null() for col in requiredColumnsList]) &
+                             pl.col('Start_Time').dt.year().is_between(yearFrom, yearTo))
+
+    # Date columns (as addDateColumns): Weekday = 0 (Monday) to 6 (Sunday)
+    startTime = pl.col('Start_Time')
+    inputDF = inputDF.with_columns(startTime.dt.year().cast(pl.Int16).alias('Year'),
+                                   startTime.dt.month().cast(pl.Int8).alias('Month'),
+                                   startTime.dt.hour().cast(pl.Int8).alias('Hour'),
+                                   (startTime.dt.weekday() - 1).cast(pl.Int8).alias('Weekday'))
+
+    # Compound dimensions (e.g. County-State = 'Orange, CA') & rows without a value for a dimension (unknown label)
+    partsDims = getPartsLabelDims(cubeParts)
+    inputDF = inputDF.with_columns([pl.concat_str([pl.col(col) for col in compoundDimsDict[dim]], separator=', ').alias(dim) for dim in partsDims if dim in compoundDimsDict])
+    inputDF = inputDF.with_columns([pl.col(dim).fill_null(unknownKeyLabel) for dim in partsDims])
+
+    # Counts by the dimensions of each part - all parts collected at once (common scan & filters run once)
+    partsCounts = pl.collect_all([inputDF.group_by(partDims).agg(pl.len().alias('Count')) for partDims in cubeParts.values()])
+
+    accidentsCube = {}
+    for (part, partDims), partCounts in zip(cubeParts.items(), partsCounts):
+        accidentsCube[part] = getGroupedCounts(partDims, [partCounts[dim].to_numpy() for dim in partDims], partCounts['Count'].to_numpy())
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: pyarrow backend - table of the columns needed (multi-threaded reader), filtered & grouped by the dimensions of each part
+####################################################################################################################################################################################
+def getArrowCube(inputFile: str, cubeParts: dict) -> dict:
+
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+
+    # Only the columns needed, typed
+    inputColumns = getInputColumns(cubeParts)
+    arrowDtypes = {"int8": pa.int8(), "float32": pa.float32()}
+    convertOptions = pacsv.ConvertOptions(include_columns=inputColumns,
+                                          column_types={col: arrowDtypes.get(inputColumnsDtypeDict.get(col), pa.string()) for col in inputColumns},
+                                          null_values=csvNullValuesList, strings_can_be_null=True)
+    inputTable = pacsv.read_csv(inputFile, convert_options=convertOptions)
+
+    # Clean up rules (as getCleanupMask): all columns null, required column null, Start_Time not a date, outside years
+    startTime = pc.strptime(inputTable['Start_Time'], format=startTimeFormat, unit='s', error_is_null=True)
+    startYear = pc.year(startTime)
+    keepMask = pc.and_(pc.and_(getArrowAny([pc.is_valid(inputTable[col]) for col in inputColumns], pc.or_),
+                               getArrowAny([pc.is_valid(inputTable[col]) for col in requiredColumnsList], pc.and_)),
+                       pc.and_(pc.greater_equal(startYear, yearFrom), pc.less_equal(startYear, yearTo)))
+    keepMask = pc.fill_null(keepMask, False)
+
+    # Date columns (as addDateColumns): Weekday = 0 (Monday) to 6 (Sunday)
+    startTime = pc.filter(startTime, keepMask)
+    inputTable = pc.filter(inputTable, keepMask)
+    inputTable = inputTable.append_column('Year', pc.cast(pc.year(startTime), pa.int16()))
+    inputTable = inputTable.append_column('Month', pc.cast(pc.month(startTime), pa.int8()))
+    inputTable = inputTable.append_column('Hour', pc.cast(pc.hour(startTime), pa.int8()))
+    inputTable = inputTable.append_column('Weekday', pc.cast(pc.day_of_week(startTime), pa.int8()))
+
+    # Compound dimensions (e.g. County-State = 'Orange, CA') & rows without a value for a dimension (unknown label)
+    for dim in getPartsLabelDims(cubeParts):
+        if dim in compoundDimsDict:
+            inputTable = inputTable.append_column(dim, pc.binary_join_element_wise(*[inputTable[col] for col in compoundDimsDict[dim]], ', '))
+        inputTable = inputTable.set_column(inputTable.schema.get_field_index(dim), dim, pc.fill_null(inputTable[dim], unknownKeyLabel))
+
+    # Counts by the dimensions of each part
+    accidentsCube = {}
+    for part, partDims in cubeParts.items():
+        partCounts = inputTable.group_by(partDims).aggregate([([], 'count_all')])
+        accidentsCube[part] = getGroupedCounts(partDims, [partCounts[dim].to_numpy() for dim in partDims], partCounts['count_all'].to_numpy())
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Get the dimensions of the cube parts with text labels (not time keys or numbers, e.g. State, County-State) - may have rows without a value
+####################################################################################################################################################################################
+def getPartsLabelDims(cubeParts: dict) -> list:
+
+    partsDims = []
+    for dim in [dim for partDims in cubeParts.values() for dim in partDims]:
+        if dim not in partsDims and dim not in timeDimsList and (dim in compoundDimsDict or inputColumnsDtypeDict.get(dim) in ['object', 'category']):
+            partsDims.append(dim)
+
+    return partsDims
+
+####################################################################################################################################################################################
+# Function: Combine arrow boolean arrays with a function (e.g. or / and)
+####################################################################################################################################################################################
+def getArrowAny(arrays: list, combineFunction):
+
+    combined = arrays[0]
+    for array in arrays[1:]:
+        combined = combineFunction(combined, array)
+
+    return combined
+
+####################################################################################################################################################################################
+# Function: Get the dense array of counts of a cube part from counts by group (values of the dimensions of each group & count) - same labels as the pandas backend
+####################################################################################################################################################################################
+def getGroupedCounts(dims: list, dimValues: list, groupCounts: np.ndarray) -> dict:
+
+    # Codes & labels of each dimension: time keys as offsets from the first key, other values sorted
+    dimCodes = []
+    dimLabels = []
+    for dim, values in zip(dims, dimValues):
+        if dim in timeDimsList:
+            codes, labels = getTimeKeyCodes(values, dim)
+        else:
+            labels, codes = np.unique(values, return_inverse=True)
+        dimCodes.append(codes.ravel())
+        dimLabels.append(getLabelsArray(labels))
+
+    # 1 group per combination: the count of each group is added at its position in the dense array
+    return getCodesCounts(dims, dimCodes, dimLabels, groupCounts)
+
+####################################################################################################################################################################################
+# Function: Check if 2 accidents cubes are the same (parts, dimensions, labels & counts)
+####################################################################################################################################################################################
+def isSameAccidentsCube(accidentsCube: dict, otherCube: dict) -> bool:
+
+    if accidentsCube.keys() != otherCube.keys():
+        return False
+
+    for part, partCounts in accidentsCube.items():
+        otherCounts = otherCube[part]
+        if partCounts['dims'] != otherCounts['dims'] or partCounts['counts'].shape != otherCounts['counts'].shape:
+            return False
+        if not all(np.array_equal(labels, otherLabels) for labels, otherLabels in zip(partCounts['labels'], otherCounts['labels'])):
+            return False
+        if not np.array_equal(partCounts['counts'], otherCounts['counts']):
+            return False
+
+    return True
+
+####################################################################################################################################################################################
+# Backends by name
+####################################################################################################################################################################################
+backendsDict = {"pandas" : getPandasCube,
+                "polars" : getPolarsCube,
+                "pyarrow" : getArrowCube}
+
+
+####################################################################################################################################################################################
@@ -0,0 +1,423 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import pandas as pd
+import numpy as np
+import os
+import json
+import shutil
+import hashlib
+import time
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getInputData
+from UsAccidentsAnalysisFunctions import cleanInputData
+from UsAccidentsAnalysisFunctions import addDateColumns
+from UsAccidentsAnalysisFunctions import getInputColumns
+from UsAccidentsAnalysisFunctions import getCodesCounts
+from UsAccidentsAnalysisFunctions import getLabelsArray
+from UsAccidentsAnalysisFunctions import getTimeKeyCodes
+from UsAccidentsAnalysisFunctions import getCompoundCodes
+from UsAccidentsAnalysisFunctions import getKnownCodes
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisFunctions import cubePartsDict
+from UsAccidentsAnalysisFunctions import timeDimsList
+from UsAccidentsAnalysisFunctions import compoundDimsDict
+from UsAccidentsAnalysisInstrumentation import runStage
+from UsAccidentsAnalysisParallel import getParallelInputData
+
+# Import configurations & global data
+from Configs import cacheFilePath
+from Configs import typedIngest
+from Configs import inputColumnsDtypeDict
+from Configs import requiredColumnsList
+from Configs import yearFrom
+from Configs import yearTo
+from Configs import cachePartitionColumnsList
+from Configs import weatherTopN
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Cache of the cleaned data (with date columns) - a memory mapped column store: one .npy file per column + a schema file, in a directory per cache key
+# The rows of all years are cached, ordered by partition (year, or year & month) - the schema has the rows of each partition,
+# so the rows of the years analysed are 1 range of each column, opened zero-copy (memory mapped, read only) & shared by all processes through the page cache
+# Categorical columns are saved as integer codes (categories in the schema)
+# The accidents cube built from the column store (rows of the years analysed) is saved in the same directory (cube.npz)
+# The cache key is built from the input file fingerprint (size, mtime, content hash) & the clean up settings -
+# - any change in the input file or the settings gives a new key (the old cache is removed when the new one is saved)
+
+# Version of the cache format - change it when the cleaned data columns change
+cacheVersion = 6
+
+# Version of the accidents cube format - change it when the cube parts change
+cubeVersion = 3
+
+# Block size to read the input file for the content hash
+hashBlockSize = 8 * 1024 * 1024
+
+
+####################################################################################################################################################################################
+# Function: Get the fingerprint of the input file (size, mtime & content hash)
+####################################################################################################################################################################################
+def getInputFingerprint(inputFile: str) -> dict:
+
+    fileStat = os.stat(inputFile)
+    fingerprint = {"file": os.path.abspath(inputFile), "size": fileStat.st_size, "mtime": fileStat.st_mtime_ns}
+
+    # Reuse the content hash of the last run if size & mtime are unchanged (hashing reads the whole file)
+    lastFingerprint = readJsonFile(os.path.join(cacheFilePath, 'fingerprint.json'))
+    if lastFingerprint is not None and all(lastFingerprint.get(k) == fingerprint[k] for k in ['file', 'size', 'mtime']):
+        fingerprint['hash'] = lastFingerprint['hash']
+        return fingerprint
+
+    # Content hash of the input file
+    startTime = time.perf_counter()
+    fileHash = hashlib.sha256()
+    with open(inputFile, 'rb') as f:
+        for block in iter(lambda: f.read(hashBlockSize), b''):
+            fileHash.update(block)
+    fingerprint['hash'] = fileHash.hexdigest()
+    print("Input file hashed in {:.2f} sec".format(time.perf_counter() - startTime))
+
+    # Save for the next run
+    os.makedirs(cacheFilePath, exist_ok=True)
+    writeJsonFile(os.path.join(cacheFilePath, 'fingerprint.json'), fingerprint)
+
+    return fingerprint
+
+####################################################################################################################################################################################
+# Function: Get the cache key - from the input file fingerprint & the clean up settings
+####################################################################################################################################################################################
+def getCacheKey(fingerprint: dict) -> str:
+
+    cacheSettings = {"cacheVersion": cacheVersion,
+                     "size": fingerprint['size'],
+                     "mtime": fingerprint['mtime'],
+                     "hash": fingerprint['hash'],
+                     "partitionColumns": cachePartitionColumnsList}
+    cacheSettings.update(getCleanupSettings())
+
+    return hashlib.sha256(json.dumps(cacheSettings, sort_keys=True).encode()).hexdigest()[:32]
+
+####################################################################################################################################################################################
+# Function: Get the settings the input data is read & cleaned up with (other than the years analysed)
+####################################################################################################################################################################################
+def getCleanupSettings() -> dict:
+
+    return {"typedIngest": typedIngest,
+            "inputColumns": getInputColumns(),
+            "inputColumnsDtypes": inputColumnsDtypeDict,
+            "requiredColumns": requiredColumnsList}
+
+####################################################################################################################################################################################
+# Function: Get the cache directory (column store) of the input file - the cleaned data (with date columns) is saved to it first if not present
+####################################################################################################################################################################################
+def getColumnStoreDir(inputFile: str, rebuildCache: bool = False, parseProcesses: int = 1) -> str:
+
+    cacheDir = os.path.join(cacheFilePath, getCacheKey(getInputFingerprint(inputFile)))
+
+    if rebuildCache or not os.path.isfile(os.path.join(cacheDir, 'schema.json')):
+
+        # Get initial input Data into a DataFrame (parsed in shards by a pool of processes if more than 1)
+        if parseProcesses > 1:
+            inputDF = runStage('getParallelInputData', getParallelInputData, inputFile, parseProcesses)
+        else:
+            inputDF = runStage('getInputData', getInputData, inputFile)
+
+        # Clean up the dataframe before further processing (rows of all years are kept in the cache):
+        inputDF = runStage('cleanInputData', cleanInputData, inputDF, yearRange=None)
+
+        # Add the required date columns to the dataframe for further analysis
+        inputDF = runStage('addDateColumns', addDateColumns, inputDF)
+
+        # Save to the cache (replaces any older cache)
+        removeCachedData()
+        runStage('saveCachedData', saveCachedData, inputDF, cacheDir)
+        print("Dataframe saved to cache: " + cacheDir)
+
+    return cacheDir
+
+####################################################################################################################################################################################
+# Function: Get the cleaned data (with date columns) of the years analysed as a dataframe - from the cache (saved first if not present)
+####################################################################################################################################################################################
+def getCleanedInputData(inputFile: str, rebuildCache: bool = False, parseProcesses: int = 1) -> pd.DataFrame:
+
+    cacheDir = getColumnStoreDir(inputFile, rebuildCache, parseProcesses)
+
+    startTime = time.perf_counter()
+    inputDF = loadCachedData(cacheDir, (yearFrom, yearTo))
+    print("Dataframe loaded from cache: {}, years: {} - {}, {} rows, load time: {:.2f} sec".format(cacheDir, yearFrom, yearTo, len(inputDF), time.perf_counter() - startTime))
+
+    return inputDF
+
+####################################################################################################################################################################################
+# Function: Get the accidents cube - from the cache if present, otherwise from the column store (& save it to the cache)
+####################################################################################################################################################################################
+def getCachedAccidentsCube(inputFile: str, rebuildCache: bool = False, parseProcesses: int = 1) -> dict:
+
+    cacheDir = getColumnStoreDir(inputFile, rebuildCache, parseProcesses)
+    cubeFile = os.path.join(cacheDir, 'cube.npz')
+
+    # Load from the cache
+    if not rebuildCache and os.path.isfile(cubeFile):
+        startTime = time.perf_counter()
+        accidentsCube = runStage('loadAccidentsCube', loadAccidentsCube, cubeFile)
+        if accidentsCube is not None:
+            print("Accidents cube loaded from cache: {}, load time: {:.3f} sec".format(cubeFile, time.perf_counter() - startTime))
+            return accidentsCube
+
+    # Rows of the years analysed (memory mapped) aggregated into the cube
+    startTime = time.perf_counter()
+    columnStore = openColumnStore(cacheDir, (yearFrom, yearTo))
+    accidentsCube = finalizeAccidentsCube(runStage('getColumnStoreCube', getColumnStoreCube, columnStore))
+    print("Accidents cube built from the column store: years: {} - {}, {} rows (rows deleted, outside years: {}), time: {:.2f} sec".format(yearFrom, yearTo, columnStore['rows'], 
+          columnStore['rowsOutsideYears'], time.perf_counter() - startTime))
+
+    saveAccidentsCube(accidentsCube, cubeFile)
+    print("Accidents cube saved to cache: " + cubeFile)
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Save the accidents cube to a file - counts & labels of each part as arrays
+####################################################################################################################################################################################
+def saveAccidentsCube(accidentsCube: dict, cubeFile: str, cubeSettings: dict = None):
+
+    # Settings the cube is built with (a cube built with other settings is not loaded)
+    if cubeSettings is None:
+        cubeSettings = getCubeSettings()
+    cubeArrays = {"settings": np.array(json.dumps(cubeSettings))}
+
+    for part, partCounts in accidentsCube.items():
+        cubeArrays[part + '__dims'] = np.array(partCounts['dims'])
+        cubeArrays[part + '__counts'] = partCounts['counts']
+        for i, labels in enumerate(partCounts['labels']):
+            cubeArrays[part + '__labels__' + str(i)] = labels
+
+    # Write to a temp file first & rename when complete
+    tempFile = cubeFile + '.tmp.npz'
+    np.savez(tempFile, **cubeArrays)
+    os.replace(tempFile, cubeFile)
+
+####################################################################################################################################################################################
+# Function: Load the accidents cube from a file (None if built with other settings)
+####################################################################################################################################################################################
+def loadAccidentsCube(cubeFile: str, cubeSettings: dict = None):
+
+    if cubeSettings is None:
+        cubeSettings = getCubeSettings()
+
+    with np.load(cubeFile) as cubeArrays:
+        if json.loads(str(cubeArrays['settings'])) != cubeSettings:
+            return None
+
+        accidentsCube = {}
+        for name in cubeArrays.files:
+            if name.endswith('__dims'):
+                part = name[:-len('__dims')]
+                dims = cubeArrays[name].tolist()
+                accidentsCube[part] = {"dims": dims,
+                                       "labels": [cubeArrays[part + '__labels__' + str(i)] for i in range(len(dims))],
+                                       "counts": cubeArrays[part + '__counts']}
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Get the settings the accidents cube is built with
+####################################################################################################################################################################################
+def getCubeSettings() -> dict:
+    return {"cubeVersion": cubeVersion, "weatherTopN": weatherTopN, "yearFrom": yearFrom, "yearTo": yearTo}
+
+####################################################################################################################################################################################
+# Function: Save the dataframe to the cache directory - one .npy file per column, rows ordered by partition
+####################################################################################################################################################################################
+def saveCachedData(inputDF: pd.DataFrame, cacheDir: str):
+
+    # Write to a temp directory first & rename when complete (an interrupted save is never loaded)
+    tempDir = cacheDir + '.tmp'
+    shutil.rmtree(tempDir, ignore_errors=True)
+    os.makedirs(tempDir)
+
+    schema = {"cacheVersion": cacheVersion, "rows": len(inputDF), "partitionColumns": cachePartitionColumnsList, "columns": [], "partitions": []}
+
+    # Order of the rows: by partition (rows of a partition in the order of the dataframe)
+    partitionValues = [inputDF[col].to_numpy() for col in cachePartitionColumnsList]
+    rowOrder = np.lexsort(partitionValues[::-1])
+
+    # Rows of each partition (1 range of rows in the order of the partition values)
+    partitionKeys, partitionStarts, partitionRows = np.unique(np.stack([values[rowOrder] for values in partitionValues], axis=1), axis=0, return_index=True, return_counts=True)
+    for partitionKey, partitionStart, rowCount in zip(partitionKeys.tolist(), partitionStarts.tolist(), partitionRows.tolist()):
+        schema['partitions'].append({"values": dict(zip(cachePartitionColumnsList, partitionKey)), "start": partitionStart, "rows": rowCount})
+
+    for i, col in enumerate(inputDF.columns):
+        colFile = 'col_{}.npy'.format(i)
+        colSchema = {"name": col, "file": colFile, "dtype": str(inputDF[col].dtype)}
+
+        if isinstance(inputDF[col].dtype, pd.CategoricalDtype):
+            # Categorical: save the codes, categories go to the schema
+            colValues = inputDF[col].cat.codes.to_numpy()
+            colSchema['categories'] = inputDF[col].cat.categories.tolist()
+        elif isinstance(inputDF[col].dtype, pd.PeriodDtype):
+            # Periods: save the ordinals (the dtype has the frequency)
+            colValues = inputDF[col].array.asi8
+            colSchema['period'] = True
+        elif pd.api.types.is_numeric_dtype(inputDF[col].dtype) or pd.api.types.is_datetime64_dtype(inputDF[col].dtype):
+            # Numbers & dates (e.g. Start_Time parsed by the clean up) saved as is
+            colValues = inputDF[col].to_numpy()
+        else:
+            # Other (strings): save as fixed width strings, converted back to the dtype when loaded
+            colValues = inputDF[col].astype(str).to_numpy().astype(str)
+
+        np.save(os.path.join(tempDir, colFile), colValues[rowOrder])
+        schema['columns'].append(colSchema)
+
+    writeJsonFile(os.path.join(tempDir, 'schema.json'), schema)
+    os.replace(tempDir, cacheDir)
+
+####################################################################################################################################################################################
+# Function: Open the column store in the cache directory - the rows of the years in range (all if no range) of each column, memory mapped (read only)
+####################################################################################################################################################################################
+def openColumnStore(cacheDir: str, yearRange: tuple = None) -> dict:
+
+    schema = readJsonFile(os.path.join(cacheDir, 'schema.json'))
+
+    # Partitions pruned by year - the rows of the partitions in range are 1 range (partitions are ordered by year first)
+    partitions = [partition for partition in schema['partitions'] if yearRange is None or yearRange[0] <= partition['values']['Year'] <= yearRange[1]]
+    startRow = partitions[0]['start'] if len(partitions) > 0 else 0
+    endRow = partitions[-1]['start'] + partitions[-1]['rows'] if len(partitions) > 0 else 0
+
+    # Slices of the memory mapped files (no data read until used)
+    columns = {colSchema['name']: np.load(os.path.join(cacheDir, colSchema['file']), mmap_mode='r')[startRow:endRow] for colSchema in schema['columns']}
+
+    # Rows of the years out of range (the year clean up rule is applied here: the column store keeps all years)
+    rowsOutsideYears = sum(partition['rows'] for partition in schema['partitions']) - (endRow - startRow)
+
+    return {"rows": endRow - startRow, "rowsOutsideYears": rowsOutsideYears, "columns": columns, "schema": {colSchema['name']: colSchema for colSchema in schema['columns']}}
+
+####################################################################################################################################################################################
+# Function: Get the integer codes & sorted labels of a column of the column store - only the labels present in the rows
+####################################################################################################################################################################################
+def getColumnCodes(columnStore: dict, col: str) -> tuple:
+
+    colValues = columnStore['columns'][col]
+    colSchema = columnStore['schema'][col]
+
+    # Time keys: offsets from the first key (all keys kept - same as for the dataframe)
+    if col in timeDimsList:
+        return getTimeKeyCodes(colValues, col)
+
+    # Categoricals: the codes are the positions in the categories - rows without a value (code -1) as the unknown label, labels sorted (the categories may not be)
+    if 'categories' in colSchema:
+        codes, labels = getKnownCodes(np.asarray(colValues), getLabelsArray(np.array(colSchema['categories'])))
+        return getPresentCodes(codes, labels)
+
+    if len(colValues) == 0:
+        return np.zeros(0, dtype='int64'), getLabelsArray(colValues[:0])
+
+    if np.issubdtype(colValues.dtype, np.integer) and 'period' not in colSchema:
+        # Integer keys (e.g. Year, Hour, Severity): position in the range of values
+        minValue = colValues.min()
+        codes, labels = colValues - minValue, np.arange(minValue, colValues.max() + 1).astype(colValues.dtype)
+    else:
+        codes, labels = pd.factorize(getColumnValues(colSchema, colValues), sort=True)
+
+    return getPresentCodes(codes, labels)
+
+####################################################################################################################################################################################
+# Function: Get codes & labels without the labels that have no rows (as for the dataframe - not to be counted as 0)
+####################################################################################################################################################################################
+def getPresentCodes(codes: np.ndarray, labels) -> tuple:
+
+    present = np.bincount(codes, minlength=len(labels)) > 0
+    if not present.all():
+        codes = (np.cumsum(present) - 1)[codes]
+        labels = np.asarray(labels)[present]
+
+    return codes, getLabelsArray(labels)
+
+####################################################################################################################################################################################
+# Function: Aggregate the rows of the column store into the accidents cube (not finalized) - from the codes of the columns, without a dataframe
+####################################################################################################################################################################################
+def getColumnStoreCube(columnStore: dict, cubeParts: dict = None) -> dict:
+
+    if cubeParts is None:
+        cubeParts = cubePartsDict
+
+    # Codes & labels of each dimension column (once for all parts)
+    columnCodes = {}
+    for dim in [dim for partDims in cubeParts.values() for dim in partDims]:
+        if dim in compoundDimsDict:
+            columnCodes[dim] = getCompoundCodes([getColumnCodes(columnStore, col) for col in compoundDimsDict[dim]])
+        else:
+            columnCodes[dim] = getColumnCodes(columnStore, dim)
+
+    accidentsCube = {}
+    for part, partDims in cubeParts.items():
+        accidentsCube[part] = getCodesCounts(partDims, [columnCodes[dim][0] for dim in partDims], [columnCodes[dim][1] for dim in partDims])
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Load the dataframe from the cache directory - only the rows of the years in range (all if no range)
+####################################################################################################################################################################################
+def loadCachedData(cacheDir: str, yearRange: tuple = None) -> pd.DataFrame:
+
+    columnStore = openColumnStore(cacheDir, yearRange)
+
+    inputDict = {}
+    for col, colValues in columnStore['columns'].items():
+        inputDict[col] = getColumnValues(columnStore['schema'][col], colValues)
+
+    return pd.DataFrame(inputDict)
+
+####################################################################################################################################################################################
+# Function: Get the values of a column of the column store in the column dtype (categoricals, periods & strings converted)
+####################################################################################################################################################################################
+def getColumnValues(colSchema: dict, colValues: np.ndarray):
+
+    if 'categories' in colSchema:
+        # Categories of other years removed (not to be counted as 0)
+        return pd.Categorical.from_codes(colValues, colSchema['categories']).remove_unused_categories()
+    elif 'period' in colSchema:
+        return pd.arrays.PeriodArray(np.asarray(colValues), dtype=colSchema['dtype'])
+    elif np.issubdtype(colValues.dtype, np.number) or np.issubdtype(colValues.dtype, np.datetime64):
+        return np.array(colValues)
+    else:
+        return pd.Series(colValues).astype(colSchema['dtype'])
+
+####################################################################################################################################################################################
+# Function: Remove all cached data (keeps the input file fingerprint)
+####################################################################################################################################################################################
+def removeCachedData():
+
+    if not os.path.isdir(cacheFilePath):
+        return
+
+    for entry in os.listdir(cacheFilePath):
+        entryPath = os.path.join(cacheFilePath, entry)
+        if os.path.isdir(entryPath):
+            shutil.rmtree(entryPath)
+
+####################################################################################################################################################################################
+# Function: Read / write a json file
+####################################################################################################################################################################################
+def readJsonFile(jsonFile: str):
+
+    if not os.path.isfile(jsonFile):
+        return None
+
+    with open(jsonFile) as f:
+        return json.load(f)
+
+def writeJsonFile(jsonFile: str, jsonData):
+
+    with open(jsonFile, 'w') as f:
+        json.dump(jsonData, f, indent=2)
+
+
+####################################################################################################################################################################################
@@ -0,0 +1,935 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+from concurrent.futures import ProcessPoolExecutor
+import os
+import matplotlib
+# Charts are only saved to files - Agg backend (no display needed, same in the rendering processes)
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getSeverityColumns
+from UsAccidentsAnalysisInstrumentation import runStage
+
+# Import configurations & global data
+from Configs import outputFilePath
+from Configs import drillDownMinCount
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# These functions plot the charts of the analyses results (see the get...Results functions in UsAccidentsAnalysisFunctions)
+
+# Chart files saved by the analysis being plotted (in this process) - returned by renderAnalysis, e.g. to be cached with the results
+savedChartsList = []
+
+####################################################################################################################################################################################
+# Function: Analyze by Timezone  
+####################################################################################################################################################################################
+def accidentsByTimezone(timezoneResults: dict):
+    
+    outputFileSubPath = 'ByTimezone/'
+
+    # Count, average severity, weighted severity index, accidents per 1000 people & severity histogram by timezone
+    timezonesResultsDF = timezoneResults['Timezone']
+
+    # Get unique timezones & counts
+    timezonesCounts = timezonesResultsDF['Count'].tolist()
+    timezonesLabels = timezonesResultsDF.index.tolist()
+
+    # Unique list all Severity values in the dataset (histogram columns)
+    uniqueSevLables = getSeverityColumns(timezonesResultsDF)
+ 
+    # Set colors for timezones
+    timezonesGraphColors = ['royalblue', 'darkorange', 'gold', 'darkolivegreen']
+    # Set colors for severity 
+    severityGraphColors = ['royalblue', 'lightgreen', 'gold', 'darkorange', 'red']
+    
+
+    # 1. Pie Chart (Count(s) of Accidents by timezone)
+    # Set the plot attributes & Plot the Pie chart
+    pieExplode = [0] * len(timezonesCounts)
+    plt.figure(figsize=(12, 8))
+    plt.axis("equal")
+    plt.pie(timezonesCounts, explode=pieExplode, colors=timezonesGraphColors, labels=timezonesLabels,
+        autopct="%1.1f%%", shadow=True, startangle=135)
+    plt.title("Accidents in Different Timezone")
+    
+    # Save output file
+    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_1_Counts_Pie.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 2. Bar Chart (Counts by timezone)
+    # Set the plot attributes & Plot the Bar chart
+    plt.figure(figsize=(12, 8))
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(timezonesLabels)-0.25)
+    plt.xlabel("Timezone")
+    xlocs, xlabs = plt.xticks()
+    # xlocs=[i+1 for i in range(0,len(timezonesLabels))]
+    # xlabs=[i/2 for i in range(0,len(timezonesLabels))]
+    xlocs=[i for i in range(0,len(timezonesLabels))]
+    xlabs=timezonesLabels
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(timezonesCounts)+200000)
+    plt.ylabel("Count of Accident(s)")
+    # Plot the chart
+    plt.bar(timezonesLabels, timezonesCounts, color=timezonesGraphColors, alpha=0.5, align="center")
+    plt.title("Accidents in Different Timezone")
+    # put value labes for Y-Axis 
+    for i, v in enumerate(timezonesCounts):
+        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+        plt.text(xlocs[i] -0.10, v + 0.01, str(v))
+    
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_2_Counts_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 3. Average severity pf accident by Timezone
+
+    # Mean (avg) sev for each timezone:
+    timezonesAvgSev = timezonesResultsDF['Avg Severity'].tolist()
+
+    # Set the plot attributes & Plot the Bar chart
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(timezonesLabels)-0.25)
+    plt.xlabel("Timezone")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+1 for i in range(0,len(timezonesAvgSev))]
+    xlabs=[i/2 for i in range(0,len(timezonesAvgSev))]
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(timezonesAvgSev)+0.500)
+    plt.ylabel("Avergare Severity of Accident")
+    # Plot the chart:
+    plt.figure(figsize=(12, 8))
+    plt.bar(timezonesLabels, timezonesAvgSev, color=timezonesGraphColors, alpha=0.5, align="center")
+    plt.title("Average Accidents Severity in Different Timezone")
+    # put value labes for Y-Axis 
+    for i, v in enumerate(timezonesAvgSev):
+        # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
+        plt.text(xlocs[i] -1.10, v + 0.01, str(v))
+    
+    # Define & Save: Output file - Pie chart
+    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_3_AvgSev_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+    
+
+    # 4. Weighted Severity Index per 1000 accidents by Timezone (see getSeverityStats for the calculation)
+    timezonesWeigthedSevIndex = timezonesResultsDF['Weighted Severity Index'].tolist()
+
+    # Done for all timezones
+
+    # Set the plot attributes & Plot the Bar chart
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(timezonesLabels)-0.25)
+    plt.xlabel("Timezone")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+1 for i in range(0,len(timezonesAvgSev))]
+    xlabs=[i/2 for i in range(0,len(timezonesAvgSev))]
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(timezonesWeigthedSevIndex)+10.00)
+    plt.ylabel("Weighted Severity Index per 1000 Accidents")
+    # Plot the chart:
+    plt.figure(figsize=(12, 8))
+    plt.bar(timezonesLabels, timezonesWeigthedSevIndex, color=timezonesGraphColors, alpha=0.5, align="center")
+    plt.title("Weighted Severity of Accidents in Different Timezone (per 1000 Accidents)")
+    # put value labes for Y-Axis 
+    for i, v in enumerate(timezonesWeigthedSevIndex):
+        # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
+        plt.text(xlocs[i] -1.10, v + 0.01, str(v))
+
+    # Define & Save: Output file - Pie chart
+    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_4_WeightedSevIndex_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 5. Bar Chart: Number of accidents by timezone per year per 1000 people (see getTimezoneResults for the calculation)
+    # Timezones without a population (no rate) left out
+    timezoneRates = getKnownRates(timezonesResultsDF['Accidents per 1000 People'], 'Timezone accidents per 1000 people')
+    timezoneCountsPerYearPer1000PopulationList = timezoneRates.tolist()
+    timezoneRateLabels = timezoneRates.index.tolist()
+
+
+    # Calculations done - have the data now plot the bar chart  
+
+    # Set the plot attributes & Plot the Bar chart
+    plt.figure(figsize=(12, 8))
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(timezoneRateLabels)-0.25)
+    plt.xlabel("Timezone")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i for i in range(0,len(timezoneRateLabels))]
+    xlabs=timezoneRateLabels
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(timezoneCountsPerYearPer1000PopulationList, default=0)+0.250)
+    plt.ylabel("Accident(s) per 1000 People")
+    # Plot the chart (same color of each timezone as in the other charts)
+    plt.bar(timezoneRateLabels, timezoneCountsPerYearPer1000PopulationList, color=[timezonesGraphColors[timezonesLabels.index(label) % len(timezonesGraphColors)] for label in timezoneRateLabels], alpha=0.5, align="center")
+    plt.title("Accidents in Different Timezone per Population of 1000")
+    # put value labes for Y-Axis 
+    for i, v in enumerate(timezoneCountsPerYearPer1000PopulationList):
+        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+        plt.text(xlocs[i] -0.10, v + 0.01, str(v))
+    
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_5_Counts_1000_People_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 6. Pie Chart (Percentage Severity of Accidents by timezone)
+
+    # Plot all 4 timezones in 1 figure : 2 rows 2 cols
+    plt.figure(figsize=(12, 8))
+    
+    for cnt, tz in enumerate(timezonesLabels):
+        # Not all timeozone may have an accident for each severity type - the histogram has a 0 count for those
+        sevCountsPct = timezonesResultsDF.loc[tz, uniqueSevLables].tolist()
+
+        if cnt == 0:
+            # 1st Timezone : first row, first col
+            ax1 = plt.subplot2grid((2,2),(0,0))
+        if cnt == 1:
+            # 2nd Timezone: first row, second col
+            ax1 = plt.subplot2grid((2,2), (0, 1))
+        if cnt == 2:
+            # 3rd Timezone: second row, first column
+            ax1 = plt.subplot2grid((2,2), (1, 0))
+        if cnt == 3:
+            # 4th Timezone: second row, second column
+            ax1 = plt.subplot2grid((2,2), (1, 1))
+        
+        piePctExplode = (0.25, 0.25, 0, 0, 0.10)    
+        plt.axis("equal")
+        plt.pie(sevCountsPct, explode=piePctExplode, colors=severityGraphColors, labels=uniqueSevLables,
+            autopct="%1.1f%%", shadow=True, startangle=135)
+        plt.title("% Severity in Timezone: " + tz)
+
+    # End of all timezones    
+    # Save output file
+    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_6_Severity_Pie.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+####################################################################################################################################################################################
+# Function: Analyze by Hour  
+####################################################################################################################################################################################
+def accidentsByHour(hourResults: dict):
+
+    outputFileSubPath = 'ByHour/'
+
+
+    # Get unique hours & counts
+    hourCounts = hourResults['Hour']['Count'].tolist()
+    hourLabels = hourResults['Hour'].index.tolist()
+
+    hourIndex = ['0-1', '1-2', '2-3', '3-4', '4-5', '5-6', '6-7', '7-8', '8-9', '9-10', '10-11', '11-12', '12-13', '13-14', '14-15', '15-16', '16-17', '17-18', '18-19', '19-20', '20-21', '21-22', '22-23', '23-24']
+    # Plot the bar grapgh
+    plt.figure(figsize=(12, 8))
+  
+    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
+    # colors
+    barColors = ['royalblue']
+ 
+    # X-Axis limits & label: 
+    plt.xlim(-0.75, len(hourLabels)-0.25)
+    plt.xlabel("Hour")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+0 for i in range(0,len(hourCounts))]
+    xlabs=[i for i in hourIndex]
+    plt.xticks(xlocs, xlabs, rotation = 45)
+    # Y-Axis limits & label: 
+    plt.ylim(0, max(hourCounts)+10000)
+    plt.ylabel("Count of Accidents")
+    # Plot 
+    plt.bar(hourLabels, hourCounts, alpha=0.5, align="center", color=barColors)
+    plt.title("Accidents by Hours of the Day")
+    ### Commented - Lack of space to put tick labels for each hour
+    # # put value labes for Y-Axis 
+    # for i, v in enumerate(hourCounts):
+    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+    #     plt.text(xlocs[i] -0.125, v + 0.01, str(v))
+    
+    # Define & Save: Output file - Bar chart
+    outputFile = outputFilePath + outputFileSubPath + 'HourOfDay_Accidents_Counts.jpg'
+    saveChart(outputFile)
+    plt.close()
+
+
+####################################################################################################################################################################################
+# Function: Analyze by Day  
+####################################################################################################################################################################################
+def accidentsByDay(dayResults: dict):
+
+    outputFileSubPath = 'ByDay/'
+
+    # Chart by day of the week
+
+    # Get unique hours & counts
+    weekdayCounts = dayResults['Weekday']['Count'].tolist()
+    weekdayLabels = dayResults['Weekday'].index.tolist()
+
+    # Plot the bar grapgh
+    plt.figure(figsize=(12, 8))
+  
+    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
+    # colors
+    barColors = ['royalblue']
+ 
+    # X-Axis limits & label: 
+    plt.xlim(-0.75, len(weekdayLabels)-0.25)
+    plt.xlabel("Weekday")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+0 for i in range(0,len(weekdayCounts))]
+    xlabs=[i for i in weekdayLabels]
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label: 
+    plt.ylim(0, max(weekdayCounts)+25000)
+    plt.ylabel("Count of Accidents")
+    # Plot 
+    plt.bar(weekdayLabels, weekdayCounts, alpha=0.5, align="center", color=barColors)
+    plt.title("Accidents by Day of the Week")
+    # put value labes for Y-Axis 
+    for i, v in enumerate(weekdayCounts):
+        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+        plt.text(xlocs[i] -0.30, v + 0.01, str(v))
+    
+    # Define & Save: Output file - Bar chart
+    outputFile = outputFilePath + outputFileSubPath + 'DayOfWeek_Accidents_Counts.jpg'
+    saveChart(outputFile)
+    plt.close()
+
+    
+####################################################################################################################################################################################
+# Function: by Month of Year  
+####################################################################################################################################################################################
+def accidentsByMonth(monthResults: dict):
+
+    outputFileSubPath = 'ByMonth/'
+
+    # Get unique hours & counts
+    monthCounts = monthResults['Month']['Count'].tolist()
+    monthLabels = monthResults['Month'].index.tolist()
+    
+    # Get counts by YYYY-MM
+    yyyymmDF = monthResults['Year-Month']
+    years = yyyymmDF['Year'].unique().tolist()
+
+    monthIndex = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+    # colors
+    barColors = ['royalblue']
+
+    # 1. Plot the bar grapgh
+    plt.figure(figsize=(12, 8))
+    # plt.bar(monthLabels, monthCounts, alpha=0.5, align="center")
+    plt.bar(monthLabels, monthCounts, alpha=0.5, align="center", color=barColors)
+
+    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
+    # title
+    plt.title("Accidents by Month of the Year")
+
+    # X-Axix limits & label: 
+    plt.xlim(-0, len(monthLabels)+.5)
+    plt.xlabel("Month")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+1 for i in range(0,len(monthCounts))]
+    # xlabs=[i+1 for i in range(0,len(monthCounts))]
+    xlabs=[i for i in monthIndex]
+    plt.xticks(xlocs, xlabs)
+    plt.ylim(0, max(monthCounts)+5000)
+    plt.ylabel("Count of Accidents")
+
+    # put value labes for Y-Axis 
+    for i, v in enumerate(monthCounts):
+        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+        plt.text(xlocs[i] -0.30, v + 0.01, str(v))
+
+   # Define & Save: Output file - Bar chart
+    outputFile = outputFilePath  + outputFileSubPath + 'MonthOfYear_Accidents_Counts.jpg'
+    saveChart(outputFile)
+    plt.close()
+
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 2. Plot a line graph comparing monthly progression by year 
+    plt.figure(figsize=(12, 8))
+
+    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
+    # colors (repeated if more years)
+    lineColors = ['royalblue', 'darkorange', 'forestgreen', 'firebrick', 'mediumpurple', 'sienna', 'orchid', 'grey', 'olive', 'teal']
+    # title
+    plt.title("Accidents per Month for Year " + ' & '.join(str(year) for year in years))
+    # 1 line per year - at the position of each month with data (a year may not have all months)
+    for i, year in enumerate(years):
+        yearDF = yyyymmDF[yyyymmDF['Year'] == year]
+        yearMonths = [int(label[-2:]) - 1 for label in yearDF.index]
+        plt.plot(yearMonths, yearDF['Count'].tolist(), marker = ' ', color = lineColors[i % len(lineColors)], label = str(year), linewidth=3)
+    plt.xticks(range(len(monthIndex)), monthIndex)
+    plt.legend()
+
+
+   # Define & Save: Output file - Bar chart
+    outputFile = outputFilePath  + outputFileSubPath + 'MonthOfYear_2_Compare_Accidents_Counts.jpg'
+    saveChart(outputFile)
+    plt.close()
+
+    print("Graph plotted: " + outputFile)
+
+
+
+####################################################################################################################################################################################
+# Function: by Weather  
+####################################################################################################################################################################################
+def accidentsByWeather(weatherResults: dict):
+
+    outputFileSubPath = 'ByWeather/'
+
+    # Counts by weather condition - in descending order
+    weatherCounts = weatherResults['Weather_Condition']['Count']
+    weatherLabels = weatherCounts.index.tolist()
+
+    barColors = ['royalblue']
+
+
+    # Count of Accidents by Weather Condition:
+
+    # Plot the bar grapgh
+    plt.figure(figsize=(16, 12))
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(weatherLabels[:10])-0.25)
+    plt.xlabel("Weather Condition")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i for i in range(0,len(weatherLabels[:10]))]
+    xlabs=weatherLabels[:10]
+    plt.xticks(xlocs, xlabs, rotation = 45)
+    # Y-Axis limits & label
+    plt.ylim(0, max(weatherCounts[:10])+25000)
+    plt.ylabel("Count of Accident(s)")
+    # Plot the chart
+    plt.bar(weatherLabels[:10], weatherCounts[:10], color=barColors, alpha=0.5, align="center")
+    plt.title("Accidents by Top 10 Weather Conditions")
+    
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'Weather_Accidents_Counts_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+####################################################################################################################################################################################
+# Function: by State  
+####################################################################################################################################################################################
+def accidentsByState(stateResults: dict):
+
+    outputFileSubPath = 'ByState/'
+
+    # Count, average severity, weighted severity index & accidents per 1000 people / 1000 sq miles by state - in descending order of count
+    stateResultsDF = stateResults['State']
+
+    stateCounts = stateResultsDF['Count']
+    stateLabels = stateCounts.index.tolist()
+
+    barColors = ['royalblue']
+
+
+    # 1. Count of Accidents by State:
+
+    # Plot the bar grapgh
+    plt.figure(figsize=(16, 12))
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(stateLabels)-0.25)
+    plt.xlabel("State")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i for i in range(0,len(stateLabels))]
+    xlabs=stateLabels
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(stateCounts)+25000)
+    plt.ylabel("Count of Accident(s)")
+    # Plot the chart
+    plt.bar(stateLabels, stateCounts, color=barColors, alpha=0.5, align="center")
+    plt.title("Accidents by State(s)")
+    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
+    # # put value labes for Y-Axis 
+    # for i, v in enumerate(stateCounts):
+    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+    #     plt.text(xlocs[i] -0.10, v + 0.01, str(v))
+    
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_1_Counts_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 2. Average severity of accident by State
+
+    # Mean (avg) sev for each state:
+    stateAvgSev = stateResultsDF['Avg Severity'].tolist()
+
+    # Sort the list descending before plotting
+    stateLabels2 = stateLabels
+    stateAvgSev2 = stateAvgSev
+    stateAvgSev2, stateLabels2 = zip(*sorted(zip(stateAvgSev2, stateLabels2), reverse=True))
+ 
+
+    # Set the plot attributes & Plot the Bar chart
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(stateLabels2)-0.25)
+    plt.xlabel("State")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+1 for i in range(0,len(stateAvgSev2))]
+    xlabs=[i/2 for i in range(0,len(stateAvgSev2))]
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(stateAvgSev2)+0.500)
+    plt.ylabel("Avergare Severity of Accident")
+    # Plot the chart:
+    plt.figure(figsize=(16, 12))
+    plt.bar(stateLabels2, stateAvgSev2, color=barColors, alpha=0.5, align="center")
+    plt.title("Average Accidents Severity per State(s)")
+    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
+    # # put value labes for Y-Axis 
+    # for i, v in enumerate(stateAvgSev2):
+    #     # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
+    #     plt.text(xlocs[i] -1.10, v + 0.01, str(v))
+    
+    # Define & Save: Output file - Pie chart
+    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_2_AvgSev_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+    
+
+    # 3. Weighted Severity Index per 1000 accidents by State (see getSeverityStats for the calculation)
+    stateWeigthedSevIndex = stateResultsDF['Weighted Severity Index'].tolist()
+
+    # Done for all states
+
+    # Sort the list descending before plotting
+    stateLabels2 = stateLabels
+    stateWeigthedSevIndex2 = stateWeigthedSevIndex
+    stateWeigthedSevIndex2, stateLabels2 = zip(*sorted(zip(stateWeigthedSevIndex2, stateLabels2), reverse=True))
+
+
+    # Set the plot attributes & Plot the Bar chart
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(stateLabels2)-0.25)
+    plt.xlabel("State")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i+1 for i in range(0,len(stateWeigthedSevIndex2))]
+    xlabs=[i/2 for i in range(0,len(stateWeigthedSevIndex2))]
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(stateWeigthedSevIndex2)+10.00)
+    plt.ylabel("Weighted Severity Index per 1000 Accidents")
+    # Plot the chart:
+    plt.figure(figsize=(16, 12))
+    plt.bar(stateLabels2, stateWeigthedSevIndex2, color=barColors, alpha=0.5, align="center")
+    plt.title("Weighted Severity of Accidents in Different State(s) (per 1000 Accidents)")
+    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
+    # # put value labes for Y-Axis 
+    # for i, v in enumerate(stateWeigthedSevIndex2):
+    #     # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
+    #     plt.text(xlocs[i] -1.10, v + 0.01, str(v))
+
+    # Define & Save: Output file - Pie chart
+    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_3_WeightedSevIndex_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 4. Bar Chart: Number of accidents by state per year per 1000 people (see getStateResults for the calculation)
+    # States without a population (no rate) left out
+    stateRates = getKnownRates(stateResultsDF['Accidents per 1000 People'], 'State accidents per 1000 people')
+    stateCountsPerYearPer1000PopulationList = stateRates.tolist()
+
+
+    # Calculations done - have the data now plot the bar chart  
+
+    # Sort the list descending before plotting
+    stateLabels2 = stateRates.index.tolist()
+    stateCountsPerYearPer1000PopulationList2 = stateCountsPerYearPer1000PopulationList
+    stateCountsPerYearPer1000PopulationList2, stateLabels2 = zip(*sorted(zip(stateCountsPerYearPer1000PopulationList2, stateLabels2), reverse=True)) if len(stateLabels2) > 0 else ((), ())
+
+    # Set the plot attributes & Plot the Bar chart
+    plt.figure(figsize=(16, 12))
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(stateLabels2)-0.25)
+    plt.xlabel("State")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i for i in range(0,len(stateLabels2))]
+    xlabs=stateLabels2
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(stateCountsPerYearPer1000PopulationList2, default=0)+0.250)
+    plt.ylabel("Accident(s) per 1000 People")
+    # Plot the chart
+    plt.bar(stateLabels2, stateCountsPerYearPer1000PopulationList2, color=barColors, alpha=0.5, align="center")
+    plt.title("Accidents in Different State(s) per Population of 1000")
+    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
+    # # put value labes for Y-Axis 
+    # for i, v in enumerate(stateCountsPerYearPer1000PopulationList2):
+    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+    #     plt.text(xlocs[i] -0.10, v + 0.01, str(v))
+    
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_4_Counts_1000_People_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 5. Bar Chart: Number of accidents by state per year per 1000 sq miles (see getStateResults for the calculation)
+    # States without a land area (no rate) left out
+    stateAreaRates = getKnownRates(stateResultsDF['Accidents per 1000 Sq Miles'], 'State accidents per 1000 sq miles')
+    stateCountsPerYearPer1000SqMilesList = stateAreaRates.tolist()
+
+
+    # Calculations done - have the data now plot the bar chart  
+
+    # Sort the list descending before plotting
+    stateLabels2 = stateAreaRates.index.tolist()
+    stateCountsPerYearPer1000SqMilesList2 = stateCountsPerYearPer1000SqMilesList
+    stateCountsPerYearPer1000SqMilesList2, stateLabels2 = zip(*sorted(zip(stateCountsPerYearPer1000SqMilesList2, stateLabels2), reverse=True)) if len(stateLabels2) > 0 else ((), ())
+
+    # Set the plot attributes & Plot the Bar chart
+    plt.figure(figsize=(16, 12))
+    # X-Axix limits & label: 
+    plt.xlim(-0.75, len(stateLabels2)-0.25)
+    plt.xlabel("State")
+    xlocs, xlabs = plt.xticks()
+    xlocs=[i for i in range(0,len(stateLabels2))]
+    xlabs=stateLabels2
+    plt.xticks(xlocs, xlabs)
+    # Y-Axis limits & label
+    plt.ylim(0, max(stateCountsPerYearPer1000SqMilesList2, default=0)+500)
+    plt.ylabel("Accident(s) per 1000 Sq Miles")
+    # Plot the chart
+    plt.bar(stateLabels2, stateCountsPerYearPer1000SqMilesList2, color=barColors, alpha=0.5, align="center")
+    plt.title("Accidents in Different State(s) per 1000 Sq Miles of Land Area")
+    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
+    # # put value labes for Y-Axis 
+    # for i, v in enumerate(stateCountsPerYearPer1000SqMilesList2):
+    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
+    #     plt.text(xlocs[i] -0.10, v + 0.01, str(v))
+    
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_5_Counts_1000_SqMiles_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+####################################################################################################################################################################################
+# Function: by Hourss of the Day per Month of Year  
+####################################################################################################################################################################################
+def accidentsByMonthByHours(monthByHoursResults: dict):
+
+    outputFileSubPath = 'ByMonth/ByHour/'
+
+    # Counts of hours by month (rows: YYYY-MM, columns: hour)
+    yearMonthHourCounts = monthByHoursResults['Year-Month-Hour']
+
+    # Get unique months
+    monthLabels = yearMonthHourCounts.index.tolist()
+
+    # Hours Index for labels
+    hourIndex = ['0-1', '1-2', '2-3', '3-4', '4-5', '5-6', '6-7', '7-8', '8-9', '9-10', '10-11', '11-12', '12-13', '13-14', '14-15', '15-16', '16-17', '17-18', '18-19', '19-20', '20-21', '21-22', '22-23', '23-24']
+
+    # Plot attributes 
+    plt.figure(figsize=(16, 12))
+    plt.title("Accidents per Hour by Month of Year")
+
+    # Repeat for each month:
+    for m in monthLabels:
+        # Counts of all hours (0 for hours without accidents - each count stays at its hour)
+        hourCounts = yearMonthHourCounts.loc[m].tolist()
+        plt.plot(hourIndex, hourCounts, marker = ' ', label = m, linewidth=2)
+
+    # Done all months 
+    plt.legend()
+
+   # Define & Save: Output file - Bar chart
+    outputFile = outputFilePath  + outputFileSubPath + 'Accidents_Hour_MonthOfYear_1_Compare_Accidents_Counts.jpg'
+    saveChart(outputFile)
+    plt.close()
+
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 2. Heatmap of accidents by hour of the day & month of the year (all years)
+    hourMonthCounts = monthByHoursResults['Hour-Month']
+    monthIndex = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+    plt.figure(figsize=(12, 12))
+    plt.title("Accidents by Hour of the Day & Month of the Year")
+    plt.imshow(hourMonthCounts.to_numpy(), aspect='auto', cmap='YlOrRd')
+    plt.colorbar(label="Count of Accidents")
+
+    # X-Axis: months, Y-Axis: hours
+    plt.xlabel("Month")
+    plt.xticks(range(len(hourMonthCounts.columns)), [monthIndex[m - 1] for m in hourMonthCounts.columns])
+    plt.ylabel("Hour")
+    plt.yticks(range(len(hourMonthCounts.index)), [hourIndex[h] for h in hourMonthCounts.index])
+
+   # Define & Save: Output file - Heatmap
+    outputFile = outputFilePath  + outputFileSubPath + 'Accidents_Hour_MonthOfYear_2_Heatmap_Accidents_Counts.jpg'
+    saveChart(outputFile)
+    plt.close()
+
+    print("Graph plotted: " + outputFile)
+
+
+
+####################################################################################################################################################################################
+# Function: by County (of a State)  
+####################################################################################################################################################################################
+def accidentsByCounty(countyResults: dict):
+    accidentsByDrillDownKey(countyResults, 'County-State', 'County', 'ByCounty/')
+
+####################################################################################################################################################################################
+# Function: by City (of a State)  
+####################################################################################################################################################################################
+def accidentsByCity(cityResults: dict):
+    accidentsByDrillDownKey(cityResults, 'City-State', 'City', 'ByCity/')
+
+####################################################################################################################################################################################
+# Function: by Zipcode  
+####################################################################################################################################################################################
+def accidentsByZipcode(zipcodeResults: dict):
+    accidentsByDrillDownKey(zipcodeResults, 'Zipcode', 'Zipcode', 'ByZipcode/')
+
+####################################################################################################################################################################################
+# Function: by a drill-down key (County, City, Zipcode) - horizontal bars of the top keys only (thousands of keys)  
+####################################################################################################################################################################################
+def accidentsByDrillDownKey(drillDownResults: dict, key: str, keyName: str, outputFileSubPath: str):
+
+    # Output directory of the drill-down charts (not in the repository)
+    os.makedirs(outputFilePath + outputFileSubPath, exist_ok=True)
+
+    barColors = ['royalblue']
+
+
+    # 1. Count of Accidents by the top keys (top key at the top)
+    topCounts = drillDownResults[key]['Count']
+
+    plt.figure(figsize=(16, 12))
+    plt.barh(topCounts.index.tolist()[::-1], topCounts.tolist()[::-1], color=barColors, alpha=0.5, align="center")
+    plt.xlabel("Count of Accident(s)")
+    plt.ylabel(keyName)
+    plt.title("Accidents by Top {} {}".format(len(topCounts), keyName))
+    plt.tight_layout()
+
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + keyName + '_Accidents_1_Counts_Top_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+    # 2. Weighted Severity Index of the top keys (keys with few accidents not ranked)
+    topSeverity = drillDownResults[key + ' by Severity']['Weighted Severity Index']
+    if len(topSeverity) == 0:
+        print("Graph not plotted: no {} with at least {} accidents".format(keyName, drillDownMinCount))
+        return
+
+    plt.figure(figsize=(16, 12))
+    plt.barh(topSeverity.index.tolist()[::-1], topSeverity.tolist()[::-1], color=barColors, alpha=0.5, align="center")
+    plt.xlabel("Weighted Severity Index")
+    plt.ylabel(keyName)
+    plt.title("Top {} {} by Weighted Severity Index".format(len(topSeverity), keyName))
+    plt.tight_layout()
+
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + keyName + '_Accidents_2_Weighted_Severity_Index_Top_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+
+
+####################################################################################################################################################################################
+# Function: Preview of the approximate mode (sketches) - estimates with their error bounds  
+####################################################################################################################################################################################
+def accidentsPreview(previewResults: dict):
+
+    outputFileSubPath = 'Preview/'
+
+    # Output directory of the preview charts (not in the repository)
+    os.makedirs(outputFilePath + outputFileSubPath, exist_ok=True)
+
+    sampleFraction = previewResults['Sketches'].loc['Sample Fraction', 'Value']
+    titleSuffix = " (approximate - {:.0%} of the input)".format(sampleFraction)
+
+
+    # 1. - 3. Estimated counts by State, Hour & Weekday with error bars (lower - upper bound)
+    for chartNum, key, keyName in [(1, 'State', "State"), (2, 'Hour', "Hour of the Day"), (3, 'Weekday', "Day of the Week")]:
+        keyCounts = previewResults[key]
+
+        plt.figure(figsize=(16, 12))
+        plotErrorBars(keyCounts['Estimate'], keyCounts['Lower'], keyCounts['Upper'])
+        plt.xlabel(keyName)
+        plt.ylabel("Count of Accident(s)")
+        plt.title("Accidents by " + keyName + titleSuffix)
+
+        # Save output file 
+        outputFile = outputFilePath + outputFileSubPath + 'Preview_{}_{}_Accidents_Counts_Bar.jpg'.format(chartNum, key)
+        saveChart(outputFile)
+        plt.close()
+        print("Graph plotted: " + outputFile)
+
+
+
+    # 4. - 5. Top weather conditions & cities (horizontal bars, top at the top)
+    for chartNum, key, keyName in [(4, 'Weather_Condition', "Weather Conditions"), (5, 'City-State', "Cities")]:
+        topKeys = previewResults[key].iloc[::-1]
+
+        plt.figure(figsize=(16, 12))
+        plt.barh(topKeys.index.tolist(), topKeys['Estimate'], xerr=[topKeys['Estimate'] - topKeys['Lower'], topKeys['Upper'] - topKeys['Estimate']], 
+                 color=['royalblue'], alpha=0.5, align="center", capsize=3)
+        plt.xlabel("Count of Accident(s)")
+        plt.title("Accidents by Top {} {}".format(len(topKeys), keyName) + titleSuffix)
+        plt.tight_layout()
+
+        # Save output file 
+        outputFile = outputFilePath + outputFileSubPath + 'Preview_{}_{}_Accidents_Top_Bar.jpg'.format(chartNum, keyName.replace(' ', '_'))
+        saveChart(outputFile)
+        plt.close()
+        print("Graph plotted: " + outputFile)
+
+
+
+    # 6. Average severity by State from the sampled rows (95% confidence interval)
+    stateSeverity = previewResults['State Severity']
+
+    plt.figure(figsize=(16, 12))
+    plotErrorBars(stateSeverity['Avg Severity'], stateSeverity['Lower'], stateSeverity['Upper'])
+    plt.ylim(0, stateSeverity['Upper'].max() + 0.5)
+    plt.xlabel("State")
+    plt.ylabel("Average Severity of Accident")
+    plt.title("Average Accidents Severity per State" + titleSuffix)
+
+    # Save output file 
+    outputFile = outputFilePath + outputFileSubPath + 'Preview_6_State_AvgSev_Bar.jpg'
+    saveChart(outputFile)
+    plt.close()
+    print("Graph plotted: " + outputFile)
+
+####################################################################################################################################################################################
+# Function: Plot estimates as bars with error bars (lower - upper bound)  
+####################################################################################################################################################################################
+def plotErrorBars(estimates, lowerBounds, upperBounds):
+
+    barLabels = [str(label) for label in estimates.index]
+    plt.bar(barLabels, estimates, yerr=[estimates - lowerBounds, upperBounds - estimates], color=['royalblue'], alpha=0.5, align="center", capsize=3)
+    plt.xlim(-0.75, len(barLabels) - 0.25)
+
+
+
+####################################################################################################################################################################################
+# Function: Get the rates of the keys that have one (no rate: no population / land area for the key) - the keys left out of the chart are printed  
+####################################################################################################################################################################################
+def getKnownRates(rates, chartName: str):
+
+    missingKeys = rates.index[rates.isna()].tolist()
+    if len(missingKeys) > 0:
+        print("Graph {}: left out (no rate): {}".format(chartName, ', '.join(str(key) for key in missingKeys)))
+
+    return rates.dropna()
+
+
+
+####################################################################################################################################################################################
+# Analyses (charts) by name
+####################################################################################################################################################################################
+analysisFunctionsDict = {"weather" : accidentsByWeather, 
+                         "state" : accidentsByState, 
+                         "timezone" : accidentsByTimezone, 
+                         "month" : accidentsByMonth, 
+                         "monthbyhours" : accidentsByMonthByHours, 
+                         "day" : accidentsByDay, 
+                         "hour" : accidentsByHour, 
+                         "county" : accidentsByCounty, 
+                         "city" : accidentsByCity, 
+                         "zipcode" : accidentsByZipcode, 
+                         "preview" : accidentsPreview}
+
+####################################################################################################################################################################################
+# Function: Plot the charts of the analyses results - one after another or in a pool of processes (each analysis in a process) - chart files saved by analysis  
+####################################################################################################################################################################################
+def renderAnalyses(analysisResults: dict, processes: int = 1) -> dict:
+
+    if processes <= 1:
+        return {analysisName: renderAnalysis(analysisName, results) for analysisName, results in analysisResults.items()}
+
+    # Each analysis is sent with its results (larger ones first)
+    with ProcessPoolExecutor(max_workers=min(processes, len(analysisResults))) as executor:
+        futures = {analysisName: executor.submit(renderAnalysis, analysisName, analysisResults[analysisName]) for analysisName in sorted(analysisResults, key=getAnalysisOrder)}
+        # Wait for all & raise any error of an analysis
+        return {analysisName: futures[analysisName].result() for analysisName in analysisResults}
+
+####################################################################################################################################################################################
+# Function: Plot the charts of 1 analysis - chart files saved
+####################################################################################################################################################################################
+def renderAnalysis(analysisName: str, results: dict) -> list:
+
+    savedChartsList.clear()
+    runStage('chart:' + analysisName, analysisFunctionsDict[analysisName], results)
+
+    return list(savedChartsList)
+
+####################################################################################################################################################################################
+# Function: Save the current chart to a file (measured as a stage)  
+####################################################################################################################################################################################
+def saveChart(outputFile: str):
+    runStage('savefig:' + os.path.basename(outputFile), plt.savefig, outputFile)
+    savedChartsList.append(outputFile)
+
+####################################################################################################################################################################################
+# Function: Order of the analyses in the pool - analyses with more charts first  
+####################################################################################################################################################################################
+def getAnalysisOrder(analysisName: str) -> int:
+    return ['timezone', 'state', 'month', 'monthbyhours', 'weather', 'day', 'hour', 'county', 'city', 'zipcode', 'preview'].index(analysisName)
+
+
+####################################################################################################################################################################################
@@ -6,17 +6,93 @@
 import pandas as pd
 import os
 import numpy as np
-import matplotlib.pyplot as plt
-import datetime as dt
+import json
+import glob
+import heapq
+import gzip
+import bz2
+import time
+
+# Import functions
+from UsAccidentsAnalysisInstrumentation import runStage
 
 # Import configurations & global data
 from Configs import inputFileName
 from Configs import inputFilePath
-from Configs import outputFilePath
-from Configs import numOfYears
+from Configs import metricsFilePath
 from Configs import timezonePopulationDict
 from Configs import statesPopulationDict
 from Configs import statesLandSqMilesDict
+from Configs import statesPopulationFile
+from Configs import timezonePopulationFile
+from Configs import countiesPopulationFile
+from Configs import citiesPopulationFile
+from Configs import drillDownTopN
+from Configs import drillDownMinCount
+from Configs import requiredColumnsList
+from Configs import analysisColumnsList
+from Configs import typedIngest
+from Configs import inputColumnsDtypeDict
+from Configs import ingestSampleRows
+from Configs import streamingChunkSize
+from Configs import yearFrom
+from Configs import yearTo
+from Configs import startTimeFormat
+from Configs import severityWeightsList
+from Configs import weatherTopN
+
+# Weekday names by weekday key (0 = Monday)
+weekdayNamesList = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Parts of the accidents cube & their dimension columns (see getAccidentsCube)
+cubePartsDict = {"Main" : ['State', 'Timezone', 'Year', 'Month', 'Hour', 'Weekday', 'Severity'], 
+                 "Weather" : ['Weather_Condition', 'Severity'], 
+                 "County" : ['County-State', 'Severity'], 
+                 "City" : ['City-State', 'Severity'], 
+                 "Zipcode" : ['Zipcode', 'Severity']}
+
+# Dimension columns of the accidents cube needed by each analysis
+analysisDimsDict = {"weather" : ['Weather_Condition', 'Severity'], 
+                    "state" : ['State', 'Severity'], 
+                    "timezone" : ['Timezone', 'Severity'], 
+                    "month" : ['Year', 'Month'], 
+                    "monthbyhours" : ['Year', 'Month', 'Hour'], 
+                    "day" : ['Weekday'], 
+                    "hour" : ['Hour'], 
+                    "county" : ['County-State', 'Severity'], 
+                    "city" : ['City-State', 'Severity'], 
+                    "zipcode" : ['Zipcode', 'Severity']}
+
+# Dimensions combining input columns (county & city names are not unique across states): label = values of the columns joined, e.g. 'Orange, CA'
+compoundDimsDict = {"County-State" : ['County', 'State'], 
+                    "City-State" : ['City', 'State']}
+
+# Date columns (derived from Start_Time)
+dateColumnsList = ['Year', 'Month', 'Hour', 'Year-Month', 'Weekday']
+
+# Time dimensions of the accidents cube: all keys are kept (a key without accidents has a 0 count) - Year: from the first to the last year of the data
+timeDimsList = ['Year', 'Month', 'Hour', 'Weekday']
+
+# Keys of the time dimensions with a fixed range (see addDateColumns)
+timeKeysDict = {"Month" : np.arange(1, 13, dtype='int8'), 
+                "Hour" : np.arange(24, dtype='int8'), 
+                "Weekday" : np.arange(7, dtype='int8')}
+
+# Columns of the input file not used for the analysis (removed by the clean up)
+unusedColumnsList = ['End_Lat', 'End_Lng', 'End_Time', 'Distance(mi)', 'Number', 'Street', 'Side', 'Wind_Chill(F)', 'Wind_Direction', 'Civil_Twilight', 
+                     'Nautical_Twilight', 'Astronomical_Twilight', 'Temperature(F)', 'Humidity(%)', 'Pressure(in)', 'Visibility(mi)']
+
+# Low cardinality columns held as categoricals (the ones typed as category at ingest)
+categoryColumnsList = [col for col, dtype in inputColumnsDtypeDict.items() if dtype == 'category']
+
+# Label of the bucket of weather conditions not in the top N
+otherBucketLabel = '(Other)'
+
+# Label of the rows without a value for a dimension (only columns not required by the clean up, e.g. Zipcode)
+unknownKeyLabel = '(Unknown)'
+
+# Compressed input files (by suffix) - decompressed as a stream when read (.zst needs the zstandard package)
+compressedSuffixesList = ['.gz', '.bz2', '.zst']
 
 ####################################################################################################################################################################################
 # Function(s) Definitions:
@@ -27,922 +103,815 @@ from Configs import statesLandSqMilesDict
 
 
 ####################################################################################################################################################################################
-# Function: Get input file 
+# Function: Get input files - the input file name may be a glob pattern (e.g. monthly files: US_Accidents_*.csv.gz), files in name order 
+####################################################################################################################################################################################
+def getInputFiles() -> list:
+
+    inputPattern = inputFilePath + inputFileName
+    inputFiles = sorted(glob.glob(inputPattern)) if glob.has_magic(inputPattern) else [inputPattern]
+    if len(inputFiles) == 0:
+        raise FileNotFoundError("No input files match: " + inputPattern)
+
+    print("Input file{} is: {}".format('s' if len(inputFiles) > 1 else '', ', '.join(inputFiles)))
+    return inputFiles
+
+####################################################################################################################################################################################
+# Function: Check if an input file is compressed (by its suffix) 
+####################################################################################################################################################################################
+def isCompressedFile(inputFile) -> bool:
+    return isinstance(inputFile, str) and os.path.splitext(inputFile)[1].lower() in compressedSuffixesList
+
+####################################################################################################################################################################################
+# Function: Open an input file as a stream of bytes - decompressed as it is read if compressed 
 ####################################################################################################################################################################################
-def getInputFile():
-    inputFile = inputFilePath + inputFileName
-    print("Input file is: " + inputFile)
-    return inputFile
+def openInputFile(inputFile: str):
+
+    suffix = os.path.splitext(inputFile)[1].lower()
+    if suffix == '.gz':
+        return gzip.open(inputFile, 'rb')
+    if suffix == '.bz2':
+        return bz2.open(inputFile, 'rb')
+    if suffix == '.zst':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(inputFile, 'rb'), closefd=True)
+
+    return open(inputFile, 'rb')
 
 ####################################################################################################################################################################################
 # Function: Get initial data from input file as dataframe  
 ####################################################################################################################################################################################
-def getInputData(inputFile: str) -> pd.DataFrame:
+def getInputData(inputFile: str, inputColumns: list = None) -> pd.DataFrame:
+
+    # Typed ingest: parse only the columns needed with compact data types
+    if typedIngest:
+        return getTypedInputData(inputFile, inputColumns)
+
     inputDF = pd.read_csv(inputFile)
     print("Dataframe created")
     return inputDF
 
+####################################################################################################################################################################################
+# Function: Get the list of columns needed from the input file  
+####################################################################################################################################################################################
+def getInputColumns(cubeParts: dict = None) -> list:
+
+    # Columns used by the analysis: all, or only the ones for the dimensions of the cube parts (date columns come from Start_Time)
+    if cubeParts is None:
+        analysisColumns = analysisColumnsList
+    else:
+        analysisColumns = []
+        for dim in [dim for partDims in cubeParts.values() for dim in partDims]:
+            if dim in dateColumnsList:
+                analysisColumns.append('Start_Time')
+            else:
+                analysisColumns.extend(compoundDimsDict.get(dim, [dim]))
+
+    # Columns needed = columns checked during clean up + columns used by the analysis (in that order, no duplicates)
+    # Note: the columns checked during clean up are always needed - the rows analysed are the same whatever the analyses run
+    inputColumns = []
+    for col in requiredColumnsList + analysisColumns:
+        if col not in inputColumns:
+            inputColumns.append(col)
+
+    return inputColumns
+
+####################################################################################################################################################################################
+# Function: Get the data types of the columns needed from the input file  
+####################################################################################################################################################################################
+def getInputDtypes(inputColumns: list) -> dict:
+    return {col: inputColumnsDtypeDict[col] for col in inputColumns if col in inputColumnsDtypeDict}
+
+####################################################################################################################################################################################
+# Function: Get initial data from input file as dataframe - only the columns needed with compact data types  
+####################################################################################################################################################################################
+def getTypedInputData(inputFile: str, inputColumns: list = None) -> pd.DataFrame:
+
+    # Columns & data types to parse
+    if inputColumns is None:
+        inputColumns = getInputColumns()
+    inputDtypes = getInputDtypes(inputColumns)
+
+    # Parse the input file & time it
+    startTime = time.perf_counter()
+    inputDF = pd.read_csv(inputFile, usecols=inputColumns, dtype=inputDtypes)
+    parseTime = time.perf_counter() - startTime
+
+    # Memory used by the dataframe (in MB)
+    typedMemoryMB = inputDF.memory_usage(deep=True).sum() / (1024 * 1024)
+    print("Dataframe created (typed ingest): {} rows, {} columns, parse time: {:.2f} sec, memory: {:.1f} MB".format(len(inputDF), len(inputDF.columns), parseTime, typedMemoryMB))
+
+    # Estimate the memory saved vs. parsing all columns as is - from a sample of rows
+    if ingestSampleRows > 0 and len(inputDF) > 0:
+        sampleRows = min(ingestSampleRows, len(inputDF))
+        untypedSampleDF = pd.read_csv(inputFile, nrows=sampleRows)
+        untypedMemoryMB = untypedSampleDF.memory_usage(deep=True).sum() / (1024 * 1024) * len(inputDF) / sampleRows
+        print("Estimated memory saved by typed ingest: {:.1f} MB (all {} columns: ~{:.1f} MB)".format(untypedMemoryMB - typedMemoryMB, len(untypedSampleDF.columns), untypedMemoryMB))
+
+    return inputDF
+
 ####################################################################################################################################################################################
 # Function: Cleanup initial data from input file  
 ####################################################################################################################################################################################
-def cleanInputData(inputDF: pd.DataFrame) -> pd.DataFrame:
-    
-    
+def cleanInputData(inputDF: pd.DataFrame, printCounts: bool = True, yearRange: tuple = (yearFrom, yearTo)) -> pd.DataFrame:
+
     # Save counts for later analysis
     columnCountBeforeCleanup = len(inputDF.columns)
-    rowCountBeforeCleanup = inputDF['ID'].count()
-    
-    # Remove columns not being used for analysis
-    inputDF.drop(columns=['End_Lat', 'End_Lng', 'End_Time', 'Distance(mi)', 'Number', 'Street', \
-                          'Side', 'Wind_Chill(F)', 'Wind_Direction', 'Civil_Twilight', \
-                          'Nautical_Twilight', 'Astronomical_Twilight', 'Temperature(F)', \
-                          'Humidity(%)', 'Pressure(in)', 'Visibility(mi)'], inplace=True)
-
-    # Remove any rows with all columns na/null
-    inputDF.dropna(how = 'all', inplace=True)
-    
-    # For columns being analysed - remove any rows that have na/null value as it cannot be aggregated
-    # These columns are: ID, State, Start_Time, Start_Lat, Start_Lng, Timezone, Weather_Condition, Sunrise_Sunset 
-    inputDF.dropna(subset=['ID', 'State', 'Start_Time', 'Start_Lat', 'Start_Lng', 'Timezone', 'Weather_Condition', 'Sunrise_Sunset'], inplace=True)
+    rowCountBeforeCleanup = len(inputDF)
+
+    # Rows kept: 1 mask of all clean up rules (& Start_Time parsed once - kept as a date column)
+    keepMask, startTime, rowsDeletedDict = getCleanupMask(inputDF, yearRange)
+
+    # Remove columns not being used for analysis & the rows not kept - in 1 pass
+    # Note: with typed ingest these columns are not parsed at all
+    keepColumns = [col for col in inputDF.columns if col not in unusedColumnsList]
+    inputDF = inputDF.loc[keepMask, keepColumns]
+    inputDF['Start_Time'] = startTime[keepMask]
 
+    # Low cardinality columns as categoricals (dictionary encoded: integer codes + labels) - also when not typed at ingest
+    for col in categoryColumnsList:
+        if col in inputDF.columns and not isinstance(inputDF[col].dtype, pd.CategoricalDtype):
+            inputDF[col] = inputDF[col].astype('category')
 
-    # Keep only rows that are for year 2017 & 2018 (data for other years is not consistent):
-    # Drop data less than 2017
-    indexDatesDrop = inputDF[ inputDF['Start_Time'] < '2017-01-00 00:00:00' ].index
-    inputDF.drop(indexDatesDrop , inplace=True)
-    # Drop data more that 2018
-    indexDatesDrop = inputDF[ inputDF['Start_Time'] > '2018-12-31 23:59:59' ].index
-    inputDF.drop(indexDatesDrop , inplace=True)
+    # Categorical columns: remove the categories no longer present after the rows are dropped (not to be counted as 0)
+    for col in inputDF.select_dtypes(include='category').columns:
+        inputDF[col] = inputDF[col].cat.remove_unused_categories()
 
     # Save counts for later analysis (if needed)
     columnCountAfterCleanup = len(inputDF.columns)
-    rowCountAfterCleanup = inputDF['ID'].count()
+    rowCountAfterCleanup = len(inputDF)
 
     columnsDeleted = columnCountBeforeCleanup-columnCountAfterCleanup 
     rowsDeleted = rowCountBeforeCleanup-rowCountAfterCleanup
-    # Print counts of cleanup
-    print("Clean up done, Number of columns deleted: {}, Number of rows deleted: {}".format(columnsDeleted, rowsDeleted))
+    # Print counts of cleanup (& rows deleted by each rule - a row is counted for the 1st rule it fails)
+    if printCounts:
+        print("Clean up done, Number of columns deleted: {}, Number of rows deleted: {} ({})".format(columnsDeleted, rowsDeleted, 
+              ', '.join('{}: {}'.format(rule, count) for rule, count in rowsDeletedDict.items())))
 
     return inputDF
 
+####################################################################################################################################################################################
+# Function: Get the mask of the rows kept by the clean up rules - mask, Start_Time parsed & number of rows deleted by each rule  
+####################################################################################################################################################################################
+def getCleanupMask(inputDF: pd.DataFrame, yearRange: tuple = (yearFrom, yearTo)) -> tuple:
+
+    rowsDeletedDict = {}
+
+    # Rows with all columns na/null
+    keepMask = inputDF.notna().any(axis=1).to_numpy()
+    rowsDeletedDict['all columns null'] = int(len(keepMask) - keepMask.sum())
+
+    # For columns being analysed - rows that have na/null value as it cannot be aggregated
+    # These columns are: ID, State, Start_Time, Start_Lat, Start_Lng, Timezone, Weather_Condition, Sunrise_Sunset 
+    ruleMask = inputDF[requiredColumnsList].notna().all(axis=1).to_numpy()
+    rowsDeletedDict['required column null'] = int((keepMask & ~ruleMask).sum())
+    keepMask = keepMask & ruleMask
+
+    # Start_Time parsed (fixed format; any other format is inferred) - rows with a Start_Time that is not a date
+    startTime = getStartTime(inputDF['Start_Time'])
+    ruleMask = startTime.notna().to_numpy()
+    rowsDeletedDict['Start_Time not a date'] = int((keepMask & ~ruleMask).sum())
+    keepMask = keepMask & ruleMask
+
+    # Rows that are not for the years analysed (default 2017 & 2018 - data for other years is not consistent), all years kept if no range:
+    if yearRange is not None:
+        ruleMask = ((startTime >= pd.Timestamp(year=yearRange[0], month=1, day=1)) & (startTime < pd.Timestamp(year=yearRange[1] + 1, month=1, day=1))).to_numpy()
+        rowsDeletedDict['outside years'] = int((keepMask & ~ruleMask).sum())
+        keepMask = keepMask & ruleMask
+
+    return keepMask, startTime, rowsDeletedDict
+
+####################################################################################################################################################################################
+# Function: Parse the Start_Time values (fixed format; any other format is inferred) - NaT if not a date  
+####################################################################################################################################################################################
+def getStartTime(startTimeValues: pd.Series) -> pd.Series:
+
+    # Already parsed (e.g. cleaned data)
+    if pd.api.types.is_datetime64_any_dtype(startTimeValues.dtype):
+        return startTimeValues
+
+    try:
+        return pd.to_datetime(startTimeValues, format=startTimeFormat)
+    except ValueError:
+        return pd.to_datetime(startTimeValues, errors='coerce')
+
 ####################################################################################################################################################################################
 # Function: Add date columns to the dataframe  
 ####################################################################################################################################################################################
-def addDateColumns(inputDF: pd.DataFrame) -> pd.DataFrame:
+def addDateColumns(inputDF: pd.DataFrame, printColumns: bool = True) -> pd.DataFrame:
 
-    # Add columns for Month, Hour & Weekday
-    inputDF['Year']=pd.to_datetime(inputDF['Start_Time']).dt.year
-    inputDF['Month']=pd.to_datetime(inputDF['Start_Time']).dt.month
-    inputDF['Hour']=pd.to_datetime(inputDF['Start_Time']).dt.hour
-    inputDF['Year-Month']=pd.to_datetime(inputDF['Start_Time']).dt.to_period('M')
-    inputDF['Weekday']=pd.to_datetime(inputDF['Start_Time']).dt.weekday_name
+    # Start_Time parsed once (by the clean up)
+    startTime = getStartTime(inputDF['Start_Time'])
+
+    # Add columns for Year, Month, Hour, Year-Month & Weekday as compact integer keys (labels are added when charts are plotted):
+    #   Year-Month = months since 1970-01 (same as the ordinal of a monthly period), Weekday = 0 (Monday) to 6 (Sunday)
+    inputDF['Year'] = startTime.dt.year.astype('int16')
+    inputDF['Month'] = startTime.dt.month.astype('int8')
+    inputDF['Hour'] = startTime.dt.hour.astype('int8')
+    inputDF['Year-Month'] = ((inputDF['Year'].astype('int32') - 1970) * 12 + inputDF['Month'] - 1).astype('int32')
+    inputDF['Weekday'] = startTime.dt.weekday.astype('int8')
 
     # Print columns added
-    print("Added required date columns to the dataframe")
+    if printColumns:
+        print("Added required date columns to the dataframe")
 
     return inputDF
 
+####################################################################################################################################################################################
+# Function: Get the label (YYYY-MM) of a Year-Month key  
+####################################################################################################################################################################################
+def getYearMonthLabel(yearMonth: int) -> str:
+    return str(pd.Period(year=1970 + yearMonth // 12, month=yearMonth % 12 + 1, freq='M'))
+
+####################################################################################################################################################################################
+# Function: Get the year of a Year-Month key  
+####################################################################################################################################################################################
+def getYearMonthYear(yearMonth) -> int:
+    return 1970 + yearMonth // 12
+
+
+####################################################################################################################################################################################
+# Function: Aggregate the (cleaned & date enriched) data for the analysis - into the accidents cube  
+####################################################################################################################################################################################
+def getAccidentsCube(inputDF: pd.DataFrame, cubeParts: dict = None) -> dict:
+
+    # The accidents cube has dense arrays of counts of accidents by all combinations of the dimension columns, 1 array per part:
+    #   'Main'      : State x Timezone x Year x Month x Hour x Weekday x Severity
+    #   'Weather'   : Weather_Condition x Severity (top N weather conditions + other, once finalized)
+    # Each part: {'dims': dimension columns, 'labels': sorted values per dimension, 'counts': array of counts}
+    # Cubes (e.g. of chunks) can be merged by adding up the counts - all charts are plotted from the cube
+    # Only some parts / dimensions may be built, for the analyses run (see getCubeParts)
+    if cubeParts is None:
+        cubeParts = cubePartsDict
+
+    accidentsCube = {}
+
+    for part, partDims in cubeParts.items():
+        accidentsCube[part] = getDenseCounts(inputDF, partDims)
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Get the parts of the accidents cube (& their dimensions) needed by the analyses  
+####################################################################################################################################################################################
+def getCubeParts(analysisNames: list) -> dict:
+
+    neededDims = [dim for analysisName in analysisNames for dim in analysisDimsDict[analysisName]]
+
+    # Dimensions in more than 1 part (e.g. Severity) do not need a part on their own
+    allDims = [dim for partDims in cubePartsDict.values() for dim in partDims]
+    sharedDims = [dim for dim in allDims if allDims.count(dim) > 1]
 
+    cubeParts = {}
+    for part, partDims in cubePartsDict.items():
+        if any(dim in neededDims and dim not in sharedDims for dim in partDims):
+            cubeParts[part] = [dim for dim in partDims if dim in neededDims]
+
+    return cubeParts
+
+####################################################################################################################################################################################
+# Function: Count rows by all combinations of the dimension columns in a single pass - as a dense array  
+####################################################################################################################################################################################
+def getDenseCounts(inputDF: pd.DataFrame, dims: list) -> dict:
+
+    # Integer codes & sorted labels of each dimension column
+    dimCodes = []
+    dimLabels = []
+    for dim in dims:
+        codes, labels = getDimCodes(inputDF, dim)
+        dimCodes.append(codes)
+        dimLabels.append(labels)
+
+    return getCodesCounts(dims, dimCodes, dimLabels)
+
+####################################################################################################################################################################################
+# Function: Get the integer codes (positions in the sorted labels) & labels of a dimension column - hashed in 1 pass (no per label filtering)  
+####################################################################################################################################################################################
+def getDimCodes(inputDF: pd.DataFrame, dim: str) -> tuple:
+
+    # Compound dimension: from the codes of its columns
+    if dim in compoundDimsDict:
+        return getCompoundCodes([getDimCodes(inputDF, col) for col in compoundDimsDict[dim]])
+
+    dimValues = inputDF[dim]
+    if dim in timeDimsList:
+        # Time keys: the codes are the offsets from the first key - values are not hashed or sorted
+        return getTimeKeyCodes(dimValues.to_numpy(), dim)
+
+    if isinstance(dimValues.dtype, pd.CategoricalDtype) and dimValues.cat.categories.is_monotonic_increasing:
+        # Categoricals (sorted categories): the codes are the positions in the labels already - values are not hashed again
+        codes, labels = dimValues.cat.codes.to_numpy(), dimValues.cat.categories
+    else:
+        codes, labels = pd.factorize(dimValues, sort=True)
+
+    return getKnownCodes(codes, getLabelsArray(labels))
+
+####################################################################################################################################################################################
+# Function: Get the codes & labels of a compound dimension from the codes & labels of its columns - combinations present hashed in 1 pass, labels joined & sorted  
+####################################################################################################################################################################################
+def getCompoundCodes(columnsCodes: list) -> tuple:
+
+    columnCodes = [codes for codes, labels in columnsCodes]
+    columnLabels = [labels for codes, labels in columnsCodes]
+
+    # Rows without a value in any column: unknown (code -1)
+    unknownRows = np.zeros(len(columnCodes[0]), dtype=bool)
+    for codes, labels in columnsCodes:
+        if unknownKeyLabel in labels:
+            unknownRows = unknownRows | (codes == np.searchsorted(labels, unknownKeyLabel))
+
+    # Combinations of the codes as 1 integer - hashed into the codes of the combinations present (unknown rows: -1)
+    knownRows = ~unknownRows
+    combinedCodes = np.ravel_multi_index([codes[knownRows] for codes in columnCodes], tuple(len(labels) for labels in columnLabels))
+    knownCodes, combinations = pd.factorize(combinedCodes)
+    codes = np.full(len(knownRows), -1, dtype='int64')
+    codes[knownRows] = knownCodes
+
+    # Labels of the combinations: values of the columns joined
+    combinationCodes = np.unravel_index(combinations, tuple(len(labels) for labels in columnLabels))
+    labels = np.array([', '.join(values) for values in zip(*[labels[codes].astype(str) for labels, codes in zip(columnLabels, combinationCodes)])], dtype=str)
+
+    return getKnownCodes(codes, labels)
+
+####################################################################################################################################################################################
+# Function: Get codes & labels with the unknown values (code -1) as 1 more label - labels sorted  
+####################################################################################################################################################################################
+def getKnownCodes(codes: np.ndarray, labels: np.ndarray) -> tuple:
+
+    if len(codes) == 0 or codes.min() >= 0:
+        if len(labels) < 2 or bool(np.all(labels[:-1] < labels[1:])):
+            return codes, labels
+    else:
+        labels = np.append(labels, unknownKeyLabel)
+        codes = np.where(codes < 0, len(labels) - 1, codes)
+
+    # Labels sorted (as the labels of merged cubes) & codes moved to the position of their label
+    order = np.argsort(labels, kind='stable')
+    positions = np.empty(len(order), dtype='int64')
+    positions[order] = np.arange(len(order))
+
+    return positions[codes], labels[order]
+
+####################################################################################################################################################################################
+# Function: Get the codes & labels of a time dimension (e.g. Hour) - codes: offsets from the first key, labels: all keys of the dimension  
+####################################################################################################################################################################################
+def getTimeKeyCodes(keyValues: np.ndarray, dim: str) -> tuple:
+
+    if dim in timeKeysDict:
+        labels = timeKeysDict[dim]
+    elif len(keyValues) > 0:
+        labels = np.arange(keyValues.min(), keyValues.max() + 1).astype(keyValues.dtype)
+    else:
+        labels = np.asarray(keyValues[:0])
+
+    codes = keyValues.astype('int64') - int(labels[0]) if len(labels) > 0 else np.zeros(0, dtype='int64')
+
+    return codes, labels
+
+####################################################################################################################################################################################
+# Function: Count rows by all combinations of the integer codes of the dimensions (positions in the sorted labels) - as a dense array  
+# (rows with a count each, e.g. rows of counts by group, if counts given)
 ####################################################################################################################################################################################
-# Function: Analyze by Timezone  
-####################################################################################################################################################################################
-def accidentsByTimezone(inputDF: pd.DataFrame):
-    
-    outputFileSubPath = 'ByTimezone/'
-
-    # Get unique timezones & counts
-    timezonesCounts = inputDF['Timezone'].value_counts().sort_index().tolist()
-    timezonesLabels = inputDF['Timezone'].value_counts().sort_index().index.tolist()
-
-    # Unique list all Severity values in the dataset
-    uniqueSevList = inputDF['Severity'].value_counts(dropna=False).sort_index().index.tolist()
- 
-    # Set colors for timezones
-    timezonesGraphColors = ['royalblue', 'darkorange', 'gold', 'darkolivegreen']
-    # Set colors for severity 
-    severityGraphColors = ['royalblue', 'lightgreen', 'gold', 'darkorange', 'red']
-    
-
-    # 1. Pie Chart (Count(s) of Accidents by timezone)
-    # Set the plot attributes & Plot the Pie chart
-    pieExplode = (0, 0, 0, 0)    
-    plt.figure(figsize=(12, 8))
-    plt.axis("equal")
-    plt.pie(timezonesCounts, explode=pieExplode, colors=timezonesGraphColors, labels=timezonesLabels,
-        autopct="%1.1f%%", shadow=True, startangle=135)
-    plt.title("Accidents in Different Timezone")
-    
-    # Save output file
-    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_1_Counts_Pie.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 2. Bar Chart (Counts by timezone)
-    # Set the plot attributes & Plot the Bar chart
-    plt.figure(figsize=(12, 8))
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(timezonesLabels)-0.25)
-    plt.xlabel("Timezone")
-    xlocs, xlabs = plt.xticks()
-    # xlocs=[i+1 for i in range(0,len(timezonesLabels))]
-    # xlabs=[i/2 for i in range(0,len(timezonesLabels))]
-    xlocs=[i for i in range(0,len(timezonesLabels))]
-    xlabs=timezonesLabels
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(timezonesCounts)+200000)
-    plt.ylabel("Count of Accident(s)")
-    # Plot the chart
-    plt.bar(timezonesLabels, timezonesCounts, color=timezonesGraphColors, alpha=0.5, align="center")
-    plt.title("Accidents in Different Timezone")
-    # put value labes for Y-Axis 
-    for i, v in enumerate(timezonesCounts):
-        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-        plt.text(xlocs[i] -0.10, v + 0.01, str(v))
-    
-    # Save output file 
-    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_2_Counts_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 3. Average severity pf accident by Timezone
-
-    # Empty lists for bar chart to be plotted
-    timezonesAvgSev = []
-    
-    # Extract mean (avg) sev for each timezone:
-    for tz in timezonesLabels:
-        meanSev = inputDF[inputDF['Timezone'] == tz]['Severity'].mean()
-        timezonesAvgSev.append(round(meanSev,3))
-
-    # Set the plot attributes & Plot the Bar chart
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(timezonesLabels)-0.25)
-    plt.xlabel("Timezone")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+1 for i in range(0,len(timezonesAvgSev))]
-    xlabs=[i/2 for i in range(0,len(timezonesAvgSev))]
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(timezonesAvgSev)+0.500)
-    plt.ylabel("Avergare Severity of Accident")
-    # Plot the chart:
-    plt.figure(figsize=(12, 8))
-    plt.bar(timezonesLabels, timezonesAvgSev, color=timezonesGraphColors, alpha=0.5, align="center")
-    plt.title("Average Accidents Severity in Different Timezone")
-    # put value labes for Y-Axis 
-    for i, v in enumerate(timezonesAvgSev):
-        # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
-        plt.text(xlocs[i] -1.10, v + 0.01, str(v))
-    
-    # Define & Save: Output file - Pie chart
-    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_3_AvgSev_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-    
-
-    # 4. Weighted Severity Index per 1000 accidents by Timezone
+def getCodesCounts(dims: list, dimCodes: list, dimLabels: list, rowCounts: np.ndarray = None) -> dict:
+
+    # Combine the codes of all dimensions into 1 flat index & count all combinations at once
+    shape = tuple(len(labels) for labels in dimLabels)
+    flatIndex = np.ravel_multi_index(dimCodes, shape) if len(dimCodes[0]) > 0 else np.zeros(0, dtype='int64')
+    counts = np.bincount(flatIndex, weights=rowCounts, minlength=int(np.prod(shape))).astype('int32').reshape(shape)
+
+    return {"dims": list(dims), "labels": dimLabels, "counts": counts}
+
+####################################################################################################################################################################################
+# Function: Get the labels of a dimension as a numpy array (strings as fixed width strings)  
+####################################################################################################################################################################################
+def getLabelsArray(labels) -> np.ndarray:
+
+    labelsArray = np.asarray(labels)
+    if not np.issubdtype(labelsArray.dtype, np.number):
+        labelsArray = labelsArray.astype(str)
+    return labelsArray
+
+####################################################################################################################################################################################
+# Function: Merge 2 accidents cubes (e.g. cubes of chunks) - labels of each dimension are combined  
+####################################################################################################################################################################################
+def mergeAccidentsCubes(accidentsCube: dict, partialCube: dict) -> dict:
+
+    for part, partialCounts in partialCube.items():
+        if part not in accidentsCube:
+            accidentsCube[part] = partialCounts
+            continue
+
+        cubeCounts = accidentsCube[part]
+
+        # Combined (sorted) labels of each dimension & position of each cube's labels in these
+        mergedLabels = [np.union1d(a, b) for a, b in zip(cubeCounts['labels'], partialCounts['labels'])]
+        mergedCounts = np.zeros(tuple(len(labels) for labels in mergedLabels), dtype='int32')
+        for counts in [cubeCounts, partialCounts]:
+            positions = [np.searchsorted(merged, labels) for merged, labels in zip(mergedLabels, counts['labels'])]
+            mergedCounts[np.ix_(*positions)] += counts['counts']
+
+        accidentsCube[part] = {"dims": cubeCounts['dims'], "labels": mergedLabels, "counts": mergedCounts}
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Finalize the accidents cube once all data is added - keep the top N weather conditions, others are added up as 1 bucket  
+####################################################################################################################################################################################
+def finalizeAccidentsCube(accidentsCube: dict) -> dict:
+
+    weatherCounts = accidentsCube.get('Weather')
+    if weatherCounts is None or len(weatherCounts['labels'][0]) <= weatherTopN:
+        return accidentsCube
+
+    # Top N weather conditions by count (in label order) & the others
+    weatherTotals = weatherCounts['counts'].sum(axis=1)
+    topIndex = np.sort(np.argsort(-weatherTotals, kind='stable')[:weatherTopN])
+    otherIndex = np.setdiff1d(np.arange(len(weatherTotals)), topIndex)
+
+    bucketLabels = np.append(weatherCounts['labels'][0][topIndex], otherBucketLabel)
+    bucketCounts = np.vstack([weatherCounts['counts'][topIndex], weatherCounts['counts'][otherIndex].sum(axis=0, keepdims=True)])
+
+    accidentsCube['Weather'] = {"dims": weatherCounts['dims'], "labels": [bucketLabels] + weatherCounts['labels'][1:], "counts": bucketCounts}
+
+    return accidentsCube
+
+####################################################################################################################################################################################
+# Function: Streaming mode - read the input file in chunks; clean, add date columns & aggregate each chunk & merge the cubes  
+####################################################################################################################################################################################
+def getStreamedCube(inputFile: str, cubeParts: dict = None) -> dict:
+
+    accidentsCube, rowCount = getChunkedCube(inputFile, cubeParts)
+
+    return finalizeAccidentsCube(accidentsCube)
+
+####################################################################################################################################################################################
+# Function: Read the input (file or file object) in chunks; clean, add date columns & aggregate each chunk - cube (not finalized) & number of rows read  
+####################################################################################################################################################################################
+def getChunkedCube(inputSource, cubeParts: dict = None) -> tuple:
+
+    accidentsCube = {}
+    rowCountBeforeCleanup = 0
+    rowCountAfterCleanup = 0
+
+    for chunkNum, (chunkDF, chunkRowCount) in enumerate(getCleanedChunks(getChunkReader(inputSource, cubeParts))):
+        rowCountBeforeCleanup = rowCountBeforeCleanup + chunkRowCount
+        rowCountAfterCleanup = rowCountAfterCleanup + len(chunkDF)
+
+        # Cube of the chunk - merged with the cube so far
+        if len(chunkDF) > 0:
+            accidentsCube = mergeAccidentsCubes(accidentsCube, getAccidentsCube(chunkDF, cubeParts))
+        print("Chunk {} processed, rows read so far: {}".format(chunkNum + 1, rowCountBeforeCleanup))
+
+    print("Streaming done, Number of rows read: {}, Number of rows deleted: {}".format(rowCountBeforeCleanup, rowCountBeforeCleanup - rowCountAfterCleanup))
+
+    return accidentsCube, rowCountBeforeCleanup
+
+####################################################################################################################################################################################
+# Function: Read the input (file or file object) in chunks of rows - only the columns needed (typed) by the parts of the cube (all parts if none given)  
+####################################################################################################################################################################################
+def getChunkReader(inputSource, cubeParts: dict = None):
+
+    inputColumns = getInputColumns(cubeParts)
+
+    return pd.read_csv(inputSource, usecols=inputColumns, dtype=getInputDtypes(inputColumns), chunksize=streamingChunkSize)
+
+####################################################################################################################################################################################
+# Function: Clean up & add the date columns to chunks (same as for the whole file) - chunk cleaned & number of rows read, for each chunk  
+####################################################################################################################################################################################
+def getCleanedChunks(chunks):
+
+    for chunkDF in chunks:
+        chunkRowCount = len(chunkDF)
+
+        chunkDF = runStage('cleanInputData', cleanInputData, chunkDF, printCounts=False)
+        chunkDF = runStage('addDateColumns', addDateColumns, chunkDF, printColumns=False)
+
+        yield chunkDF, chunkRowCount
+
+####################################################################################################################################################################################
+# Function: Get counts by dimensions (e.g. State & Severity) from the accidents cube - by summing up all other dimensions  
+####################################################################################################################################################################################
+def getCubeCounts(accidentsCube: dict, dims: list) -> tuple:
+
+    # Part of the cube with all the dimensions
+    partCounts = [counts for counts in accidentsCube.values() if all(dim in counts['dims'] for dim in dims)][0]
+
+    # Sum up the other dimensions & order the remaining ones as asked
+    dimAxes = [partCounts['dims'].index(dim) for dim in dims]
+    otherAxes = tuple(axis for axis in range(len(partCounts['dims'])) if axis not in dimAxes)
+    counts = partCounts['counts'].sum(axis=otherAxes, dtype='int64')
+    counts = np.transpose(counts, np.argsort(np.argsort(dimAxes)))
+
+    return counts, [partCounts['labels'][axis] for axis in dimAxes]
+
+####################################################################################################################################################################################
+# Function: Get counts by key (e.g. State) from the accidents cube - sorted by key (only keys with accidents; time keys: all keys)  
+####################################################################################################################################################################################
+def getKeyCounts(accidentsCube: dict, key: str) -> pd.Series:
+
+    if key == 'Year-Month':
+        # Year-Month keys from Year & Month - from the first to the last month with accidents
+        counts, labels = getCubeCounts(accidentsCube, ['Year', 'Month'])
+        keyCounts = pd.Series(counts.ravel(), index=pd.Index(((labels[0][:, None].astype('int32') - 1970) * 12 + labels[1][None, :] - 1).ravel(), name=key))
+        return keyCounts.reindex(pd.Index(getYearMonthSpan(keyCounts), name=key), fill_value=0)
+
+    counts, labels = getCubeCounts(accidentsCube, [key])
+    keyCounts = pd.Series(counts, index=pd.Index(labels[0], name=key))
+
+    if key in timeKeysDict:
+        return keyCounts
+
+    return keyCounts[keyCounts > 0]
+
+####################################################################################################################################################################################
+# Function: Get the Year-Month keys from the first to the last month with accidents (counts by Year-Month)  
+####################################################################################################################################################################################
+def getYearMonthSpan(yearMonthCounts: pd.Series) -> np.ndarray:
+
+    yearMonths = yearMonthCounts.index[yearMonthCounts.to_numpy() > 0]
+    if len(yearMonths) == 0:
+        return np.zeros(0, dtype='int32')
+
+    return np.arange(yearMonths.min(), yearMonths.max() + 1, dtype='int32')
+
+####################################################################################################################################################################################
+# Function: Get severity histogram by key (e.g. State) from the accidents cube - rows: key (only keys with accidents), columns: Severity  
+####################################################################################################################################################################################
+def getKeySeverityCounts(accidentsCube: dict, key: str) -> pd.DataFrame:
+
+    counts, labels = getCubeCounts(accidentsCube, [key, 'Severity'])
+    sevCounts = pd.DataFrame(counts, index=pd.Index(labels[0], name=key), columns=labels[1])
+
+    return sevCounts[sevCounts.sum(axis=1) > 0]
+
+####################################################################################################################################################################################
+# Function: Get counts of hours by Year-Month from the accidents cube - rows: Year-Month (first to last month with accidents), columns: Hour  
+####################################################################################################################################################################################
+def getYearMonthHourCounts(accidentsCube: dict) -> pd.DataFrame:
+
+    counts, labels = getCubeCounts(accidentsCube, ['Year', 'Month', 'Hour'])
+    yearMonths = ((labels[0][:, None].astype('int32') - 1970) * 12 + labels[1][None, :] - 1).ravel()
+    yearMonthHourCounts = pd.DataFrame(counts.reshape(len(yearMonths), len(labels[2])), index=yearMonths, columns=labels[2])
+
+    return yearMonthHourCounts.reindex(getYearMonthSpan(yearMonthHourCounts.sum(axis=1)), fill_value=0)
+
+####################################################################################################################################################################################
+# Function: Get severity stats by key (e.g. State) from the aggregates - count, average severity & weighted severity index per 1000 accidents  
+####################################################################################################################################################################################
+def getSeverityStats(accidentsCube: dict, key: str) -> pd.DataFrame:
+
+    # Weighted Severity Index per 1000 accidents
     # Severity = 0, 1, 2, 3, 4
     # Severity Weights = 10, 20, 40, 80, 160 (Total Weight = 310)
-    # Total Weighted Severity = ((Count of 0 Sev * 10) + (Count of 1 Sev * 10) + (Count of 2 Sev * 20) + (Count of 3 Sev * 30) + (Count of 4 Sev * 40))/(Total Weight = 310)
-    # Weighted Severity Index = Total Weighted Severity / Total Count of Accidents (in  Timezone)
+    # Total Weighted Severity = ((Count of 0 Sev * 10) + (Count of 1 Sev * 20) + (Count of 2 Sev * 40) + (Count of 3 Sev * 80) + (Count of 4 Sev * 160))/(Total Weight = 310)
+    # Weighted Severity Index = Total Weighted Severity / Total Count of Accidents (for the key)
     # Weighted Severity Index per 1000 accidents =  Weighted Severity Index * 1000
 
-    # Empty lists for bar chart to be plotted
-    timezonesWeigthedSevIndex = []
-
-    # Severity weights 
-    sevWeight = [10, 20, 40, 80, 160]
-    # Extract mean (avg) sev for each timezone:
-    for tz in timezonesLabels:
-        sevList = inputDF[inputDF['Timezone'] == tz]['Severity'].value_counts(dropna=False).sort_index().index.tolist()
-        sevCounts = inputDF[inputDF['Timezone'] == tz]['Severity'].value_counts(dropna=False).sort_index().tolist()
-                
-        # Initialize calculated variables to 0 before calulcation per timezone
-        # Weighted Severity Index per 1000 Accidents 
-        weightedSevIndex = 0
-        # Calculated Weighted Severity Index per Accident
-        totalWeightedSevIndex = 0
-        # Calculated Weighted Severity 
-        weightedSev = 0
-        # Calculated Total Weighted Severity 
-        totalWeightedSev = 0
-        # Count of Accidents by Timezone
-        countByTimezone = 0        
-        
-        # for each severity found in timezone
-        for i, sev in enumerate(sevList):
-            # Note: sev is used as index for sevWeight (instead of i) to be sure that the correct count of severity - 
-            # - is used with the matching severity weight as all sev may not be present i a tz
-            totalWeightedSev = totalWeightedSev + (sevCounts[i] * sevWeight[sev])
-            countByTimezone = countByTimezone + sevCounts[i]
-
-        # Now have data per severity - calculate the final value for timezone
-        weightedSev = totalWeightedSev/sum(sevWeight)
-        totalWeightedSevIndex = weightedSev/countByTimezone 
-        weightedSevIndex = round((totalWeightedSevIndex * 1000),2)
-        timezonesWeigthedSevIndex.append(weightedSevIndex)
-    
-    # Done for all timezones
-
-    # Set the plot attributes & Plot the Bar chart
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(timezonesLabels)-0.25)
-    plt.xlabel("Timezone")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+1 for i in range(0,len(timezonesAvgSev))]
-    xlabs=[i/2 for i in range(0,len(timezonesAvgSev))]
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(timezonesWeigthedSevIndex)+10.00)
-    plt.ylabel("Weighted Severity Index per 1000 Accidents")
-    # Plot the chart:
-    plt.figure(figsize=(12, 8))
-    plt.bar(timezonesLabels, timezonesWeigthedSevIndex, color=timezonesGraphColors, alpha=0.5, align="center")
-    plt.title("Weighted Severity of Accidents in Different Timezone (per 1000 Accidents)")
-    # put value labes for Y-Axis 
-    for i, v in enumerate(timezonesWeigthedSevIndex):
-        # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
-        plt.text(xlocs[i] -1.10, v + 0.01, str(v))
-
-    # Define & Save: Output file - Pie chart
-    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_4_WeightedSevIndex_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 5. Bar Chart: Number of accidents by timezone per year per 1000 people
+    # Counts by key & severity (rows: key, columns: severity) - a severity not present for a key has a 0 count
+    sevCounts = getKeySeverityCounts(accidentsCube, key)
+    sevList = sevCounts.columns.to_numpy()
+
+    severityStats = pd.DataFrame(index=sevCounts.index)
+    severityStats['Count'] = sevCounts.sum(axis=1)
+    severityStats['Avg Severity'] = ((sevCounts * sevList).sum(axis=1) / severityStats['Count']).round(3)
+    totalWeightedSev = (sevCounts * np.array(severityWeightsList)[sevList]).sum(axis=1)
+    severityStats['Weighted Severity Index'] = (totalWeightedSev / sum(severityWeightsList) / severityStats['Count'] * 1000).round(2)
+
+    # Severity histogram: 'Severity 0' ... 'Severity 4' columns
+    for sev in sevList:
+        severityStats['Severity ' + str(sev)] = sevCounts[sev]
+
+    return severityStats
+
+####################################################################################################################################################################################
+# Function: Get the severity histogram columns of severity stats  
+####################################################################################################################################################################################
+def getSeverityColumns(severityStats: pd.DataFrame) -> list:
+    return [col for col in severityStats.columns if col.startswith('Severity ')]
+
+
+####################################################################################################################################################################################
+# Function: Get reference data (e.g. population by State) as a table by key & year - values of the reference file for its years, otherwise of the dict (same for all years)  
+####################################################################################################################################################################################
+def getReferenceTable(referenceDict: dict, referenceFile: str, key: str, valueName: str) -> pd.Series:
+
+    # Values of the dict for each year analysed
+    years = range(yearFrom, yearTo + 1)
+    referenceTable = pd.Series([value for value in referenceDict.values() for year in years], 
+                               index=pd.MultiIndex.from_product([list(referenceDict.keys()), years], names=[key, 'Year']), name=valueName, dtype='float64')
+
+    # Values of the reference file (optional) replace the ones of the dict for the same key & year
+    if referenceFile is not None and os.path.isfile(referenceFile):
+        fileTable = pd.read_csv(referenceFile, usecols=[key, 'Year', valueName]).set_index([key, 'Year'])[valueName].astype('float64')
+        fileTable = fileTable[fileTable.index.get_level_values('Year').isin(years)]
+        referenceTable = fileTable.combine_first(referenceTable)
+
+    return referenceTable
+
+####################################################################################################################################################################################
+# Function: Get the sum over the years analysed of reference values (e.g. population) by key - NaN for keys missing a year  
+####################################################################################################################################################################################
+def getReferenceTotals(referenceTable: pd.Series, keys: pd.Index) -> pd.Series:
+
+    # Join on all keys & years (missing ones as NaN) & sum up the years
+    years = range(yearFrom, yearTo + 1)
+    joinedTable = referenceTable.reindex(pd.MultiIndex.from_product([keys, years], names=[keys.name, 'Year']))
+
+    return joinedTable.groupby(level=0, sort=False).sum(min_count=len(years)).reindex(keys)
+
+####################################################################################################################################################################################
+# Function: Get the rate per 1000 (counts / reference values * 1000) by key - keys without reference values have no rate (NaN) & are reported  
+####################################################################################################################################################################################
+def getRatePer1000(counts: pd.Series, referenceValues: pd.Series, referenceName: str) -> pd.Series:
+
+    missingKeys = referenceValues.index[referenceValues.isna()].tolist()
+    if len(missingKeys) > 0:
+        print("No {} for: {}{} ({} - {}) - rate not computed".format(referenceName, ', '.join(str(k) for k in missingKeys[:10]), 
+              ' ... ({} keys)'.format(len(missingKeys)) if len(missingKeys) > 10 else '', yearFrom, yearTo))
+
+    return (counts / referenceValues * 1000).round(3)
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Timezone  
+####################################################################################################################################################################################
+def getTimezoneResults(accidentsCube: dict) -> dict:
+
+    # Count, average severity, weighted severity index & severity histogram by timezone
+    timezonesResultsDF = getSeverityStats(accidentsCube, 'Timezone')
+
+    # Number of accidents by timezone per year per 1000 people
     # Count of Accidents by Timezone = Number of accidents per timezone in data analyzed
-    # Count of Accidents by Timezone per year = Count of Accidents by Timezone / num of years of data being analyzed
-    # Count of Accidents by Timezone per year per person = Count of Accidents by Timezone per year / population of timezone
-    # Count of Accidents by Timezone per year per 1000 people = Count of Accidents by Timezone per year per person * 1000
-    
-    # Initialize variables used for calcuations:
-    # List of Number of accidents per timezone per year per 1000 people
-    timezoneCountsPerYearPer1000PopulationList = []
-    
-    # Get Accident per population * 1000 by Timezone in order as present in timezonesLabels
-    for i, tz in enumerate(timezonesLabels):
- 
-        # Initialize variables used for calcuations:
-        # Number of accidents per timezone per year 
-        timezoneCountsPerYear = 0 
-        # Number of accidents per timezone per year per person
-        timezoneCountsPerYearPerPopulation = 0  
-        # Number of accidents per timezone per year per 1000 people
-        timezoneCountsPerYearPer1000Population = 0 
-
-        # Perform the calulation 
-        timezoneCountsPerYear = timezonesCounts[i]/numOfYears
-        timezoneCountsPerYearPerPopulation = timezoneCountsPerYear / timezonePopulationDict[tz]
-        timezoneCountsPerYearPer1000Population = round((timezoneCountsPerYearPerPopulation * 1000),3)
-
-        # Add the calculated value to the list for the graph
-        timezoneCountsPerYearPer1000PopulationList.append(timezoneCountsPerYearPer1000Population)
-
-
-    # Calculations done - have the data now plot the bar chart  
-
-    # Set the plot attributes & Plot the Bar chart
-    plt.figure(figsize=(12, 8))
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(timezonesLabels)-0.25)
-    plt.xlabel("Timezone")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i for i in range(0,len(timezonesLabels))]
-    xlabs=timezonesLabels
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(timezoneCountsPerYearPer1000PopulationList)+0.250)
-    plt.ylabel("Accident(s) per 1000 People")
-    # Plot the chart
-    plt.bar(timezonesLabels, timezoneCountsPerYearPer1000PopulationList, color=timezonesGraphColors, alpha=0.5, align="center")
-    plt.title("Accidents in Different Timezone per Population of 1000")
-    # put value labes for Y-Axis 
-    for i, v in enumerate(timezoneCountsPerYearPer1000PopulationList):
-        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-        plt.text(xlocs[i] -0.10, v + 0.01, str(v))
-    
-    # Save output file 
-    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_5_Counts_1000_People_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 6. Pie Chart (Percentage Severity of Accidents by timezone)
-
-    # Plot all 4 timezones in 1 figure : 2 rows 2 cols
-    plt.figure(figsize=(12, 8))
-    
-    # Severity lables:
-    uniqueSevLables = []
-    for sv in uniqueSevList:
-        uniqueSevLables.append("Severity " + str(sv))
-
-    for cnt, tz in enumerate(timezonesLabels):
-        sevList = inputDF[inputDF['Timezone'] == tz]['Severity'].value_counts(dropna=False).sort_index().index.tolist()
-        sevCounts = inputDF[inputDF['Timezone'] == tz]['Severity'].value_counts(dropna=False).sort_index().tolist()
-        
-        # Define new lists to hold all severity values  
-        sevListPct = []
-        sevCountsPct = []
-
-        # offset missing rows for comparison 
-        matchIndex = 0
-        # Not all timeozone may have an accident for each severity type - check & add a 0 count if needed:
-        for i, s in enumerate(uniqueSevList):
-            if uniqueSevList[i] == sevList[i-matchIndex]:
-                # exists - add to new list for that Severity 
-                sevListPct.append(uniqueSevList[i])
-                sevCountsPct.append(sevCounts[i-matchIndex])
-            else:
-                # does not exists - add a 0 count entry for that Severity 
-                sevListPct.append(uniqueSevList[i])
-                sevCountsPct.append(0)
-                matchIndex = matchIndex + 1
-
-        if cnt == 0:
-            # 1st Timezone : first row, first col
-            ax1 = plt.subplot2grid((2,2),(0,0))
-        if cnt == 1:
-            # 2nd Timezone: first row, second col
-            ax1 = plt.subplot2grid((2,2), (0, 1))
-        if cnt == 2:
-            # 3rd Timezone: second row, first column
-            ax1 = plt.subplot2grid((2,2), (1, 0))
-        if cnt == 3:
-            # 4th Timezone: second row, second column
-            ax1 = plt.subplot2grid((2,2), (1, 1))
-        
-        piePctExplode = (0.25, 0.25, 0, 0, 0.10)    
-        plt.axis("equal")
-        plt.pie(sevCountsPct, explode=piePctExplode, colors=severityGraphColors, labels=uniqueSevLables,
-            autopct="%1.1f%%", shadow=True, startangle=135)
-        plt.title("% Severity in Timezone: " + tz)
-
-    # End of all timezones    
-    # Save output file
-    outputFile = outputFilePath + outputFileSubPath + 'Timezone_Accidents_6_Severity_Pie.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-####################################################################################################################################################################################
-# Function: Analyze by Hour  
-####################################################################################################################################################################################
-def accidentsByHour(inputDF: pd.DataFrame):
-
-    outputFileSubPath = 'ByHour/'
-
-
-    # Get unique hours & counts
-    hourCounts = inputDF['Hour'].value_counts(dropna=False).sort_index().tolist()
-    hourLabels = inputDF['Hour'].value_counts(dropna=False).sort_index().index.tolist()
-
-    hourIndex = ['0-1', '1-2', '2-3', '3-4', '4-5', '5-6', '6-7', '7-8', '8-9', '9-10', '10-11', '11-12', '12-13', '13-14', '14-15', '15-16', '16-17', '17-18', '18-19', '19-20', '20-21', '21-22', '22-23', '23-24']
-    # Plot the bar grapgh
-    plt.figure(figsize=(12, 8))
-  
-    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
-    # colors
-    barColors = ['royalblue']
- 
-    # X-Axis limits & label: 
-    plt.xlim(-0.75, len(hourLabels)-0.25)
-    plt.xlabel("Hour")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+0 for i in range(0,len(hourCounts))]
-    xlabs=[i for i in hourIndex]
-    plt.xticks(xlocs, xlabs, rotation = 45)
-    # Y-Axis limits & label: 
-    plt.ylim(0, max(hourCounts)+10000)
-    plt.ylabel("Count of Accidents")
-    # Plot 
-    plt.bar(hourLabels, hourCounts, alpha=0.5, align="center", color=barColors)
-    plt.title("Accidents by Hours of the Day")
-    ### Commented - Lack of space to put tick labels for each hour
-    # # put value labes for Y-Axis 
-    # for i, v in enumerate(hourCounts):
-    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-    #     plt.text(xlocs[i] -0.125, v + 0.01, str(v))
-    
-    # Define & Save: Output file - Bar chart
-    outputFile = outputFilePath + outputFileSubPath + 'HourOfDay_Accidents_Counts.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-
-
-####################################################################################################################################################################################
-# Function: Analyze by Day  
-####################################################################################################################################################################################
-def accidentsByDay(inputDF: pd.DataFrame):
-
-    outputFileSubPath = 'ByDay/'
-
-    # Chart by day of the week
-
-    # Get unique hours & counts
-    weekdayCounts = inputDF['Weekday'].value_counts(dropna=False).tolist()
-    weekdayLabels = inputDF['Weekday'].value_counts(dropna=False).index.tolist()
-
-    # Plot the bar grapgh
-    plt.figure(figsize=(12, 8))
-  
-    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
-    # colors
-    barColors = ['royalblue']
- 
-    # X-Axis limits & label: 
-    plt.xlim(-0.75, len(weekdayLabels)-0.25)
-    plt.xlabel("Weekday")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+0 for i in range(0,len(weekdayCounts))]
-    xlabs=[i for i in weekdayLabels]
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label: 
-    plt.ylim(0, max(weekdayCounts)+25000)
-    plt.ylabel("Count of Accidents")
-    # Plot 
-    plt.bar(weekdayLabels, weekdayCounts, alpha=0.5, align="center", color=barColors)
-    plt.title("Accidents by Day of the Week")
-    # put value labes for Y-Axis 
-    for i, v in enumerate(weekdayCounts):
-        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-        plt.text(xlocs[i] -0.30, v + 0.01, str(v))
-    
-    # Define & Save: Output file - Bar chart
-    outputFile = outputFilePath + outputFileSubPath + 'DayOfWeek_Accidents_Counts.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-
-    
-####################################################################################################################################################################################
-# Function: by Month of Year  
-####################################################################################################################################################################################
-def accidentsByMonth(inputDF: pd.DataFrame):
-
-    outputFileSubPath = 'ByMonth/'
-
-    # Get unique hours & counts
-    monthCounts = inputDF['Month'].value_counts(dropna=False).sort_index().tolist()
-    monthLabels = inputDF['Month'].value_counts(dropna=False).sort_index().index.tolist()
-    
-    # Get counts by YYYY-MM
-    yyyymmCounts = inputDF['Year-Month'].value_counts(dropna=False).sort_index().tolist()
-    yyyymmLabels = inputDF['Year-Month'].value_counts(dropna=False).sort_index().index.tolist()
-    yyyymmCounts2017 = inputDF[inputDF['Year'] == 2017]['Year-Month'].value_counts(dropna=False).sort_index().tolist()
-    yyyymmLabels2017 = inputDF[inputDF['Year'] == 2017]['Year-Month'].value_counts(dropna=False).sort_index().index.tolist()
-    yyyymmCounts2018 = inputDF[inputDF['Year'] == 2018]['Year-Month'].value_counts(dropna=False).sort_index().tolist()
-    yyyymmLabels2018 = inputDF[inputDF['Year'] == 2018]['Year-Month'].value_counts(dropna=False).sort_index().index.tolist()
-
-    monthIndex = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-
-    # colors
-    barColors = ['royalblue']
-
-    # 1. Plot the bar grapgh
-    plt.figure(figsize=(12, 8))
-    # plt.bar(monthLabels, monthCounts, alpha=0.5, align="center")
-    plt.bar(monthLabels, monthCounts, alpha=0.5, align="center", color=barColors)
-
-    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
-    # title
-    plt.title("Accidents by Month of the Year")
-
-    # X-Axix limits & label: 
-    plt.xlim(-0, len(monthLabels)+.5)
-    plt.xlabel("Month")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+1 for i in range(0,len(monthCounts))]
-    # xlabs=[i+1 for i in range(0,len(monthCounts))]
-    xlabs=[i for i in monthIndex]
-    plt.xticks(xlocs, xlabs)
-    plt.ylim(0, max(monthCounts)+5000)
-    plt.ylabel("Count of Accidents")
+    # Person years of Timezone = sum of the population of timezone over the years of data being analyzed
+    # Count of Accidents by Timezone per year per 1000 people = Count of Accidents by Timezone / Person years of Timezone * 1000
+    timezonePersonYears = getReferenceTotals(getReferenceTable(timezonePopulationDict, timezonePopulationFile, 'Timezone', 'Population'), timezonesResultsDF.index)
+    timezonesResultsDF.insert(3, 'Accidents per 1000 People', getRatePer1000(timezonesResultsDF['Count'], timezonePersonYears, 'population by Timezone'))
 
-    # put value labes for Y-Axis 
-    for i, v in enumerate(monthCounts):
-        # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-        plt.text(xlocs[i] -0.30, v + 0.01, str(v))
+    return {"Timezone": timezonesResultsDF}
 
-   # Define & Save: Output file - Bar chart
-    outputFile = outputFilePath  + outputFileSubPath + 'MonthOfYear_Accidents_Counts.jpg'
-    plt.savefig(outputFile)
-    plt.close()
+####################################################################################################################################################################################
+# Function: Results of the analysis by State  
+####################################################################################################################################################################################
+def getStateResults(accidentsCube: dict) -> dict:
 
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 2. Plot a line graph comparing monthly progression by year 
-    plt.figure(figsize=(12, 8))
-
-    # Set the bar chart attributes such as X-Axis, Y-Axis, colors etc.
-    # colors
-    lineColors = ['royalblue', 'darkorange' ]
-    # title
-    plt.title("Accidents per Month for Year 2017 & 2018")
-    plt.plot(monthIndex, yyyymmCounts2017, marker = ' ', color = 'royalblue', label = '2017', linewidth=3)
-    plt.plot(monthIndex, yyyymmCounts2018, marker = ' ', color = 'darkorange', label = '2018', linewidth=3, )
-    plt.legend()
-
-
-   # Define & Save: Output file - Bar chart
-    outputFile = outputFilePath  + outputFileSubPath + 'MonthOfYear_2_Compare_Accidents_Counts.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-
-    print("Graph plotted: " + outputFile)
-
-
-
-####################################################################################################################################################################################
-# Function: by Weather  
-####################################################################################################################################################################################
-def accidentsByWeather(inputDF: pd.DataFrame):
-
-    outputFileSubPath = 'ByWeather/'
-
-    weatherCounts = inputDF['Weather_Condition'].value_counts(ascending = False)
-    weatherLabels = inputDF['Weather_Condition'].value_counts(ascending = False).index.tolist()
-
-    barColors = ['royalblue']
-
-
-    # Count of Accidents by Weather Condition:
-
-    # Plot the bar grapgh
-    plt.figure(figsize=(16, 12))
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(weatherLabels[:10])-0.25)
-    plt.xlabel("Weather Condition")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i for i in range(0,len(weatherLabels[:10]))]
-    xlabs=weatherLabels[:10]
-    plt.xticks(xlocs, xlabs, rotation = 45)
-    # Y-Axis limits & label
-    plt.ylim(0, max(weatherCounts[:10])+25000)
-    plt.ylabel("Count of Accident(s)")
-    # Plot the chart
-    plt.bar(weatherLabels[:10], weatherCounts[:10], color=barColors, alpha=0.5, align="center")
-    plt.title("Accidents by Top 10 Weather Conditions")
-    
-    # Save output file 
-    outputFile = outputFilePath + outputFileSubPath + 'Weather_Accidents_Counts_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-####################################################################################################################################################################################
-# Function: by State  
-####################################################################################################################################################################################
-def accidentsByState(inputDF: pd.DataFrame):
-
-    outputFileSubPath = 'ByState/'
-
-    stateCounts = inputDF['State'].value_counts(ascending = False)
-    stateLabels = inputDF['State'].value_counts(ascending = False).index.tolist()
-
-    barColors = ['royalblue']
-
-
-    # 1. Count of Accidents by State:
-
-    # Plot the bar grapgh
-    plt.figure(figsize=(16, 12))
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(stateLabels)-0.25)
-    plt.xlabel("State")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i for i in range(0,len(stateLabels))]
-    xlabs=stateLabels
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(stateCounts)+25000)
-    plt.ylabel("Count of Accident(s)")
-    # Plot the chart
-    plt.bar(stateLabels, stateCounts, color=barColors, alpha=0.5, align="center")
-    plt.title("Accidents by State(s)")
-    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
-    # # put value labes for Y-Axis 
-    # for i, v in enumerate(stateCounts):
-    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-    #     plt.text(xlocs[i] -0.10, v + 0.01, str(v))
-    
-    # Save output file 
-    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_1_Counts_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 2. Average severity of accident by State
-
-    # Empty lists for bar chart to be plotted
-    stateAvgSev = []
-    
-    # Extract mean (avg) sev for each state:
-    for st in stateLabels:
-        meanSev = inputDF[inputDF['State'] == st]['Severity'].mean()
-        stateAvgSev.append(round(meanSev,3))
-
-    # Sort the list descending before plotting
-    stateLabels2 = stateLabels
-    stateAvgSev2 = stateAvgSev
-    stateAvgSev2, stateLabels2 = zip(*sorted(zip(stateAvgSev2, stateLabels2), reverse=True))
- 
-
-    # Set the plot attributes & Plot the Bar chart
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(stateLabels2)-0.25)
-    plt.xlabel("State")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+1 for i in range(0,len(stateAvgSev2))]
-    xlabs=[i/2 for i in range(0,len(stateAvgSev2))]
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(stateAvgSev2)+0.500)
-    plt.ylabel("Avergare Severity of Accident")
-    # Plot the chart:
-    plt.figure(figsize=(16, 12))
-    plt.bar(stateLabels2, stateAvgSev2, color=barColors, alpha=0.5, align="center")
-    plt.title("Average Accidents Severity per State(s)")
-    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
-    # # put value labes for Y-Axis 
-    # for i, v in enumerate(stateAvgSev2):
-    #     # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
-    #     plt.text(xlocs[i] -1.10, v + 0.01, str(v))
-    
-    # Define & Save: Output file - Pie chart
-    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_2_AvgSev_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-    
-
-    # 3. Weighted Severity Index per 1000 accidents by State
-    # Severity = 0, 1, 2, 3, 4
-    # Severity Weights = 10, 20, 40, 80, 160 (Total Weight = 310)
-    # Total Weighted Severity = ((Count of 0 Sev * 10) + (Count of 1 Sev * 10) + (Count of 2 Sev * 20) + (Count of 3 Sev * 30) + (Count of 4 Sev * 40))/(Total Weight = 310)
-    # Weighted Severity Index = Total Weighted Severity / Total Count of Accidents (in  State)
-    # Weighted Severity Index per 1000 accidents =  Weighted Severity Index * 1000
+    # Count, average severity, weighted severity index & severity histogram by state - in descending order of count
+    stateResultsDF = getSeverityStats(accidentsCube, 'State').sort_values('Count', ascending = False, kind='stable')
+
+    # Number of accidents by state per year per 1000 people / per 1000 sq miles
+    # Person years of state = sum of the population of state over the years of data being analyzed
+    # Sq mile years of state = land sq miles of state * num of years of data being analyzed
+    # Count of Accidents by state per year per 1000 people = Count of Accidents by state / Person years of state * 1000
+    # Count of Accidents by state per year per 1000 sq miles = Count of Accidents by state / Sq mile years of state * 1000
+    statePersonYears = getReferenceTotals(getReferenceTable(statesPopulationDict, statesPopulationFile, 'State', 'Population'), stateResultsDF.index)
+    stateSqMileYears = getReferenceTotals(getReferenceTable(statesLandSqMilesDict, None, 'State', 'Land Sq Miles'), stateResultsDF.index)
+    stateResultsDF.insert(3, 'Accidents per 1000 People', getRatePer1000(stateResultsDF['Count'], statePersonYears, 'population by State'))
+    stateResultsDF.insert(4, 'Accidents per 1000 Sq Miles', getRatePer1000(stateResultsDF['Count'], stateSqMileYears, 'land sq miles by State'))
+
+    return {"State": stateResultsDF}
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Weather condition  
+####################################################################################################################################################################################
+def getWeatherResults(accidentsCube: dict) -> dict:
+
+    # Counts by weather condition - in descending order (without the bucket of other weather conditions)
+    weatherCounts = getKeyCounts(accidentsCube, 'Weather_Condition').drop(otherBucketLabel, errors='ignore').sort_values(ascending = False, kind='stable')
+
+    return {"Weather_Condition": weatherCounts.to_frame('Count')}
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Month  
+####################################################################################################################################################################################
+def getMonthResults(accidentsCube: dict) -> dict:
+
+    # Counts by month of the year
+    monthCounts = getKeyCounts(accidentsCube, 'Month').to_frame('Count')
+
+    # Counts by YYYY-MM (with the year for comparison of years)
+    yyyymmSeries = getKeyCounts(accidentsCube, 'Year-Month')
+    yyyymmCounts = pd.DataFrame({"Year": getYearMonthYear(yyyymmSeries.index), "Count": yyyymmSeries.to_numpy()}, 
+                                index=pd.Index([getYearMonthLabel(m) for m in yyyymmSeries.index], name='Year-Month'))
+
+    return {"Month": monthCounts, "Year-Month": yyyymmCounts}
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Hours of the Day per Month of Year  
+####################################################################################################################################################################################
+def getMonthByHoursResults(accidentsCube: dict) -> dict:
+
+    # Counts of hours by YYYY-MM (rows: YYYY-MM, columns: hour - 0 for hours without accidents)
+    yearMonthHourCounts = getYearMonthHourCounts(accidentsCube)
+    yearMonthHourCounts.index = pd.Index([getYearMonthLabel(m) for m in yearMonthHourCounts.index], name='Year-Month')
+
+    # Counts of hours by month of the year - all years (rows: hour, columns: month)
+    counts, labels = getCubeCounts(accidentsCube, ['Hour', 'Month'])
+    hourMonthCounts = pd.DataFrame(counts, index=pd.Index(labels[0], name='Hour'), columns=pd.Index(labels[1], name='Month'))
+
+    return {"Year-Month-Hour": yearMonthHourCounts, "Hour-Month": hourMonthCounts}
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Day of the week  
+####################################################################################################################################################################################
+def getDayResults(accidentsCube: dict) -> dict:
+
+    # Counts by weekday - in descending order
+    weekdayCounts = getKeyCounts(accidentsCube, 'Weekday').sort_values(ascending=False, kind='stable')
+    weekdayCounts.index = pd.Index([weekdayNamesList[d] for d in weekdayCounts.index], name='Weekday')
+
+    return {"Weekday": weekdayCounts.to_frame('Count')}
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Hour of the day  
+####################################################################################################################################################################################
+def getHourResults(accidentsCube: dict) -> dict:
+    return {"Hour": getKeyCounts(accidentsCube, 'Hour').to_frame('Count')}
+
+####################################################################################################################################################################################
+# Function: Results of a drill-down analysis (e.g. by County) - top N keys by count & by weighted severity index (keys with at least drillDownMinCount accidents)  
+####################################################################################################################################################################################
+def getDrillDownResults(accidentsCube: dict, key: str, populationFile: str = None) -> dict:
+
+    # Count, average severity, weighted severity index & severity histogram of all keys (without the rows with no value for the key)
+    drillDownResultsDF = getSeverityStats(accidentsCube, key).drop(unknownKeyLabel, errors='ignore')
+
+    # Number of accidents per year per 1000 people - only with a population file (see getReferenceTable)
+    if populationFile is not None and os.path.isfile(populationFile):
+        personYears = getReferenceTotals(getReferenceTable({}, populationFile, key, 'Population'), drillDownResultsDF.index)
+        drillDownResultsDF.insert(3, 'Accidents per 1000 People', getRatePer1000(drillDownResultsDF['Count'], personYears, 'population by ' + key))
+
+    topByCount = getTopRows(drillDownResultsDF, 'Count', drillDownTopN)
+    topBySeverity = getTopRows(drillDownResultsDF[drillDownResultsDF['Count'] >= drillDownMinCount], 'Weighted Severity Index', drillDownTopN)
+
+    return {key: topByCount, key + ' by Severity': topBySeverity}
+
+####################################################################################################################################################################################
+# Function: Get the top N rows by a column - in descending order (same values: in key order); N kept in a heap, the rows are not all sorted  
+####################################################################################################################################################################################
+def getTopRows(resultsDF: pd.DataFrame, column: str, topN: int) -> pd.DataFrame:
+
+    columnValues = resultsDF[column].to_numpy()
+    topPositions = heapq.nlargest(topN, range(len(columnValues)), key=columnValues.__getitem__)
+
+    return resultsDF.iloc[topPositions]
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by County (of a State)  
+####################################################################################################################################################################################
+def getCountyResults(accidentsCube: dict) -> dict:
+    return getDrillDownResults(accidentsCube, 'County-State', countiesPopulationFile)
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by City (of a State)  
+####################################################################################################################################################################################
+def getCityResults(accidentsCube: dict) -> dict:
+    return getDrillDownResults(accidentsCube, 'City-State', citiesPopulationFile)
+
+####################################################################################################################################################################################
+# Function: Results of the analysis by Zipcode  
+####################################################################################################################################################################################
+def getZipcodeResults(accidentsCube: dict) -> dict:
+    return getDrillDownResults(accidentsCube, 'Zipcode')
+
+####################################################################################################################################################################################
+# Analyses by name - in the order they are run
+####################################################################################################################################################################################
+analysisResultsDict = {"weather" : getWeatherResults, 
+                       "state" : getStateResults, 
+                       "timezone" : getTimezoneResults, 
+                       "month" : getMonthResults, 
+                       "monthbyhours" : getMonthByHoursResults, 
+                       "day" : getDayResults, 
+                       "hour" : getHourResults, 
+                       "county" : getCountyResults, 
+                       "city" : getCityResults, 
+                       "zipcode" : getZipcodeResults}
+
+####################################################################################################################################################################################
+# Function: Get the results of the analyses - by analysis name: tables (dataframes) of results by name  
+####################################################################################################################################################################################
+def getAnalysisResults(accidentsCube: dict, analysisNames: list) -> dict:
+    return {analysisName: runStage('analysis:' + analysisName, analysisResultsDict[analysisName], accidentsCube) for analysisName in analysisNames}
+
+####################################################################################################################################################################################
+# Function: Export the results of the analyses - 1 json file with all results & 1 csv file per table  
+####################################################################################################################################################################################
+def exportAnalysisResults(analysisResults: dict):
+
+    os.makedirs(metricsFilePath, exist_ok=True)
+
+    resultsJson = {}
+    for analysisName, results in analysisResults.items():
+        resultsJson[analysisName] = {}
+        for tableName, tableDF in results.items():
+            # Table as columns, index & rows of values
+            resultsJson[analysisName][tableName] = json.loads(tableDF.to_json(orient='split'))
 
-    # Empty lists for bar chart to be plotted
-    stateWeigthedSevIndex = []
-
-    # Severity weights 
-    sevWeight = [10, 20, 40, 80, 160]
-    # Extract mean (avg) sev for each state:
-    for st in stateLabels:
-        sevList = inputDF[inputDF['State'] == st]['Severity'].value_counts(dropna=False).sort_index().index.tolist()
-        sevCounts = inputDF[inputDF['State'] == st]['Severity'].value_counts(dropna=False).sort_index().tolist()
-                
-        # Initialize calculated variables to 0 before calulcation per state
-        # Weighted Severity Index per 1000 Accidents 
-        weightedSevIndex = 0
-        # Calculated Weighted Severity Index per Accident
-        totalWeightedSevIndex = 0
-        # Calculated Weighted Severity 
-        weightedSev = 0
-        # Calculated Total Weighted Severity 
-        totalWeightedSev = 0
-        # Count of Accidents by state
-        countByState = 0        
-        
-        # for each severity found in state
-        for i, sev in enumerate(sevList):
-            # Note: sev is used as index for sevWeight (instead of i) to be sure that the correct count of severity - 
-            # - is used with the matching severity weight as all sev may not be present i a tz
-            totalWeightedSev = totalWeightedSev + (sevCounts[i] * sevWeight[sev])
-            countByState = countByState + sevCounts[i]
-
-        # Now have data per severity - calculate the final value for state
-        weightedSev = totalWeightedSev/sum(sevWeight)
-        totalWeightedSevIndex = weightedSev/countByState 
-        weightedSevIndex = round((totalWeightedSevIndex * 1000),2)
-        stateWeigthedSevIndex.append(weightedSevIndex)
-    
-    # Done for all states
-
-    # Sort the list descending before plotting
-    stateLabels2 = stateLabels
-    stateWeigthedSevIndex2 = stateWeigthedSevIndex
-    stateWeigthedSevIndex2, stateLabels2 = zip(*sorted(zip(stateWeigthedSevIndex2, stateLabels2), reverse=True))
-
-
-    # Set the plot attributes & Plot the Bar chart
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(stateLabels2)-0.25)
-    plt.xlabel("State")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i+1 for i in range(0,len(stateWeigthedSevIndex2))]
-    xlabs=[i/2 for i in range(0,len(stateWeigthedSevIndex2))]
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(stateWeigthedSevIndex2)+10.00)
-    plt.ylabel("Weighted Severity Index per 1000 Accidents")
-    # Plot the chart:
-    plt.figure(figsize=(16, 12))
-    plt.bar(stateLabels2, stateWeigthedSevIndex2, color=barColors, alpha=0.5, align="center")
-    plt.title("Weighted Severity of Accidents in Different State(s) (per 1000 Accidents)")
-    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
-    # # put value labes for Y-Axis 
-    # for i, v in enumerate(stateWeigthedSevIndex2):
-    #     # Tip: Adjust -1.10 & +0.01 for positioning the lable text in the bar column
-    #     plt.text(xlocs[i] -1.10, v + 0.01, str(v))
-
-    # Define & Save: Output file - Pie chart
-    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_3_WeightedSevIndex_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 4. Bar Chart: Number of accidents by state per year per 1000 people
-    # Count of Accidents by state = Number of accidents per state in data analyzed
-    # Count of Accidents by state per year = Count of Accidents by state / num of years of data being analyzed
-    # Count of Accidents by state per year per person = Count of Accidents by state per year / population of state
-    # Count of Accidents by state per year per 1000 people = Count of Accidents by state per year per person * 1000
-    
-    # Initialize variables used for calcuations:
-    # List of Number of accidents per state per year per 1000 people
-    stateCountsPerYearPer1000PopulationList = []
-    
-    # Get Accident per population * 1000 by state in order as present in stateLabels
-    for i, st in enumerate(stateLabels):
- 
-        # Initialize variables used for calcuations:
-        # Number of accidents per state per year 
-        stateCountsPerYear = 0 
-        # Number of accidents per state per year per person
-        stateCountsPerYearPerPopulation = 0  
-        # Number of accidents per state per year per 1000 people
-        stateCountsPerYearPer1000Population = 0 
-
-        # Perform the calulation 
-        stateCountsPerYear = stateCounts[i]/numOfYears
-        stateCountsPerYearPerPopulation = stateCountsPerYear / statesPopulationDict[st]
-        stateCountsPerYearPer1000Population = round((stateCountsPerYearPerPopulation * 1000),3)
-
-        # Add the calculated value to the list for the graph
-        stateCountsPerYearPer1000PopulationList.append(stateCountsPerYearPer1000Population)
-
-
-    # Calculations done - have the data now plot the bar chart  
-
-    # Sort the list descending before plotting
-    stateLabels2 = stateLabels
-    stateCountsPerYearPer1000PopulationList2 = stateCountsPerYearPer1000PopulationList
-    stateCountsPerYearPer1000PopulationList2, stateLabels2 = zip(*sorted(zip(stateCountsPerYearPer1000PopulationList2, stateLabels2), reverse=True))
-
-    # Set the plot attributes & Plot the Bar chart
-    plt.figure(figsize=(16, 12))
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(stateLabels2)-0.25)
-    plt.xlabel("State")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i for i in range(0,len(stateLabels2))]
-    xlabs=stateLabels2
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(stateCountsPerYearPer1000PopulationList2)+0.250)
-    plt.ylabel("Accident(s) per 1000 People")
-    # Plot the chart
-    plt.bar(stateLabels2, stateCountsPerYearPer1000PopulationList2, color=barColors, alpha=0.5, align="center")
-    plt.title("Accidents in Different State(s) per Population of 1000")
-    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
-    # # put value labes for Y-Axis 
-    # for i, v in enumerate(stateCountsPerYearPer1000PopulationList2):
-    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-    #     plt.text(xlocs[i] -0.10, v + 0.01, str(v))
-    
-    # Save output file 
-    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_4_Counts_1000_People_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-    # 5. Bar Chart: Number of accidents by state per year per 1000 sq miles
-    # Count of Accidents by state = Number of accidents per state in data analyzed
-    # Count of Accidents by state per year = Count of Accidents by state / num of years of data being analyzed
-    # Count of Accidents by state per year per sq miles = Count of Accidents by state per year / land sq miles of state
-    # Count of Accidents by state per year per 1000 sq miles = Count of Accidents by state per year per sq miles * 1000
-    
-    # Initialize variables used for calcuations:
-    # List of Number of accidents per state per year per 1000 sql miles
-    stateCountsPerYearPer1000SqMilesList = []
-    
-    # Get Accident per SqMiles * 1000 by state in order as present in stateLabels
-    for i, st in enumerate(stateLabels):
- 
-        # Initialize variables used for calcuations:
-        # Number of accidents per state per year 
-        stateCountsPerYear = 0 
-        # Number of accidents per state per year per person
-        stateCountsPerYearPerSqMiles = 0  
-        # Number of accidents per state per year per 1000 SqMiles
-        stateCountsPerYearPer1000SqMiles = 0 
-
-        # Perform the calulation 
-        stateCountsPerYear = stateCounts[i]/numOfYears
-        stateCountsPerYearPerSqMiles = stateCountsPerYear / statesLandSqMilesDict[st]
-        stateCountsPerYearPer1000SqMiles = round((stateCountsPerYearPerSqMiles * 1000),3)
-
-        # Add the calculated value to the list for the graph
-        stateCountsPerYearPer1000SqMilesList.append(stateCountsPerYearPer1000SqMiles)
-
-
-    # Calculations done - have the data now plot the bar chart  
-
-    # Sort the list descending before plotting
-    stateLabels2 = stateLabels
-    stateCountsPerYearPer1000SqMilesList2 = stateCountsPerYearPer1000SqMilesList
-    stateCountsPerYearPer1000SqMilesList2, stateLabels2 = zip(*sorted(zip(stateCountsPerYearPer1000SqMilesList2, stateLabels2), reverse=True))
-
-    # Set the plot attributes & Plot the Bar chart
-    plt.figure(figsize=(16, 12))
-    # X-Axix limits & label: 
-    plt.xlim(-0.75, len(stateLabels2)-0.25)
-    plt.xlabel("State")
-    xlocs, xlabs = plt.xticks()
-    xlocs=[i for i in range(0,len(stateLabels2))]
-    xlabs=stateLabels2
-    plt.xticks(xlocs, xlabs)
-    # Y-Axis limits & label
-    plt.ylim(0, max(stateCountsPerYearPer1000SqMilesList2)+500)
-    plt.ylabel("Accident(s) per 1000 Sq Miles")
-    # Plot the chart
-    plt.bar(stateLabels2, stateCountsPerYearPer1000SqMilesList2, color=barColors, alpha=0.5, align="center")
-    plt.title("Accidents in Different State(s) per 1000 Sq Miles of Land Area")
-    ### Commented to not put the Y-Axis tick labels as there are 50 bars (US States)
-    # # put value labes for Y-Axis 
-    # for i, v in enumerate(stateCountsPerYearPer1000SqMilesList2):
-    #     # Tip: Adjust -0.10 & +0.01 for positioning the lable text in the bar column
-    #     plt.text(xlocs[i] -0.10, v + 0.01, str(v))
-    
-    # Save output file 
-    outputFile = outputFilePath + outputFileSubPath + 'State_Accidents_5_Counts_1000_SqMiles_Bar.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-    print("Graph plotted: " + outputFile)
-
-
-
-####################################################################################################################################################################################
-# Function: by Hourss of the Day per Month of Year  
-####################################################################################################################################################################################
-def accidentsByMonthByHours(inputDF: pd.DataFrame):
-
-    outputFileSubPath = 'ByMonth/ByHour/'
-
-    # Get unique months
-    monthCounts = inputDF['Year-Month'].value_counts(dropna=False).sort_index().tolist()
-    monthLabels = inputDF['Year-Month'].value_counts(dropna=False).sort_index().index.tolist()
-
-    # Hours Index for labels
-    hourIndex = ['0-1', '1-2', '2-3', '3-4', '4-5', '5-6', '6-7', '7-8', '8-9', '9-10', '10-11', '11-12', '12-13', '13-14', '14-15', '15-16', '16-17', '17-18', '18-19', '19-20', '20-21', '21-22', '22-23', '23-24']
-
-    # Plot attributes 
-    plt.figure(figsize=(16, 12))
-    plt.title("Accidents per Hour by Month of Year")
-
-    # Repeat for each month:
-    for m in monthLabels:
-        # Get unique hours & counts
-        hourCounts = inputDF[inputDF['Year-Month'] == m]['Hour'].value_counts(dropna=False).sort_index().tolist()
-        # hourLabels = inputDF[inputDF['Month'] == m]['Hour'].value_counts(dropna=False).sort_index().index.tolist()
-        plt.plot(hourIndex, hourCounts, marker = ' ', label = str(m), linewidth=2)
-
-    # Done all months 
-    plt.legend()
-
-   # Define & Save: Output file - Bar chart
-    outputFile = outputFilePath  + outputFileSubPath + 'Accidents_Hour_MonthOfYear_1_Compare_Accidents_Counts.jpg'
-    plt.savefig(outputFile)
-    plt.close()
-
-    print("Graph plotted: " + outputFile)
+            outputFile = metricsFilePath + analysisName + '_' + tableName + '.csv'
+            tableDF.to_csv(outputFile)
+            print("Results saved: " + outputFile)
 
+    outputFile = metricsFilePath + 'AnalysisResults.json'
+    with open(outputFile, 'w') as f:
+        json.dump(resultsJson, f, indent=2)
+    print("Results saved: " + outputFile)
 
 
 ####################################################################################################################################################################################
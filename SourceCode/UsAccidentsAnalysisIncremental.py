@@ -0,0 +1,266 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import os
+import io
+import glob
+import json
+import hashlib
+import time
+
+# Import functions
+from UsAccidentsAnalysisFunctions import mergeAccidentsCubes
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisFunctions import isCompressedFile
+from UsAccidentsAnalysisParallel import getFilesCubes
+from UsAccidentsAnalysisCache import getCleanupSettings
+from UsAccidentsAnalysisCache import saveAccidentsCube
+from UsAccidentsAnalysisCache import loadAccidentsCube
+from UsAccidentsAnalysisCache import readJsonFile
+from UsAccidentsAnalysisCache import writeJsonFile
+from UsAccidentsAnalysisCache import cubeVersion
+
+# Import configurations & global data
+from Configs import inputFilePath
+from Configs import inputFileName
+from Configs import incrementalInputPattern
+from Configs import stateFilePath
+from Configs import inputFileProcesses
+from Configs import yearFrom
+from Configs import yearTo
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Incremental mode: the accidents cube of all input processed so far (not finalized - counts of all weather conditions) is saved in the state directory,
+# with a manifest of the input files processed (size, mtime, bytes & rows read, hash of the last bytes read) & a digest of the results of each analysis
+# Each run reads only the new files & the rows appended to the files already processed, & merges their cube into the saved cube -
+# - if a file processed before is removed or rewritten (not only appended to) the counts cannot be taken out, the state is rebuilt from all files
+# Compressed input files are read as a whole: a compressed file changed after it was processed is taken as rewritten
+# Only complete lines are read: a file still being written may end with a partial line - it is read in a later run, once its newline is written
+# A new file with the same size & last bytes as another input file is taken as a copy of it & skipped (its rows would be counted twice)
+# The new input of several files is read at the same time (pool of processes, see getFilesCubes)
+# Only the charts of the analyses whose results changed are plotted again
+
+# Version of the state format - change it when the manifest or the saved cube change
+stateVersion = 1
+
+# Number of bytes at the end of the input read so far hashed (to check that a file has only been appended to)
+tailHashBytes = 64 * 1024
+
+# State files
+stateCubeFile = os.path.join(stateFilePath, 'cube.npz')
+stateManifestFile = os.path.join(stateFilePath, 'manifest.json')
+
+
+####################################################################################################################################################################################
+# Function: Get the accidents cube (finalized) of all input files - processing only the input added since the last run
+####################################################################################################################################################################################
+def getIncrementalCube(rebuildState: bool = False) -> dict:
+
+    startTime = time.perf_counter()
+    inputFiles = sorted({os.path.abspath(inputFile) for inputPattern in [inputFilePath + inputFileName, incrementalInputPattern] for inputFile in glob.glob(inputPattern)})
+    print("Incremental mode, input files: {}".format(len(inputFiles)))
+
+    # Saved state - if built with the same settings & still matching the input files
+    manifest, accidentsCube = loadIncrementalState(inputFiles, rebuildState)
+
+    # New files & rows (of each file: from the byte after the last one read, up to the end of its last complete line)
+    # New files: skipped if a copy of a file read as a whole (same size & hash of the last bytes)
+    newInputs = []
+    fileSignatures = {(fileManifest['size'], fileManifest['tailHash']): inputFile for inputFile, fileManifest in manifest['files'].items() if fileManifest['bytes'] == fileManifest['size']}
+    for inputFile in inputFiles:
+        fromByte = getNewInputByte(inputFile, manifest['files'].get(inputFile))
+        if fromByte is None:
+            continue
+
+        fileStat = os.stat(inputFile)
+        if inputFile not in manifest['files']:
+            fileSignature = (fileStat.st_size, getTailHash(inputFile, fileStat.st_size))
+            if fileSignature in fileSignatures:
+                print("Input file skipped, same size & last bytes as {} (a copy?): {}".format(fileSignatures[fileSignature], inputFile))
+                continue
+            fileSignatures[fileSignature] = inputFile
+
+        toByte = getCompleteBytes(inputFile, fileStat.st_size)
+        if toByte > fromByte:
+            newInputs.append((inputFile, fromByte, toByte, fileStat))
+
+    # Read the new input of all files (at the same time) & merge their cubes in the order of the files
+    newCubes = getFilesCubes([getNewInputSource(inputFile, fromByte, toByte) for inputFile, fromByte, toByte, fileStat in newInputs], inputFileProcesses)
+    newRowCount = 0
+    for (inputFile, fromByte, toByte, fileStat), (partialCube, rowCount) in zip(newInputs, newCubes):
+        fileManifest = manifest['files'].get(inputFile)
+        accidentsCube = mergeAccidentsCubes(accidentsCube, partialCube)
+        newRowCount = newRowCount + rowCount
+
+        manifest['files'][inputFile] = {"size": fileStat.st_size,
+                                        "mtime": fileStat.st_mtime_ns,
+                                        "bytes": toByte,
+                                        "rows": (fileManifest['rows'] if fromByte > 0 else 0) + rowCount,
+                                        "tailHash": getTailHash(inputFile, toByte)}
+        print("Input file processed: {}, from byte: {}, new rows: {}".format(inputFile, fromByte, rowCount))
+        if toByte < fileStat.st_size:
+            print("Input file ends with a partial line (read in a later run): {}, {} bytes".format(inputFile, fileStat.st_size - toByte))
+
+    # Save the state (cube first - the cube is only loaded with the manifest of the same run)
+    if newRowCount > 0 or manifest['runs'] == 0:
+        manifest['runs'] = manifest['runs'] + 1
+        os.makedirs(stateFilePath, exist_ok=True)
+        saveAccidentsCube(accidentsCube, stateCubeFile, getStateCubeSettings(manifest))
+        writeJsonFile(stateManifestFile, manifest)
+
+    print("Incremental mode done, new rows: {}, total rows: {}, time: {:.2f} sec".format(newRowCount, sum(fileManifest['rows'] for fileManifest in manifest['files'].values()), time.perf_counter() - startTime))
+
+    return finalizeAccidentsCube(accidentsCube)
+
+####################################################################################################################################################################################
+# Function: Load the saved state (manifest & cube) - a new empty state if none, built with other settings or not matching the input files anymore
+####################################################################################################################################################################################
+def loadIncrementalState(inputFiles: list, rebuildState: bool = False) -> tuple:
+
+    manifest = readJsonFile(stateManifestFile)
+    accidentsCube = None
+    reason = "no saved state"
+
+    if rebuildState:
+        reason = "rebuild requested"
+    elif manifest is not None and manifest['settings'] != getStateSettings():
+        reason = "settings changed"
+    elif manifest is not None:
+        # Files processed before that are removed or rewritten
+        changedFiles = [inputFile for inputFile, fileManifest in manifest['files'].items() if inputFile not in inputFiles or getNewInputByte(inputFile, fileManifest) == 0]
+        if len(changedFiles) > 0:
+            reason = "input file(s) removed or rewritten: " + ', '.join(changedFiles)
+        elif os.path.isfile(stateCubeFile):
+            accidentsCube = loadAccidentsCube(stateCubeFile, getStateCubeSettings(manifest))
+            reason = "saved cube not matching the manifest"
+
+    if accidentsCube is not None:
+        return manifest, accidentsCube
+
+    print("Incremental state rebuilt from all input files ({})".format(reason))
+    return {"settings": getStateSettings(), "runs": 0, "files": {}, "results": {}}, {}
+
+####################################################################################################################################################################################
+# Function: Get the byte of the input file to read from - None if nothing new, 0 if not processed before or rewritten
+####################################################################################################################################################################################
+def getNewInputByte(inputFile: str, fileManifest: dict):
+
+    if fileManifest is None:
+        return 0
+
+    fileStat = os.stat(inputFile)
+    if fileStat.st_size == fileManifest['size'] and fileStat.st_mtime_ns == fileManifest['mtime']:
+        return None
+
+    # Compressed: read as a whole only
+    if isCompressedFile(inputFile):
+        return 0
+
+    # Appended to only if the bytes read before are unchanged (checked on the last bytes read)
+    if fileStat.st_size < fileManifest['bytes'] or getTailHash(inputFile, fileManifest['bytes']) != fileManifest['tailHash']:
+        return 0
+
+    return fileManifest['bytes'] if getCompleteBytes(inputFile, fileStat.st_size) > fileManifest['bytes'] else None
+
+####################################################################################################################################################################################
+# Function: Get the input to read from a byte of the input file up to another (the end of the last complete line) - with the header line if not from the start
+####################################################################################################################################################################################
+def getNewInputSource(inputFile: str, fromByte: int, toByte: int):
+
+    if fromByte == 0 and (isCompressedFile(inputFile) or toByte == os.path.getsize(inputFile)):
+        return inputFile
+
+    with open(inputFile, 'rb') as f:
+        headerLine = f.readline() if fromByte > 0 else b''
+        f.seek(fromByte)
+        newBytes = f.read(toByte - fromByte)
+
+    return io.BytesIO(headerLine + newBytes)
+
+####################################################################################################################################################################################
+# Function: Get the number of bytes of the input file up to the end of its last complete line (compressed: the whole file)
+####################################################################################################################################################################################
+def getCompleteBytes(inputFile: str, fileSize: int) -> int:
+
+    if isCompressedFile(inputFile):
+        return fileSize
+
+    # Last newline, searched from the end of the file backwards
+    with open(inputFile, 'rb') as f:
+        toByte = fileSize
+        while toByte > 0:
+            fromByte = max(0, toByte - tailHashBytes)
+            f.seek(fromByte)
+            newlineByte = f.read(toByte - fromByte).rfind(b'\n')
+            if newlineByte >= 0:
+                return fromByte + newlineByte + 1
+            toByte = fromByte
+
+    return 0
+
+####################################################################################################################################################################################
+# Function: Get the hash of the last bytes up to a byte of the input file
+####################################################################################################################################################################################
+def getTailHash(inputFile: str, toByte: int) -> str:
+
+    fromByte = max(0, toByte - tailHashBytes)
+    with open(inputFile, 'rb') as f:
+        f.seek(fromByte)
+        return hashlib.sha256(f.read(toByte - fromByte)).hexdigest()
+
+####################################################################################################################################################################################
+# Function: Get the settings the state is built with (a state built with other settings is rebuilt)
+####################################################################################################################################################################################
+def getStateSettings() -> dict:
+
+    stateSettings = {"stateVersion": stateVersion, "cubeVersion": cubeVersion, "yearFrom": yearFrom, "yearTo": yearTo}
+    stateSettings.update(getCleanupSettings())
+
+    return stateSettings
+
+def getStateCubeSettings(manifest: dict) -> dict:
+    return {"stateVersion": stateVersion, "runs": manifest['runs']}
+
+####################################################################################################################################################################################
+# Function: Get the results of the analyses that changed since they were last plotted
+####################################################################################################################################################################################
+def getChangedResults(analysisResults: dict) -> dict:
+
+    manifest = readJsonFile(stateManifestFile)
+    plottedDigests = manifest['results'] if manifest is not None else {}
+
+    changedResults = {analysisName: results for analysisName, results in analysisResults.items() if plottedDigests.get(analysisName) != getResultsDigest(results)}
+    print("Analyses changed: {} of {}".format(len(changedResults), len(analysisResults)))
+
+    return changedResults
+
+####################################################################################################################################################################################
+# Function: Save the digests of the results of the analyses plotted
+####################################################################################################################################################################################
+def saveResultsDigests(analysisResults: dict):
+
+    manifest = readJsonFile(stateManifestFile)
+    for analysisName, results in analysisResults.items():
+        manifest['results'][analysisName] = getResultsDigest(results)
+
+    writeJsonFile(stateManifestFile, manifest)
+
+####################################################################################################################################################################################
+# Function: Get the digest of the results (tables) of an analysis
+####################################################################################################################################################################################
+def getResultsDigest(results: dict) -> str:
+
+    resultsHash = hashlib.sha256()
+    for tableName, resultsDF in results.items():
+        resultsHash.update(json.dumps([tableName, resultsDF.to_json(orient='split')]).encode())
+
+    return resultsHash.hexdigest()
+
+
+####################################################################################################################################################################################
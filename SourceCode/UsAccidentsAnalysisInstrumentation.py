@@ -0,0 +1,149 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import pandas as pd
+import os
+import sys
+import json
+import tracemalloc
+# Peak RSS of the process: resource module on Unix, optional psutil package otherwise (e.g. Windows) - not measured without either
+try:
+    import resource
+except ImportError:
+    resource = None
+import datetime as dt
+import time
+import threading
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Instrumentation of the stages of a run (reading, clean up, each analysis, each chart saved ...): each stage is measured for wall time, CPU time,
+# rows in & out (of dataframes) & how much the stage raised the peak RSS of the process (0 when the stage stays below an earlier peak - not the peak of the stage itself;
+# + peak allocated in the stage when tracemalloc is tracing)
+# Once a run report is started the measures of each stage are appended to it as 1 JSON line - also from the processes started by the run (e.g. plotting the charts):
+# the report file & run id are passed to them in the environment
+
+# Environment variables of the run report (file & run id)
+runReportFileVariable = 'US_ACCIDENTS_RUN_REPORT'
+runIdVariable = 'US_ACCIDENTS_RUN_ID'
+
+# Unit of ru_maxrss: bytes on macOS, KB on Linux
+maxRssPerMB = 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+# Peak allocated (tracemalloc) of the stages running - stages run inside others (e.g. clean up of each chunk) & in threads (pipelined mode):
+# the traced peak is reset only after it is folded (max) into the peak of every stage running, so an inner stage does not wipe the peak of the outer ones
+runningStagesList = []
+runningStagesLock = threading.Lock()
+
+
+####################################################################################################################################################################################
+# Function: Start the run report - the measures of the stages are appended to the report file (returns the run id)
+####################################################################################################################################################################################
+def startRunReport(reportFile: str, runInfo: dict = None) -> str:
+
+    runId = dt.datetime.now().strftime('%Y%m%d_%H%M%S_') + str(os.getpid())
+    os.environ[runReportFileVariable] = os.path.abspath(reportFile)
+    os.environ[runIdVariable] = runId
+
+    os.makedirs(os.path.dirname(os.path.abspath(reportFile)), exist_ok=True)
+    writeReportLine({"event": "start", "info": runInfo or {}})
+
+    return runId
+
+####################################################################################################################################################################################
+# Function: Run a stage & measure it - result of the stage & measures (appended to the run report if started)
+####################################################################################################################################################################################
+def measureStage(stageName: str, stageFunction, *args, **kwargs) -> tuple:
+
+    rowsIn = len(args[0]) if len(args) > 0 and isinstance(args[0], pd.DataFrame) else None
+
+    stagePeak = None
+    if tracemalloc.is_tracing():
+        with runningStagesLock:
+            foldTracedPeak()
+            tracedBefore = tracemalloc.get_traced_memory()[0]
+            stagePeak = {"peak": tracedBefore}
+            runningStagesList.append(stagePeak)
+    peakRssBefore = getPeakRssMB()
+    cpuStartTime = time.process_time()
+    startTime = time.perf_counter()
+
+    try:
+        result = stageFunction(*args, **kwargs)
+    finally:
+        if stagePeak is not None:
+            with runningStagesLock:
+                foldTracedPeak()
+                # Removed by identity (the peaks of 2 stages may be equal)
+                runningStagesList[:] = [runningPeak for runningPeak in runningStagesList if runningPeak is not stagePeak]
+
+    peakRss = getPeakRssMB()
+    measures = {"stage": stageName,
+                "wallSec": round(time.perf_counter() - startTime, 4),
+                "cpuSec": round(time.process_time() - cpuStartTime, 4),
+                "peakRssMB": round(peakRss, 2) if peakRss is not None else None,
+                "peakRssRaisedMB": round(peakRss - peakRssBefore, 2) if peakRss is not None else None,
+                "rowsIn": rowsIn,
+                "rowsOut": len(result) if isinstance(result, pd.DataFrame) else None}
+    if stagePeak is not None:
+        measures['peakAllocatedMB'] = round((stagePeak['peak'] - tracedBefore) / (1024 * 1024), 2)
+
+    writeReportLine(dict(event="stage", **measures))
+
+    return result, measures
+
+####################################################################################################################################################################################
+# Function: Run a stage & measure it - result of the stage only
+####################################################################################################################################################################################
+def runStage(stageName: str, stageFunction, *args, **kwargs):
+    return measureStage(stageName, stageFunction, *args, **kwargs)[0]
+
+####################################################################################################################################################################################
+# Function: Fold the traced peak since the last reset into the peak of every stage running & reset it (called with runningStagesLock held)
+####################################################################################################################################################################################
+def foldTracedPeak():
+
+    tracedPeak = tracemalloc.get_traced_memory()[1]
+    for stagePeak in runningStagesList:
+        stagePeak['peak'] = max(stagePeak['peak'], tracedPeak)
+
+    tracemalloc.reset_peak()
+
+####################################################################################################################################################################################
+# Function: Get the peak RSS of the process so far in MB (peak working set with psutil on Windows) - None if not measured
+####################################################################################################################################################################################
+def getPeakRssMB():
+
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / maxRssPerMB
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    memoryInfo = psutil.Process().memory_info()
+    return getattr(memoryInfo, 'peak_wset', memoryInfo.rss) / (1024 * 1024)
+
+####################################################################################################################################################################################
+# Function: Append a line to the run report (if started) - with the run id, process id & time
+####################################################################################################################################################################################
+def writeReportLine(reportLine: dict):
+
+    reportFile = os.environ.get(runReportFileVariable)
+    if reportFile is None:
+        return
+
+    reportLine = dict(runId=os.environ.get(runIdVariable), pid=os.getpid(), time=dt.datetime.now().isoformat(timespec='milliseconds'), **reportLine)
+
+    # 1 write of a whole line in append mode (lines of several processes are not mixed)
+    with open(reportFile, 'a') as f:
+        f.write(json.dumps(reportLine) + '\n')
+
+
+####################################################################################################################################################################################
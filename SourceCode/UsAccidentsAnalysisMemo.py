@@ -0,0 +1,274 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import pandas as pd
+import numpy as np
+import os
+import json
+import pickle
+import hashlib
+import shutil
+import time
+
+# Import functions
+from UsAccidentsAnalysisFunctions import analysisResultsDict
+from UsAccidentsAnalysisFunctions import getCubeParts
+from UsAccidentsAnalysisCache import readJsonFile
+from UsAccidentsAnalysisCache import writeJsonFile
+from UsAccidentsAnalysisInstrumentation import runStage
+from UsAccidentsAnalysisInstrumentation import writeReportLine
+
+# Import configurations & global data
+from Configs import resultsCacheFilePath
+from Configs import resultsCacheMaxMB
+from Configs import outputFilePath
+from Configs import yearFrom
+from Configs import yearTo
+from Configs import numOfYears
+from Configs import severityWeightsList
+from Configs import drillDownTopN
+from Configs import drillDownMinCount
+from Configs import statesPopulationFile
+from Configs import timezonePopulationFile
+from Configs import countiesPopulationFile
+from Configs import citiesPopulationFile
+from Configs import statesPopulationDict
+from Configs import timezonePopulationDict
+from Configs import statesLandSqMilesDict
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Results cache: the results (tables) & the charts of each analysis are memoized in the results cache directory, 1 entry per analysis key:
+#   key = digest of the data the analysis reads (the part of the accidents cube with its dimensions only, other dimensions added up) +
+#         the analysis settings (years, severity weights, population & land area, drill-down top N ...) + the code of the analyses & charts
+# The accidents cube stands for the input data: the same input read by any mode (cache, streaming, backends, incremental ...) gives the same key -
+# - & an analysis not reading the data that changed (e.g. the weather analysis when only zipcodes changed) is still served from the cache
+# Charts of an entry: the chart files are copied to the entry - on a hit the output files are reused if unchanged, otherwise restored from the entry
+# Entries are removed least recently used first once the results cache is over resultsCacheMaxMB (at the end of the run)
+
+# Version of the results cache entries (entries of an older version are not reused)
+resultsCacheVersion = 1
+
+# Index of the entries: analysis, size & last use of each entry (by key)
+resultsCacheIndexFile = os.path.join(resultsCacheFilePath, 'index.json')
+
+# Source files of the analyses & charts (any change of the code gives new keys)
+codeFilesList = ['UsAccidentsAnalysisFunctions.py', 'UsAccidentsAnalysisCharts.py', 'UsAccidentsAnalysisMemo.py']
+
+# Stats of the run: analyses results served from the cache or computed, charts reused / restored from the cache or plotted, entries removed
+resultsCacheStatsDict = {"hits": 0, "misses": 0, "chartsReused": 0, "chartsRestored": 0, "chartsPlotted": 0, "evicted": 0}
+
+
+####################################################################################################################################################################################
+# Function: Get the results of the analyses - served from the results cache if memoized, otherwise computed & added to the cache (results & keys of the analyses)
+####################################################################################################################################################################################
+def getMemoizedResults(accidentsCube: dict, analysisNames: list) -> tuple:
+
+    cacheIndex = readCacheIndex()
+    settingsDigest = getSettingsDigest()
+
+    analysisResults = {}
+    analysisKeys = {}
+    for analysisName in analysisNames:
+        analysisKey = getAnalysisKey(accidentsCube, analysisName, settingsDigest)
+        analysisKeys[analysisName] = analysisKey
+        resultsFile = os.path.join(resultsCacheFilePath, analysisKey, 'results.pkl')
+
+        results = loadCachedResults(resultsFile) if analysisKey in cacheIndex['entries'] else None
+        if results is not None:
+            resultsCacheStatsDict['hits'] += 1
+            cacheIndex['entries'][analysisKey]['lastUsed'] = time.time()
+        else:
+            resultsCacheStatsDict['misses'] += 1
+            results = runStage('analysis:' + analysisName, analysisResultsDict[analysisName], accidentsCube)
+
+            # New entry (replaces an entry of the key with its results file missing)
+            shutil.rmtree(os.path.dirname(resultsFile), ignore_errors=True)
+            os.makedirs(os.path.dirname(resultsFile))
+            with open(resultsFile, 'wb') as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            cacheIndex['entries'][analysisKey] = {"analysis": analysisName, "lastUsed": time.time(), "bytes": os.path.getsize(resultsFile), "charts": None}
+
+        analysisResults[analysisName] = results
+
+    writeCacheIndex(cacheIndex)
+
+    return analysisResults, analysisKeys
+
+####################################################################################################################################################################################
+# Function: Get the results of the analyses to plot - the charts of the others are reused as they are or restored from the results cache
+####################################################################################################################################################################################
+def getUnplottedResults(analysisResults: dict, analysisKeys: dict) -> dict:
+
+    cacheIndex = readCacheIndex()
+
+    unplottedResults = {}
+    for analysisName, results in analysisResults.items():
+        cacheEntry = cacheIndex['entries'].get(analysisKeys[analysisName])
+
+        # Charts not in the cache (e.g. results computed with --no-charts) or not all restored
+        if cacheEntry is None or cacheEntry['charts'] is None or not all(restoreCachedChart(analysisKeys[analysisName], chart) for chart in cacheEntry['charts']):
+            unplottedResults[analysisName] = results
+
+    print("Analyses charts from the results cache: {} of {}".format(len(analysisResults) - len(unplottedResults), len(analysisResults)))
+
+    return unplottedResults
+
+####################################################################################################################################################################################
+# Function: Restore a chart file from the results cache (if changed or missing) - False if not in the cache
+####################################################################################################################################################################################
+def restoreCachedChart(analysisKey: str, chart: dict) -> bool:
+
+    if os.path.isfile(chart['file']) and getFileDigest(chart['file']) == chart['digest']:
+        resultsCacheStatsDict['chartsReused'] += 1
+        return True
+
+    cachedFile = os.path.join(resultsCacheFilePath, analysisKey, chart['cached'])
+    if not os.path.isfile(cachedFile):
+        return False
+
+    os.makedirs(os.path.dirname(chart['file']), exist_ok=True)
+    shutil.copyfile(cachedFile, chart['file'])
+    resultsCacheStatsDict['chartsRestored'] += 1
+
+    return True
+
+####################################################################################################################################################################################
+# Function: Add the charts plotted (chart files by analysis) to the entries of the analyses in the results cache
+####################################################################################################################################################################################
+def saveRenderedCharts(renderedCharts: dict, analysisKeys: dict):
+
+    cacheIndex = readCacheIndex()
+
+    for analysisName, chartFiles in renderedCharts.items():
+        analysisKey = analysisKeys[analysisName]
+        cacheEntry = cacheIndex['entries'].get(analysisKey)
+        if cacheEntry is None:
+            continue
+
+        # Chart files copied to the entry (numbered - file names may be the same in 2 output sub paths)
+        chartsDir = os.path.join(resultsCacheFilePath, analysisKey, 'charts')
+        shutil.rmtree(chartsDir, ignore_errors=True)
+        os.makedirs(chartsDir)
+        cacheEntry['charts'] = []
+        for chartNum, chartFile in enumerate(chartFiles):
+            cachedChart = os.path.join('charts', '{}_{}'.format(chartNum, os.path.basename(chartFile)))
+            shutil.copyfile(chartFile, os.path.join(resultsCacheFilePath, analysisKey, cachedChart))
+            cacheEntry['charts'].append({"file": chartFile, "cached": cachedChart, "digest": getFileDigest(chartFile)})
+
+        cacheEntry['bytes'] = getDirectoryBytes(os.path.join(resultsCacheFilePath, analysisKey))
+        resultsCacheStatsDict['chartsPlotted'] += len(chartFiles)
+
+    writeCacheIndex(cacheIndex)
+
+####################################################################################################################################################################################
+# Function: Close the results cache at the end of the run - least recently used entries removed over the maximum size & stats of the run printed
+####################################################################################################################################################################################
+def closeResultsCache():
+
+    cacheIndex = readCacheIndex()
+
+    # Least recently used first
+    cacheBytes = sum(cacheEntry['bytes'] for cacheEntry in cacheIndex['entries'].values())
+    for analysisKey in sorted(cacheIndex['entries'], key=lambda analysisKey: cacheIndex['entries'][analysisKey]['lastUsed']):
+        if cacheBytes <= resultsCacheMaxMB * 1024 * 1024:
+            break
+        cacheBytes = cacheBytes - cacheIndex['entries'].pop(analysisKey)['bytes']
+        shutil.rmtree(os.path.join(resultsCacheFilePath, analysisKey), ignore_errors=True)
+        resultsCacheStatsDict['evicted'] += 1
+
+    writeCacheIndex(cacheIndex)
+
+    cacheStats = dict(resultsCacheStatsDict, entries=len(cacheIndex['entries']), sizeMB=round(cacheBytes / (1024 * 1024), 2))
+    writeReportLine(dict(event="resultsCache", **cacheStats))
+    print("Results cache: hits: {hits}, misses: {misses}, charts reused: {chartsReused}, restored: {chartsRestored}, plotted: {chartsPlotted}, "
+          "entries evicted: {evicted}, entries: {entries}, size: {sizeMB} MB (max: {maxMB} MB)".format(maxMB=resultsCacheMaxMB, **cacheStats))
+
+####################################################################################################################################################################################
+# Function: Get the key of an analysis in the results cache - digest of the data read by the analysis & of the analysis settings
+####################################################################################################################################################################################
+def getAnalysisKey(accidentsCube: dict, analysisName: str, settingsDigest: str) -> str:
+
+    keyHash = hashlib.sha256()
+    keyHash.update(json.dumps([resultsCacheVersion, analysisName, settingsDigest]).encode())
+
+    # Parts of the cube read by the analysis, with the dimensions of the analysis only (counts of the other dimensions added up)
+    for part, partDims in getCubeParts([analysisName]).items():
+        partCounts = accidentsCube[part]
+        otherAxes = tuple(axis for axis, dim in enumerate(partCounts['dims']) if dim not in partDims)
+        counts = partCounts['counts'].sum(axis=otherAxes) if len(otherAxes) > 0 else partCounts['counts']
+        labels = [[str(label) for label in dimLabels] for dim, dimLabels in zip(partCounts['dims'], partCounts['labels']) if dim in partDims]
+
+        keyHash.update(json.dumps([part, partDims, labels, counts.shape]).encode())
+        keyHash.update(np.ascontiguousarray(counts, dtype=np.int64).tobytes())
+
+    return keyHash.hexdigest()[:32]
+
+####################################################################################################################################################################################
+# Function: Get the digest of the settings of the analyses & charts (same for all analyses of a run)
+####################################################################################################################################################################################
+def getSettingsDigest() -> str:
+
+    codeDir = os.path.dirname(os.path.abspath(__file__))
+    analysisSettings = {"yearFrom": yearFrom,
+                        "yearTo": yearTo,
+                        "numOfYears": numOfYears,
+                        "severityWeights": severityWeightsList,
+                        "drillDownTopN": drillDownTopN,
+                        "drillDownMinCount": drillDownMinCount,
+                        "statesPopulation": statesPopulationDict,
+                        "timezonePopulation": timezonePopulationDict,
+                        "statesLandSqMiles": statesLandSqMilesDict,
+                        "populationFiles": [getFileDigest(populationFile) for populationFile in [statesPopulationFile, timezonePopulationFile, countiesPopulationFile, citiesPopulationFile]],
+                        "outputFilePath": os.path.abspath(outputFilePath),
+                        "code": [getFileDigest(os.path.join(codeDir, codeFile)) for codeFile in codeFilesList],
+                        "pandas": pd.__version__}
+
+    return hashlib.sha256(json.dumps(analysisSettings, sort_keys=True).encode()).hexdigest()
+
+####################################################################################################################################################################################
+# Function: Load the results of an analysis from the results cache - None if missing or not readable
+####################################################################################################################################################################################
+def loadCachedResults(resultsFile: str):
+
+    try:
+        with open(resultsFile, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+####################################################################################################################################################################################
+# Function: Read / write the index of the results cache
+####################################################################################################################################################################################
+def readCacheIndex() -> dict:
+
+    cacheIndex = readJsonFile(resultsCacheIndexFile)
+
+    return cacheIndex if cacheIndex is not None else {"entries": {}}
+
+def writeCacheIndex(cacheIndex: dict):
+
+    os.makedirs(resultsCacheFilePath, exist_ok=True)
+    writeJsonFile(resultsCacheIndexFile, cacheIndex)
+
+####################################################################################################################################################################################
+# Function: Get the digest of a file (None if missing) / the size of all files of a directory
+####################################################################################################################################################################################
+def getFileDigest(filePath: str):
+
+    if not os.path.isfile(filePath):
+        return None
+
+    with open(filePath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def getDirectoryBytes(dirPath: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, fileName)) for root, dirs, fileNames in os.walk(dirPath) for fileName in fileNames)
+
+
+####################################################################################################################################################################################
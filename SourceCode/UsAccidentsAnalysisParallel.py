@@ -0,0 +1,197 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import os
+import io
+import time
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getInputData
+from UsAccidentsAnalysisFunctions import getInputColumns
+from UsAccidentsAnalysisFunctions import getInputDtypes
+from UsAccidentsAnalysisFunctions import getChunkedCube
+from UsAccidentsAnalysisFunctions import mergeAccidentsCubes
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisFunctions import isCompressedFile
+from UsAccidentsAnalysisInstrumentation import runStage
+
+# Import configurations & global data
+from Configs import typedIngest
+from Configs import parseShardMinMB
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Parallel parsing of the input file: the file (after the header line) is split into shards - byte ranges starting & ending at the start of a line -
+# each shard is read & parsed by a process of a pool (only the columns needed, typed - as for the whole file), & returns either:
+#   - the accidents cube of its rows (cleaned & with date columns, not finalized) - the cubes are merged (counts added up), or
+#   - its rows (parsed, not cleaned) - the dataframes are concatenated in the order of the shards (same rows & order as reading the whole file)
+# There are more shards than processes (a process that is done takes the next shard), at least parseShardMinMB per shard
+# Note: shards are split at line ends - values with line breaks (quoted) would be split (there are none in the US_Accidents data)
+# Compressed input files cannot be split by bytes: they are read as a whole (decompressed as a stream)
+# Several input files (e.g. monthly files): each file is read, cleaned & aggregated in chunks by a process of a pool & the cubes are merged (in the order of the files)
+
+# Number of shards per process
+shardsPerProcess = 4
+
+
+####################################################################################################################################################################################
+# Function: Split the input file into shards - header line & (start, end) byte of each shard
+####################################################################################################################################################################################
+def getInputShards(inputFile: str, shardCount: int) -> tuple:
+
+    fileSize = os.path.getsize(inputFile)
+
+    with open(inputFile, 'rb') as f:
+        headerLine = f.readline()
+        dataStart = f.tell()
+
+        # Shard ends: at about equal sizes, moved to the start of the next line
+        shardEnds = []
+        for i in range(1, shardCount):
+            f.seek(dataStart + (fileSize - dataStart) * i // shardCount)
+            f.readline()
+            shardEnds.append(min(f.tell(), fileSize))
+        shardEnds.append(fileSize)
+
+    # Shards without rows removed (a shard end moved past the next one)
+    shardStarts = [dataStart] + shardEnds[:-1]
+    shards = [(start, end) for start, end in zip(shardStarts, shardEnds) if end > start]
+
+    return headerLine, shards
+
+####################################################################################################################################################################################
+# Function: Get the number of shards of the input file for a number of processes
+####################################################################################################################################################################################
+def getShardCount(inputFile: str, processes: int) -> int:
+    return max(1, min(processes * shardsPerProcess, os.path.getsize(inputFile) // (parseShardMinMB * 1024 * 1024)))
+
+####################################################################################################################################################################################
+# Function: Get a shard of the input file to read - with the header line
+####################################################################################################################################################################################
+def getShardSource(inputFile: str, headerLine: bytes, start: int, end: int) -> io.BytesIO:
+
+    with open(inputFile, 'rb') as f:
+        f.seek(start)
+        return io.BytesIO(headerLine + f.read(end - start))
+
+####################################################################################################################################################################################
+# Function: Parse a shard of the input file (in a process of the pool) - only the columns needed, typed (all columns as is if no columns given)
+####################################################################################################################################################################################
+def getShardData(inputFile: str, headerLine: bytes, start: int, end: int, inputColumns: list = None) -> pd.DataFrame:
+
+    shardSource = getShardSource(inputFile, headerLine, start, end)
+
+    if inputColumns is None:
+        return pd.read_csv(shardSource)
+
+    return pd.read_csv(shardSource, usecols=inputColumns, dtype=getInputDtypes(inputColumns))
+
+####################################################################################################################################################################################
+# Function: Get the accidents cube (not finalized) of a shard of the input file (in a process of the pool) - cube & number of rows read
+####################################################################################################################################################################################
+def getShardCube(inputFile: str, headerLine: bytes, start: int, end: int, cubeParts: dict = None) -> tuple:
+    return runStage('getShardCube', getChunkedCube, getShardSource(inputFile, headerLine, start, end), cubeParts)
+
+####################################################################################################################################################################################
+# Function: Parse the input file in a pool of processes - rows of all shards (in order) as 1 dataframe
+####################################################################################################################################################################################
+def getParallelInputData(inputFile: str, processes: int, inputColumns: list = None) -> pd.DataFrame:
+
+    if isCompressedFile(inputFile):
+        return getInputData(inputFile, inputColumns)
+
+    # Typed ingest: only the columns needed with compact data types
+    if inputColumns is None and typedIngest:
+        inputColumns = getInputColumns()
+
+    startTime = time.perf_counter()
+    headerLine, shards = getInputShards(inputFile, getShardCount(inputFile, processes))
+
+    with ProcessPoolExecutor(max_workers=min(processes, len(shards))) as executor:
+        futures = [executor.submit(getShardData, inputFile, headerLine, start, end, inputColumns) for start, end in shards]
+        shardDataFrames = [future.result() for future in futures]
+
+    inputDF = concatInputData(shardDataFrames)
+    print("Dataframe created (parallel ingest): {} rows, {} columns, {} shards, {} processes, parse time: {:.2f} sec".format(len(inputDF), len(inputDF.columns), len(shards), processes, time.perf_counter() - startTime))
+
+    return inputDF
+
+####################################################################################################################################################################################
+# Function: Get the accidents cube (finalized) of the input file in a pool of processes - cubes of the shards merged (in order)
+####################################################################################################################################################################################
+def getParallelCube(inputFile: str, processes: int, cubeParts: dict = None) -> dict:
+
+    if isCompressedFile(inputFile):
+        return getFilesCube([inputFile], 1, cubeParts)
+
+    startTime = time.perf_counter()
+    headerLine, shards = getInputShards(inputFile, getShardCount(inputFile, processes))
+
+    with ProcessPoolExecutor(max_workers=min(processes, len(shards))) as executor:
+        futures = [executor.submit(getShardCube, inputFile, headerLine, start, end, cubeParts) for start, end in shards]
+
+        accidentsCube = {}
+        rowCount = 0
+        for future in futures:
+            shardCube, shardRowCount = future.result()
+            accidentsCube = mergeAccidentsCubes(accidentsCube, shardCube)
+            rowCount = rowCount + shardRowCount
+
+    print("Parallel ingest done, Number of rows read: {}, {} shards, {} processes, time: {:.2f} sec".format(rowCount, len(shards), processes, time.perf_counter() - startTime))
+
+    return finalizeAccidentsCube(accidentsCube)
+
+####################################################################################################################################################################################
+# Function: Get the accidents cubes (not finalized) of several inputs (files or file objects) in a pool of processes - cube & number of rows read of each input (in order)
+####################################################################################################################################################################################
+def getFilesCubes(inputSources: list, processes: int, cubeParts: dict = None) -> list:
+
+    # 0 processes: 1 per CPU core
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+
+    if processes == 1 or len(inputSources) <= 1:
+        return [runStage('getFileCube', getChunkedCube, inputSource, cubeParts) for inputSource in inputSources]
+
+    with ProcessPoolExecutor(max_workers=min(processes, len(inputSources))) as executor:
+        futures = [executor.submit(runStage, 'getFileCube', getChunkedCube, inputSource, cubeParts) for inputSource in inputSources]
+        return [future.result() for future in futures]
+
+####################################################################################################################################################################################
+# Function: Get the accidents cube (finalized) of several input files in a pool of processes - cubes of the files merged (in order)
+####################################################################################################################################################################################
+def getFilesCube(inputFiles: list, processes: int, cubeParts: dict = None) -> dict:
+
+    startTime = time.perf_counter()
+
+    accidentsCube = {}
+    rowCount = 0
+    for fileCube, fileRowCount in getFilesCubes(inputFiles, processes, cubeParts):
+        accidentsCube = mergeAccidentsCubes(accidentsCube, fileCube)
+        rowCount = rowCount + fileRowCount
+
+    print("Input files done, Number of files: {}, Number of rows read: {}, time: {:.2f} sec".format(len(inputFiles), rowCount, time.perf_counter() - startTime))
+
+    return finalizeAccidentsCube(accidentsCube)
+
+####################################################################################################################################################################################
+# Function: Concatenate the dataframes of the shards - categoricals with the categories of all shards (sorted)
+####################################################################################################################################################################################
+def concatInputData(shardDataFrames: list) -> pd.DataFrame:
+
+    inputDF = pd.concat(shardDataFrames, ignore_index=True)
+
+    for col in shardDataFrames[0].select_dtypes(include='category').columns:
+        inputDF[col] = pd.api.types.union_categoricals([shardDF[col] for shardDF in shardDataFrames], sort_categories=True)
+
+    return inputDF
+
+
+####################################################################################################################################################################################
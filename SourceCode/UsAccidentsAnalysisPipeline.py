@@ -0,0 +1,129 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import threading
+import queue
+import time
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getChunkReader
+from UsAccidentsAnalysisFunctions import getCleanedChunks
+from UsAccidentsAnalysisFunctions import getAccidentsCube
+from UsAccidentsAnalysisFunctions import mergeAccidentsCubes
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisInstrumentation import runStage
+
+# Import configurations & global data
+from Configs import pipelineQueueSize
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Pipelined mode: the chunks of the input file go through 3 stages running at the same time (1 thread each), linked by bounded queues:
+#   read (parse chunk N+1) -> clean up & date columns (chunk N) -> aggregate into the accidents cube (chunk N-1)
+# pandas releases the GIL while parsing & in most numpy work, so the stages overlap (I/O & parsing with the transform & aggregation)
+# A full queue blocks the stage before it (backpressure): at most 2 x pipelineQueueSize + 3 chunks in memory
+# An error in a stage is passed down the queues & raised by the aggregation (main thread); the other stages are stopped
+
+# Marker of the end of the chunks in a queue
+pipelineEnd = 'pipelineEnd'
+
+# Wait (in sec) of a stage on a full queue before checking if the pipeline is stopped
+queueWaitSec = 0.1
+
+
+####################################################################################################################################################################################
+# Function: Pipelined mode - read, clean, add date columns & aggregate the chunks of the input file at the same time; cube finalized
+####################################################################################################################################################################################
+def getPipelinedCube(inputFile: str, cubeParts: dict = None) -> dict:
+
+    accidentsCube, rowCount = getPipelinedChunkedCube(inputFile, cubeParts)
+
+    return finalizeAccidentsCube(accidentsCube)
+
+####################################################################################################################################################################################
+# Function: Pipelined mode - read (file or file object), clean, add date columns & aggregate the chunks at the same time - cube (not finalized) & number of rows read
+####################################################################################################################################################################################
+def getPipelinedChunkedCube(inputSource, cubeParts: dict = None) -> tuple:
+
+    startTime = time.perf_counter()
+    readQueue = queue.Queue(maxsize=pipelineQueueSize)
+    cleanQueue = queue.Queue(maxsize=pipelineQueueSize)
+    stopEvent = threading.Event()
+
+    # Stages in threads: read -> clean up & date columns
+    stageThreads = [threading.Thread(target=putQueueItems, args=(getChunkReader(inputSource, cubeParts), readQueue, stopEvent), name='pipeline-read', daemon=True),
+                    threading.Thread(target=putQueueItems, args=(getCleanedChunks(getQueueItems(readQueue, stopEvent)), cleanQueue, stopEvent), name='pipeline-clean', daemon=True)]
+    for stageThread in stageThreads:
+        stageThread.start()
+
+    # Aggregation (this thread): cube of each chunk merged with the cube so far
+    accidentsCube = {}
+    rowCountBeforeCleanup = 0
+    rowCountAfterCleanup = 0
+    try:
+        for chunkNum, (chunkDF, chunkRowCount) in enumerate(getQueueItems(cleanQueue, stopEvent)):
+            rowCountBeforeCleanup = rowCountBeforeCleanup + chunkRowCount
+            rowCountAfterCleanup = rowCountAfterCleanup + len(chunkDF)
+            if len(chunkDF) > 0:
+                accidentsCube = mergeAccidentsCubes(accidentsCube, runStage('getAccidentsCube', getAccidentsCube, chunkDF, cubeParts))
+            print("Chunk {} processed (pipelined), rows read so far: {}".format(chunkNum + 1, rowCountBeforeCleanup))
+    finally:
+        # Stop the stages (e.g. on an error) & wait for them
+        stopEvent.set()
+        for stageThread in stageThreads:
+            stageThread.join()
+
+    print("Pipelined streaming done, Number of rows read: {}, Number of rows deleted: {}, time: {:.2f} sec".format(rowCountBeforeCleanup, rowCountBeforeCleanup - rowCountAfterCleanup, time.perf_counter() - startTime))
+
+    return accidentsCube, rowCountBeforeCleanup
+
+####################################################################################################################################################################################
+# Function: Stage of the pipeline (in a thread) - put the items (e.g. chunks) on the queue, then the end marker (or the error of the stage)
+####################################################################################################################################################################################
+def putQueueItems(items, outputQueue: queue.Queue, stopEvent: threading.Event):
+
+    try:
+        for item in items:
+            if not putQueueItem(outputQueue, item, stopEvent):
+                return
+        putQueueItem(outputQueue, pipelineEnd, stopEvent)
+    except Exception as error:
+        putQueueItem(outputQueue, error, stopEvent)
+
+####################################################################################################################################################################################
+# Function: Put an item on a queue - waits while the queue is full (backpressure) until the pipeline is stopped (returns False if stopped)
+####################################################################################################################################################################################
+def putQueueItem(outputQueue: queue.Queue, item, stopEvent: threading.Event) -> bool:
+
+    while not stopEvent.is_set():
+        try:
+            outputQueue.put(item, timeout=queueWaitSec)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+####################################################################################################################################################################################
+# Function: Get the items of a queue up to the end marker (or until the pipeline is stopped) - the error of a stage before is raised
+####################################################################################################################################################################################
+def getQueueItems(inputQueue: queue.Queue, stopEvent: threading.Event):
+
+    while not stopEvent.is_set():
+        try:
+            item = inputQueue.get(timeout=queueWaitSec)
+        except queue.Empty:
+            continue
+        if isinstance(item, str) and item == pipelineEnd:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+####################################################################################################################################################################################
@@ -0,0 +1,429 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import math
+import os
+import time
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getChunkReader
+from UsAccidentsAnalysisFunctions import getCleanedChunks
+from UsAccidentsAnalysisFunctions import getDimCodes
+from UsAccidentsAnalysisFunctions import isCompressedFile
+from UsAccidentsAnalysisFunctions import timeKeysDict
+from UsAccidentsAnalysisFunctions import weekdayNamesList
+from UsAccidentsAnalysisFunctions import unknownKeyLabel
+from UsAccidentsAnalysisParallel import getInputShards
+from UsAccidentsAnalysisParallel import getShardSource
+from UsAccidentsAnalysisInstrumentation import runStage
+
+# Import configurations & global data
+from Configs import sketchErrorRate
+from Configs import sketchConfidence
+from Configs import sketchTopCounters
+from Configs import sketchHllPrecision
+from Configs import sketchReservoirSize
+from Configs import sketchSampleBlocks
+from Configs import drillDownTopN
+
+####################################################################################################################################################################################
+# Function(s) Definitions:
+####################################################################################################################################################################################
+
+
+# Approximate mode: the input file is read once in chunks (cleaned & with date columns as in streaming mode) & each chunk is summarized into sketches of a fixed size,
+# whatever the number of rows or keys - the sketches of chunks, blocks of lines & files are merged (added up), so they can be built by a pool of processes:
+#   - count-min (counts by State, Timezone, Month, Hour, Weekday): never under-estimates, over-estimates by at most sketchErrorRate x rows (with sketchConfidence) -
+#     - the keys looked up: the states & timezones seen (kept as sets, a few dozen keys), all months, hours & weekdays
+#   - Space-Saving (top weather conditions & cities): counters of the top keys with the error of each (count - error <= true count <= count)
+#   - HyperLogLog (number of distinct cities & zipcodes): registers of the highest rank of the hashes, standard error 1.04 / sqrt(registers)
+#   - reservoir samples (sketchReservoirSize rows per state): the rows with the smallest hashes of their ID - same sample whatever the order or chunks of the rows
+# Keys are pre-aggregated in each chunk (1 hashed pass) - the sketches are updated with the counts of the keys of the chunk, not row by row
+# Sampled mode (sample fraction < 1): only a random sample of blocks of lines is read - counts are scaled up & their bounds widened by the sampling error
+# (rows treated as sampled independently - blocks of lines that are alike widen it more); distinct counts are for the rows read (not scaled)
+
+# Dimensions counted in count-min sketches - keys looked up: the keys seen of the dimensions below, all months, hours & weekdays
+countMinDimsList = ['State', 'Timezone', 'Month', 'Hour', 'Weekday']
+
+# Dimensions with the set of keys seen kept (few keys - not in the population dicts of Configs for the ones missing there)
+keysSeenDimsList = ['State', 'Timezone']
+
+# Dimensions of the top keys (Space-Saving) & of the distinct counts (HyperLogLog)
+topKeysDimsList = ['Weather_Condition', 'City-State']
+distinctDimsList = ['City-State', 'Zipcode']
+
+# Dimensions read from the input file for the sketches (Severity: sampled rows)
+sketchPartsDict = {"Sketches" : countMinDimsList + topKeysDimsList + distinctDimsList + ['Severity']}
+
+# z value of the 95% confidence intervals
+confidenceZ = 1.96
+
+# Seed of the random sample of blocks of lines (same blocks for the same file)
+sampleSeed = 2019
+
+
+####################################################################################################################################################################################
+# Function: Get the sketches of several input files (merged) - all rows or a random sample of blocks of lines of each file, in a pool of processes
+####################################################################################################################################################################################
+def getFilesSketches(inputFiles: list, sampleFraction: float = 1.0, processes: int = 1) -> dict:
+
+    startTime = time.perf_counter()
+
+    # Sources to sketch: whole files, or blocks of lines (byte ranges) of the files sampled - with the bytes read & the bytes of the files
+    sketchSources = []
+    bytesRead = 0
+    bytesTotal = 0
+    for inputFile in inputFiles:
+        fileSources, fileBytesRead, fileBytesTotal = getSampleSources(inputFile, sampleFraction)
+        sketchSources.extend(fileSources)
+        bytesRead = bytesRead + fileBytesRead
+        bytesTotal = bytesTotal + fileBytesTotal
+
+    if processes <= 1 or len(sketchSources) <= 1:
+        sourcesSketches = [getSourceSketches(*sketchSource) for sketchSource in sketchSources]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(sketchSources))) as executor:
+            futures = [executor.submit(getSourceSketches, *sketchSource) for sketchSource in sketchSources]
+            sourcesSketches = [future.result() for future in futures]
+
+    sketches = {}
+    for sourceSketches in sourcesSketches:
+        sketches = mergeSketches(sketches, sourceSketches)
+    sketches['sampleFraction'] = bytesRead / bytesTotal if bytesTotal > 0 else 1.0
+
+    print("Sketches done, Number of rows read: {}, sample of the input: {:.1%}, sketches memory: {:.1f} KB, time: {:.2f} sec".format(
+          sketches['rowsRead'], sketches['sampleFraction'], getSketchesBytes(sketches) / 1024, time.perf_counter() - startTime))
+
+    return sketches
+
+####################################################################################################################################################################################
+# Function: Get the sources to sketch of an input file - whole file or a random sample of its blocks of lines (file, header line, start, end), bytes read & bytes of the file
+####################################################################################################################################################################################
+def getSampleSources(inputFile: str, sampleFraction: float) -> tuple:
+
+    # Compressed files cannot be split by bytes (see UsAccidentsAnalysisParallel): read as a whole
+    if sampleFraction >= 1 or isCompressedFile(inputFile):
+        return [(inputFile,)], os.path.getsize(inputFile), os.path.getsize(inputFile)
+
+    headerLine, blocks = getInputShards(inputFile, sketchSampleBlocks)
+    sampleSize = min(len(blocks), max(1, round(sampleFraction * len(blocks))))
+    sampleBlocks = sorted(np.random.default_rng(sampleSeed).choice(len(blocks), size=sampleSize, replace=False))
+
+    sampleSources = [(inputFile, headerLine, blocks[i][0], blocks[i][1]) for i in sampleBlocks]
+    bytesRead = sum(blocks[i][1] - blocks[i][0] for i in sampleBlocks)
+
+    return sampleSources, bytesRead, sum(end - start for start, end in blocks)
+
+####################################################################################################################################################################################
+# Function: Get the sketches of a source (in a process of the pool) - input file, or a block of lines of the input file (header line, start & end byte)
+####################################################################################################################################################################################
+def getSourceSketches(inputFile: str, headerLine: bytes = None, start: int = None, end: int = None) -> dict:
+
+    inputSource = inputFile if headerLine is None else getShardSource(inputFile, headerLine, start, end)
+    return runStage('getSourceSketches', getChunkedSketches, inputSource)
+
+####################################################################################################################################################################################
+# Function: Read (file or file object), clean, add date columns & sketch the rows chunk by chunk - sketches of all chunks merged
+####################################################################################################################################################################################
+def getChunkedSketches(inputSource) -> dict:
+
+    sketches = {}
+    for chunkDF, chunkRowCount in getCleanedChunks(getChunkReader(inputSource, sketchPartsDict)):
+        chunkSketches = getChunkSketches(chunkDF)
+        chunkSketches['rowsRead'] = chunkRowCount
+        sketches = mergeSketches(sketches, chunkSketches)
+
+    return sketches
+
+####################################################################################################################################################################################
+# Function: Get the sketches of a chunk (cleaned & with date columns) - from the counts of the keys of the chunk
+####################################################################################################################################################################################
+def getChunkSketches(chunkDF: pd.DataFrame) -> dict:
+
+    sketches = {"rowsRead": len(chunkDF), "rowsKept": len(chunkDF), "countMin": {}, "topKeys": {}, "distinct": {}, "keysSeen": {}}
+
+    for dim in set(countMinDimsList + topKeysDimsList + distinctDimsList):
+        labels, counts = getChunkKeyCounts(chunkDF, dim)
+        hashes = getKeyHashes(labels, dim)
+
+        if dim in countMinDimsList:
+            sketches['countMin'][dim] = getCountMinTable(hashes, counts)
+        if dim in topKeysDimsList:
+            sketches['topKeys'][dim] = getTopKeys(labels, counts, dim)
+        if dim in distinctDimsList:
+            sketches['distinct'][dim] = getDistinctRegisters(hashes)
+        if dim in keysSeenDimsList:
+            sketches['keysSeen'][dim] = np.asarray(labels, dtype=str)
+
+    sketches['samples'] = getStateSamples(chunkDF)
+
+    return sketches
+
+####################################################################################################################################################################################
+# Function: Get the keys of a dimension in a chunk & the number of rows of each - rows without a value not counted
+####################################################################################################################################################################################
+def getChunkKeyCounts(chunkDF: pd.DataFrame, dim: str) -> tuple:
+
+    codes, labels = getDimCodes(chunkDF, dim)
+    counts = np.bincount(codes, minlength=len(labels))
+
+    keep = (counts > 0) & (labels != unknownKeyLabel)
+
+    return labels[keep], counts[keep]
+
+####################################################################################################################################################################################
+# Function: Merge 2 sets of sketches (e.g. sketches of chunks) - counts added up, top counters merged, registers maxed, samples merged
+####################################################################################################################################################################################
+def mergeSketches(sketches: dict, partialSketches: dict) -> dict:
+
+    if len(sketches) == 0:
+        return partialSketches
+
+    sketches['rowsRead'] = sketches['rowsRead'] + partialSketches['rowsRead']
+    sketches['rowsKept'] = sketches['rowsKept'] + partialSketches['rowsKept']
+    for dim, table in partialSketches['countMin'].items():
+        sketches['countMin'][dim] = sketches['countMin'][dim] + table
+    for dim, topKeys in partialSketches['topKeys'].items():
+        sketches['topKeys'][dim] = mergeTopKeys(sketches['topKeys'][dim], topKeys)
+    for dim, registers in partialSketches['distinct'].items():
+        sketches['distinct'][dim] = np.maximum(sketches['distinct'][dim], registers)
+    for dim, keys in partialSketches['keysSeen'].items():
+        sketches['keysSeen'][dim] = np.union1d(sketches['keysSeen'][dim], keys)
+    sketches['samples'] = mergeStateSamples(sketches['samples'], partialSketches['samples'])
+
+    return sketches
+
+####################################################################################################################################################################################
+# Function: Get the sizes of the count-min tables - width (columns) & depth (rows, 1 hash per row)
+####################################################################################################################################################################################
+def getCountMinShape() -> tuple:
+    return math.ceil(math.e / sketchErrorRate), math.ceil(math.log(1 / (1 - sketchConfidence)))
+
+####################################################################################################################################################################################
+# Function: Get the 64 bit hashes of keys - same hash for the same key whatever its type (categorical, string, integer width), different for each dimension
+####################################################################################################################################################################################
+def getKeyHashes(keys, dim: str) -> np.ndarray:
+
+    keys = np.asarray(keys)
+    keys = keys.astype('int64') if np.issubdtype(keys.dtype, np.number) else keys.astype(str).astype(object)
+    dimSalt = pd.util.hash_array(np.array([dim], dtype=object))[0]
+
+    return pd.util.hash_array(pd.util.hash_array(keys) ^ dimSalt)
+
+####################################################################################################################################################################################
+# Function: Get the positions of the hashes in the rows of a count-min table - 1 hash per row from 2 halves of the 64 bit hash (h1 + row x h2)
+####################################################################################################################################################################################
+def getCountMinPositions(hashes: np.ndarray, width: int, depth: int) -> list:
+
+    hash1 = hashes & np.uint64(0xFFFFFFFF)
+    hash2 = (hashes >> np.uint64(32)) | np.uint64(1)
+
+    return [((hash1 + np.uint64(row) * hash2) % np.uint64(width)).astype(np.intp) for row in range(depth)]
+
+####################################################################################################################################################################################
+# Function: Get the count-min table of keys & their counts
+####################################################################################################################################################################################
+def getCountMinTable(hashes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+
+    width, depth = getCountMinShape()
+    table = np.zeros((depth, width), dtype='int64')
+    for row, positions in enumerate(getCountMinPositions(hashes, width, depth)):
+        table[row] = np.bincount(positions, weights=counts, minlength=width).astype('int64')
+
+    return table
+
+####################################################################################################################################################################################
+# Function: Get the counts of keys from a count-min table - lowest count of the rows (never under the true count)
+####################################################################################################################################################################################
+def getCountMinCounts(table: np.ndarray, keys, dim: str) -> np.ndarray:
+
+    depth, width = table.shape
+    positions = getCountMinPositions(getKeyHashes(keys, dim), width, depth)
+
+    return np.min([table[row, rowPositions] for row, rowPositions in enumerate(positions)], axis=0)
+
+####################################################################################################################################################################################
+# Function: Get the Space-Saving summary (top keys) of keys & their exact counts (e.g. of a chunk) - no error, top sketchTopCounters kept
+####################################################################################################################################################################################
+def getTopKeys(keys: np.ndarray, counts: np.ndarray, dim: str) -> dict:
+
+    # Keys by count (same counts: in key order) - bound of the keys not kept: highest count left out
+    order = np.argsort(-counts, kind='stable')
+    bound = int(counts[order[sketchTopCounters]]) if len(order) > sketchTopCounters else 0
+    order = order[:sketchTopCounters]
+
+    return {"counters": pd.DataFrame({"Count": counts[order].astype('int64'), "Error": 0}, index=pd.Index(keys[order], name=dim)), "bound": bound}
+
+####################################################################################################################################################################################
+# Function: Merge 2 Space-Saving summaries (top keys) - counts & errors added up (a key not kept by a summary: its bound), top sketchTopCounters kept
+####################################################################################################################################################################################
+def mergeTopKeys(topKeys: dict, partialTopKeys: dict) -> dict:
+
+    counters = topKeys['counters']
+    partialCounters = partialTopKeys['counters']
+    keys = counters.index.union(partialCounters.index)
+
+    # Count: upper bound of the true count (a key not in a summary may have had up to its bound), Error: count - lower bound
+    counts = counters['Count'].reindex(keys, fill_value=topKeys['bound']) + partialCounters['Count'].reindex(keys, fill_value=partialTopKeys['bound'])
+    lowerCounts = (counters['Count'] - counters['Error']).reindex(keys, fill_value=0) + (partialCounters['Count'] - partialCounters['Error']).reindex(keys, fill_value=0)
+    mergedCounters = pd.DataFrame({"Count": counts, "Error": counts - lowerCounts})
+
+    # Top counters kept - bound of the keys not kept: highest count left out (or not in either summary)
+    mergedCounters = mergedCounters.sort_values('Count', ascending=False, kind='stable')
+    bound = topKeys['bound'] + partialTopKeys['bound']
+    if len(mergedCounters) > sketchTopCounters:
+        bound = max(bound, int(mergedCounters['Count'].iloc[sketchTopCounters]))
+        mergedCounters = mergedCounters.iloc[:sketchTopCounters]
+
+    return {"counters": mergedCounters, "bound": bound}
+
+####################################################################################################################################################################################
+# Function: Get the HyperLogLog registers of hashes - highest rank (position of the first 1 bit after the register bits) by register
+####################################################################################################################################################################################
+def getDistinctRegisters(hashes: np.ndarray) -> np.ndarray:
+
+    rankBits = 64 - sketchHllPrecision
+    registers = np.zeros(2 ** sketchHllPrecision, dtype='uint8')
+
+    # Register: first bits of the hash, rank: leading zeros of the other bits + 1 (bit length from the float exponent)
+    registerIndex = (hashes >> np.uint64(rankBits)).astype(np.intp)
+    rankValues = hashes & np.uint64((1 << rankBits) - 1)
+    ranks = rankBits - np.frexp(rankValues.astype('float64'))[1] + 1
+    np.maximum.at(registers, registerIndex, ranks.astype('uint8'))
+
+    return registers
+
+####################################################################################################################################################################################
+# Function: Get the number of distinct keys from HyperLogLog registers - estimate & relative standard error
+####################################################################################################################################################################################
+def getDistinctCount(registers: np.ndarray) -> tuple:
+
+    registerCount = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / registerCount)
+    estimate = alpha * registerCount ** 2 / np.sum(np.exp2(-registers.astype('float64')))
+
+    # Small counts: linear counting (number of empty registers)
+    emptyRegisters = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * registerCount and emptyRegisters > 0:
+        estimate = registerCount * math.log(registerCount / emptyRegisters)
+
+    return estimate, 1.04 / math.sqrt(registerCount)
+
+####################################################################################################################################################################################
+# Function: Get the sampled rows of each state in a chunk - the sketchReservoirSize rows with the smallest hash of their ID
+####################################################################################################################################################################################
+def getStateSamples(chunkDF: pd.DataFrame) -> pd.DataFrame:
+
+    samplesDF = pd.DataFrame({"State": chunkDF['State'].astype(str).to_numpy(),
+                              "Severity": chunkDF['Severity'].to_numpy(),
+                              "SampleKey": getKeyHashes(chunkDF['ID'].to_numpy(), 'ID')})
+
+    return getSmallestKeys(samplesDF)
+
+####################################################################################################################################################################################
+# Function: Merge 2 samples of rows by state - the rows with the smallest keys of both
+####################################################################################################################################################################################
+def mergeStateSamples(samplesDF: pd.DataFrame, partialSamplesDF: pd.DataFrame) -> pd.DataFrame:
+    return getSmallestKeys(pd.concat([samplesDF, partialSamplesDF], ignore_index=True))
+
+####################################################################################################################################################################################
+# Function: Keep the sketchReservoirSize rows with the smallest keys of each state
+####################################################################################################################################################################################
+def getSmallestKeys(samplesDF: pd.DataFrame) -> pd.DataFrame:
+
+    samplesDF = samplesDF.sort_values(['State', 'SampleKey'], kind='stable')
+    return samplesDF[samplesDF.groupby('State', sort=False).cumcount().to_numpy() < sketchReservoirSize].reset_index(drop=True)
+
+####################################################################################################################################################################################
+# Function: Get the memory used by the sketches (bytes) - fixed whatever the number of rows
+####################################################################################################################################################################################
+def getSketchesBytes(sketches: dict) -> int:
+
+    sketchesBytes = sum(table.nbytes for table in sketches['countMin'].values()) + sum(registers.nbytes for registers in sketches['distinct'].values())
+    sketchesBytes = sketchesBytes + sum(keys.nbytes for keys in sketches['keysSeen'].values())
+    sketchesBytes = sketchesBytes + sum(int(topKeys['counters'].memory_usage(deep=True).sum()) for topKeys in sketches['topKeys'].values())
+
+    return sketchesBytes + int(sketches['samples'].memory_usage(deep=True).sum())
+
+####################################################################################################################################################################################
+# Function: Get scaled estimates & bounds of counts (sampled input: scaled up & widened by the sampling error) - estimate, lower & upper bound
+####################################################################################################################################################################################
+def getScaledBounds(counts: np.ndarray, lowerCounts: np.ndarray, sampleFraction: float) -> pd.DataFrame:
+
+    counts = np.asarray(counts, dtype='float64')
+    samplingError = confidenceZ * np.sqrt(counts * (1 - sampleFraction)) / sampleFraction
+
+    return pd.DataFrame({"Estimate": np.round(counts / sampleFraction).astype('int64'),
+                         "Lower": np.round(np.maximum(0, np.asarray(lowerCounts) / sampleFraction - samplingError)).astype('int64'),
+                         "Upper": np.round(counts / sampleFraction + samplingError).astype('int64')})
+
+####################################################################################################################################################################################
+# Function: Get the counts of keys from a count-min sketch - estimate, lower & upper bound (keys without rows removed, except time keys)
+####################################################################################################################################################################################
+def getSketchKeyCounts(sketches: dict, dim: str, keys) -> pd.DataFrame:
+
+    counts = getCountMinCounts(sketches['countMin'][dim], keys, dim)
+    lowerCounts = np.maximum(0, counts - sketchErrorRate * sketches['rowsKept'])
+
+    keyCounts = getScaledBounds(counts, lowerCounts, sketches['sampleFraction'])
+    keyCounts.index = pd.Index(keys, name=dim)
+
+    return keyCounts if dim in timeKeysDict else keyCounts[counts > 0]
+
+####################################################################################################################################################################################
+# Function: Get the top keys from a Space-Saving summary - estimate, lower & upper bound (top drillDownTopN)
+####################################################################################################################################################################################
+def getSketchTopKeys(sketches: dict, dim: str) -> pd.DataFrame:
+
+    counters = sketches['topKeys'][dim]['counters'].iloc[:drillDownTopN]
+
+    topKeys = getScaledBounds(counters['Count'].to_numpy(), (counters['Count'] - counters['Error']).to_numpy(), sketches['sampleFraction'])
+    topKeys.index = counters.index
+
+    return topKeys
+
+####################################################################################################################################################################################
+# Function: Results of the approximate mode - counts, top keys & distinct counts with their bounds, average severity by state (sample) & sketches used
+####################################################################################################################################################################################
+def getPreviewResults(sketches: dict) -> dict:
+
+    previewResults = {}
+
+    # Counts by key (count-min) - of the keys seen, all time keys
+    for dim in countMinDimsList:
+        previewResults[dim] = getSketchKeyCounts(sketches, dim, sketches['keysSeen'][dim] if dim in keysSeenDimsList else timeKeysDict[dim])
+    previewResults['Weekday'].index = pd.Index([weekdayNamesList[d] for d in previewResults['Weekday'].index], name='Weekday')
+
+    # Top keys (Space-Saving)
+    for dim in topKeysDimsList:
+        previewResults[dim] = getSketchTopKeys(sketches, dim)
+
+    # Distinct counts (HyperLogLog) - of the rows read
+    distinctCounts = {dim: getDistinctCount(registers) for dim, registers in sketches['distinct'].items()}
+    previewResults['Distinct'] = pd.DataFrame({"Estimate": [round(estimate) for estimate, error in distinctCounts.values()],
+                                               "Lower": [round(estimate * (1 - confidenceZ * error)) for estimate, error in distinctCounts.values()],
+                                               "Upper": [round(estimate * (1 + confidenceZ * error)) for estimate, error in distinctCounts.values()]},
+                                              index=pd.Index(list(distinctCounts.keys()), name='Key'))
+
+    # Average severity by state from the sampled rows - 95% confidence interval
+    stateSeverity = sketches['samples'].groupby('State')['Severity'].agg(['count', 'mean', 'std'])
+    severityError = confidenceZ * stateSeverity['std'].fillna(0) / np.sqrt(stateSeverity['count'])
+    previewResults['State Severity'] = pd.DataFrame({"Sample Rows": stateSeverity['count'],
+                                                     "Avg Severity": stateSeverity['mean'].round(3),
+                                                     "Lower": (stateSeverity['mean'] - severityError).round(3),
+                                                     "Upper": (stateSeverity['mean'] + severityError).round(3)})
+
+    # Sketches used
+    width, depth = getCountMinShape()
+    previewResults['Sketches'] = pd.DataFrame({"Value": pd.array([sketches['rowsRead'], sketches['rowsKept'], round(sketches['sampleFraction'], 4), round(getSketchesBytes(sketches) / 1024, 1), width, depth], dtype=object)},
+                                              index=pd.Index(['Rows Read', 'Rows Kept', 'Sample Fraction', 'Sketches KB', 'Count-Min Width', 'Count-Min Depth'], name='Sketches'))
+
+    return previewResults
+
+
+####################################################################################################################################################################################
@@ -0,0 +1,201 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import pandas as pd
+import numpy as np
+import os
+import sys
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import datetime as dt
+
+# Import configurations
+from Configs import benchmarkFilePath
+from Configs import benchmarkSizesList
+from Configs import sketchSampleFraction
+
+# Import functions
+from UsAccidentsAnalysisFunctions import getInputData
+from UsAccidentsAnalysisFunctions import cleanInputData
+from UsAccidentsAnalysisFunctions import addDateColumns
+from UsAccidentsAnalysisFunctions import getAccidentsCube
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisFunctions import getStreamedCube
+from UsAccidentsAnalysisFunctions import analysisResultsDict
+from UsAccidentsAnalysisCache import writeJsonFile
+from UsAccidentsAnalysisPipeline import getPipelinedCube
+from UsAccidentsAnalysisBackends import getBackendCube
+from UsAccidentsAnalysisBackends import isBackendAvailable
+from UsAccidentsAnalysisBackends import isSameAccidentsCube
+from UsAccidentsAnalysisBackends import backendsDict
+from UsAccidentsAnalysisSketches import getFilesSketches
+from UsAccidentsAnalysisSketches import getPreviewResults
+from UsAccidentsAnalysisInstrumentation import measureStage
+from UsAccidentsDataGenerator import generateAccidentsFile
+from UsAccidentsDataGenerator import getGeneratedFile
+from UsAccidentsDataGenerator import getRowCount
+
+####################################################################################################################################################################################
+# Benchmark runner: each stage of the pipeline & each analysis (results & charts) timed & memory profiled on generated data files of several sizes
+####################################################################################################################################################################################
+
+# Each stage is measured (see UsAccidentsAnalysisInstrumentation) for: wall time, CPU time, rise of the peak RSS of the process (if the stage goes past the peak so far), rows in & out
+# Peak memory allocated in each stage (tracemalloc, includes numpy & pandas arrays) is measured in 1 more run - tracing slows down the stages
+# Results of a run are saved as a JSON file (1 per run, named by date & time) to compare runs over time
+# Dataframe backends (polars, pyarrow - if installed) are timed from the input file to the accidents cube & checked for parity: same cube as the pandas pipeline
+# Approximate mode (sketches) is timed on all rows & on the sample fraction of Configs (if < 1) - compared with the exact stages above
+
+# Sub paths of the charts (charts are plotted to a temp directory)
+chartSubPathsList = ['ByDay/', 'ByHour/', 'ByMonth/', 'ByMonth/ByHour/', 'ByState/', 'ByTimezone/', 'ByWeather/', 'ByCounty/', 'ByCity/', 'ByZipcode/']
+
+
+####################################################################################################################################################################################
+# Function: Run a stage & measure it (printed) - result of the stage & measures
+####################################################################################################################################################################################
+def benchmarkStage(stageName: str, stageFunction, *args) -> tuple:
+
+    result, measures = measureStage(stageName, stageFunction, *args)
+
+    if 'peakAllocatedMB' in measures:
+        print("Stage: {:<32} peak allocated: {:>9.1f} MB".format(stageName, measures['peakAllocatedMB']))
+    else:
+        print("Stage: {:<32} wall: {:>8.3f} sec, cpu: {:>8.3f} sec".format(stageName, measures['wallSec'], measures['cpuSec']))
+
+    return result, measures
+
+####################################################################################################################################################################################
+# Function: Benchmark the pipeline on 1 input file - measures of all stages
+####################################################################################################################################################################################
+def benchmarkInputFile(inputFile: str, plotCharts: bool = True, backends: list = None) -> list:
+
+    stagesMeasures = []
+
+    # Pipeline stages (in memory)
+    accidentsDataDF, measures = benchmarkStage('getInputData', getInputData, inputFile)
+    stagesMeasures.append(measures)
+    accidentsDataDF, measures = benchmarkStage('cleanInputData', cleanInputData, accidentsDataDF)
+    stagesMeasures.append(measures)
+    accidentsDataDF, measures = benchmarkStage('addDateColumns', addDateColumns, accidentsDataDF)
+    stagesMeasures.append(measures)
+    accidentsCube, measures = benchmarkStage('getAccidentsCube', getAccidentsCube, accidentsDataDF)
+    stagesMeasures.append(measures)
+    accidentsCube, measures = benchmarkStage('finalizeAccidentsCube', finalizeAccidentsCube, accidentsCube)
+    stagesMeasures.append(measures)
+    del accidentsDataDF
+
+    # Streaming mode (all stages, chunk by chunk)
+    streamedCube, measures = benchmarkStage('getStreamedCube', getStreamedCube, inputFile)
+    stagesMeasures.append(measures)
+    del streamedCube
+
+    # Pipelined mode (streaming with the stages overlapping) - same cube as streaming mode
+    pipelinedCube, measures = benchmarkStage('getPipelinedCube', getPipelinedCube, inputFile)
+    measures['sameCube'] = isSameAccidentsCube(pipelinedCube, accidentsCube)
+    stagesMeasures.append(measures)
+    del pipelinedCube
+
+    # Dataframe backends (from the input file to the accidents cube) - parity with the pandas pipeline
+    for backend in backends or []:
+        backendCube, measures = benchmarkStage('backend:' + backend, getBackendCube, inputFile, None, backend)
+        measures['sameCube'] = isSameAccidentsCube(finalizeAccidentsCube(backendCube), accidentsCube)
+        print("Backend: {:<30} same accidents cube as pandas: {}".format(backend, measures['sameCube']))
+        stagesMeasures.append(measures)
+        del backendCube
+
+    # Approximate mode (sketches of all rows, then of a sample of blocks of lines) - preview results from the last one
+    for sampleFraction in sorted({1.0, sketchSampleFraction}, reverse=True):
+        sketches, measures = benchmarkStage('getFilesSketches:{:g}'.format(sampleFraction), getFilesSketches, [inputFile], sampleFraction)
+        stagesMeasures.append(measures)
+
+    # Results of each analysis
+    analysisResults = {}
+    analysisResults['preview'], measures = benchmarkStage(getPreviewResults.__name__, getPreviewResults, sketches)
+    stagesMeasures.append(measures)
+    for analysisName, resultsFunction in analysisResultsDict.items():
+        analysisResults[analysisName], measures = benchmarkStage(resultsFunction.__name__, resultsFunction, accidentsCube)
+        stagesMeasures.append(measures)
+
+    # Charts of each analysis - plotted to a temp directory
+    if plotCharts:
+        import UsAccidentsAnalysisCharts
+        with tempfile.TemporaryDirectory() as chartsDir:
+            for chartSubPath in chartSubPathsList:
+                os.makedirs(os.path.join(chartsDir, chartSubPath), exist_ok=True)
+            UsAccidentsAnalysisCharts.outputFilePath = chartsDir + '/'
+
+            for analysisName, chartFunction in UsAccidentsAnalysisCharts.analysisFunctionsDict.items():
+                result, measures = benchmarkStage(chartFunction.__name__, chartFunction, analysisResults[analysisName])
+                stagesMeasures.append(measures)
+
+    return stagesMeasures
+
+####################################################################################################################################################################################
+# Function: Get the description of the environment of the run
+####################################################################################################################################################################################
+def getRunEnvironment() -> dict:
+
+    return {"date": dt.datetime.now().isoformat(timespec='seconds'),
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count()}
+
+
+####################################################################################################################################################################################
+# Main logic
+####################################################################################################################################################################################
+
+def main():
+
+    argParser = argparse.ArgumentParser(description="Benchmark the US Accidents analysis on generated data files")
+    argParser.add_argument('sizes', nargs='?', default=','.join(benchmarkSizesList), help="numbers of rows of the data files, comma separated (e.g. 100k,1M)")
+    argParser.add_argument('--seed', type=int, default=0, help="random seed of the generated data files")
+    argParser.add_argument('--repeat', type=int, default=1, help="number of runs of each size")
+    argParser.add_argument('--no-charts', action='store_true', help="do not benchmark the charts")
+    argParser.add_argument('--backends', default=','.join(backend for backend in backendsDict if backend != 'pandas' and isBackendAvailable(backend)), help="dataframe backends to compare with pandas, comma separated (default: the ones installed)")
+    argParser.add_argument('--no-memory', action='store_true', help="do not run the memory profiling run (tracemalloc)")
+    args = argParser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+    unknownBackends = [backend for backend in backends if backend not in backendsDict or not isBackendAvailable(backend)]
+    if len(unknownBackends) > 0:
+        argParser.error("unknown or not installed backends: " + ', '.join(unknownBackends))
+    benchmarkResults = {"environment": getRunEnvironment(), "seed": args.seed, "backends": backends, "sizes": {}}
+
+    for size in sizes:
+
+        # Generated data file (generated once per size & seed)
+        inputFile = getGeneratedFile(size, args.seed)
+        if not os.path.isfile(inputFile):
+            generateAccidentsFile(getRowCount(size), inputFile, args.seed)
+
+        # Timed runs
+        print("Benchmark: {} ({} rows)".format(inputFile, getRowCount(size)))
+        benchmarkResults['sizes'][size] = {"rows": getRowCount(size),
+                                           "fileSizeMB": round(os.path.getsize(inputFile) / (1024 * 1024), 2),
+                                           "runs": [benchmarkInputFile(inputFile, plotCharts=not args.no_charts, backends=backends) for run in range(args.repeat)]}
+
+        # Memory profiling run
+        if not args.no_memory:
+            print("Benchmark (memory): {} ({} rows)".format(inputFile, getRowCount(size)))
+            tracemalloc.start()
+            benchmarkResults['sizes'][size]['memoryRun'] = benchmarkInputFile(inputFile, plotCharts=not args.no_charts)
+            tracemalloc.stop()
+
+    # Save the results of the run
+    resultsFile = os.path.join(benchmarkFilePath, 'Results', 'benchmark_{}.json'.format(dt.datetime.now().strftime('%Y%m%d_%H%M%S')))
+    os.makedirs(os.path.dirname(resultsFile), exist_ok=True)
+    writeJsonFile(resultsFile, benchmarkResults)
+    print("Benchmark results saved: " + resultsFile)
+
+
+if __name__ == '__main__':
+    main()
+
+####################################################################################################################################################################################
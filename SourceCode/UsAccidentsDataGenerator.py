@@ -0,0 +1,216 @@
+####################################################################################################################################################################################
+# Import Dependencies:
+####################################################################################################################################################################################
+
+# Import Python Dependencies
+import pandas as pd
+import numpy as np
+import os
+import argparse
+import time
+
+# Import configurations & global data
+from Configs import statesPopulationDict
+from Configs import benchmarkFilePath
+
+####################################################################################################################################################################################
+# Synthetic US Accidents data generator: CSV files with the schema of the US_Accidents data set & similar distributions, for benchmarks
+####################################################################################################################################################################################
+
+# The data is generated in chunks of rows (memory stays bounded whatever the number of rows) -
+# - each chunk from its own random generator seeded with (seed, chunk number): the same seed & number of rows always give the same file
+
+# Columns of the US_Accidents data set (in order)
+accidentsColumnsList = ['ID', 'Source', 'TMC', 'Severity', 'Start_Time', 'End_Time', 'Start_Lat', 'Start_Lng', 'End_Lat', 'End_Lng', 'Distance(mi)', 'Description',
+                        'Number', 'Street', 'Side', 'City', 'County', 'State', 'Zipcode', 'Country', 'Timezone', 'Airport_Code', 'Weather_Timestamp', 'Temperature(F)',
+                        'Wind_Chill(F)', 'Humidity(%)', 'Pressure(in)', 'Visibility(mi)', 'Wind_Direction', 'Wind_Speed(mph)', 'Precipitation(in)', 'Weather_Condition',
+                        'Amenity', 'Bump', 'Crossing', 'Give_Way', 'Junction', 'No_Exit', 'Railway', 'Roundabout', 'Station', 'Stop', 'Traffic_Calming', 'Traffic_Signal',
+                        'Turning_Loop', 'Sunrise_Sunset', 'Civil_Twilight', 'Nautical_Twilight', 'Astronomical_Twilight']
+
+# Rows generated per chunk
+generatorChunkSize = 500000
+
+# Time zone of each state (main time zone of the state)
+stateTimezoneDict = {"AK" : "US/Pacific", "HI" : "US/Pacific", "CA" : "US/Pacific", "NV" : "US/Pacific", "OR" : "US/Pacific", "WA" : "US/Pacific",
+                     "AZ" : "US/Mountain", "CO" : "US/Mountain", "ID" : "US/Mountain", "MT" : "US/Mountain", "NM" : "US/Mountain", "UT" : "US/Mountain", "WY" : "US/Mountain",
+                     "AL" : "US/Central", "AR" : "US/Central", "IA" : "US/Central", "IL" : "US/Central", "KS" : "US/Central", "LA" : "US/Central", "MN" : "US/Central",
+                     "MO" : "US/Central", "MS" : "US/Central", "ND" : "US/Central", "NE" : "US/Central", "OK" : "US/Central", "SD" : "US/Central", "TN" : "US/Central",
+                     "TX" : "US/Central", "WI" : "US/Central"}
+
+# Severity mix (severity 0 - 4)
+severityProbabilitiesList = [0.0005, 0.0095, 0.67, 0.29, 0.03]
+
+# Weather conditions - most frequent first (frequencies follow a long tail)
+weatherConditionsList = ['Clear', 'Overcast', 'Mostly Cloudy', 'Partly Cloudy', 'Scattered Clouds', 'Light Rain', 'Haze', 'Rain', 'Light Snow', 'Fog', 'Heavy Rain',
+                         'Light Drizzle', 'Snow', 'Thunderstorms and Rain', 'Light Thunderstorms and Rain', 'Cloudy', 'Fair', 'Smoke', 'Drizzle', 'Mist',
+                         'Thunderstorm', 'Heavy Snow', 'Patches of Fog', 'Shallow Fog', 'Light Freezing Rain', 'Light Freezing Drizzle', 'Heavy Thunderstorms and Rain',
+                         'Blowing Snow', 'Light Ice Pellets', 'Widespread Dust', 'Squalls', 'Light Rain Showers', 'Rain Showers', 'Light Snow Showers', 'Freezing Rain',
+                         'Ice Pellets', 'Small Hail', 'Sand', 'Volcanic Ash', 'Funnel Cloud', 'Light Haze', 'Heavy Drizzle', 'Light Fog', 'Dust Whirls', 'Tornado',
+                         'Heavy Freezing Rain', 'Low Drifting Snow', 'Light Blowing Snow', 'Heavy Smoke', 'Hail']
+
+# Share of accidents by hour of the day (morning & evening rush hours) & by day of the week (Monday - Sunday)
+hourWeightsList = [1.5, 1.2, 1.0, 0.9, 1.1, 2.0, 4.5, 8.0, 8.5, 5.5, 4.5, 4.5, 4.8, 5.0, 5.5, 6.5, 7.5, 8.0, 6.0, 4.0, 3.0, 2.5, 2.2, 1.8]
+weekdayWeightsList = [1.0, 1.05, 1.05, 1.05, 1.1, 0.55, 0.45]
+
+# Years of the timestamps & growth of the number of accidents per year
+generatorYearFrom = 2016
+generatorYearTo = 2019
+yearlyGrowth = 1.25
+
+# Share of rows with no value (null) per column
+nullRatesDict = {"Weather_Condition" : 0.02, "Timezone" : 0.001, "Sunrise_Sunset" : 0.0001, "Zipcode" : 0.0003, "TMC" : 0.25, "End_Lat" : 0.7, "End_Lng" : 0.7,
+                 "Number" : 0.65, "Wind_Chill(F)" : 0.5, "Precipitation(in)" : 0.6}
+
+# Number of cities & counties per state (frequencies follow a long tail)
+citiesPerState = 300
+countiesPerState = 60
+
+
+####################################################################################################################################################################################
+# Function: Generate a synthetic data file
+####################################################################################################################################################################################
+def generateAccidentsFile(rowCount: int, outputFile: str, seed: int = 0):
+
+    startTime = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(outputFile)), exist_ok=True)
+
+    # Write to a temp file first & rename when complete
+    tempFile = outputFile + '.tmp'
+    for chunkNum, chunkStart in enumerate(range(0, rowCount, generatorChunkSize)):
+        chunkDF = getAccidentsChunk(chunkStart, min(generatorChunkSize, rowCount - chunkStart), np.random.default_rng([seed, chunkNum]))
+        chunkDF.to_csv(tempFile, mode='w' if chunkNum == 0 else 'a', header=chunkNum == 0, index=False)
+    os.replace(tempFile, outputFile)
+
+    print("Data file generated: {}, {} rows, time: {:.2f} sec".format(outputFile, rowCount, time.perf_counter() - startTime))
+
+####################################################################################################################################################################################
+# Function: Generate a chunk of rows
+####################################################################################################################################################################################
+def getAccidentsChunk(chunkStart: int, rowCount: int, rng: np.random.Generator) -> pd.DataFrame:
+
+    chunkDict = {}
+
+    # States (skewed: frequency grows faster than population) & their time zone
+    states = np.array(sorted(statesPopulationDict))
+    stateWeights = np.array([statesPopulationDict[state] for state in states], dtype='float64') ** 1.3
+    stateIndex = rng.choice(len(states), rowCount, p=stateWeights / stateWeights.sum())
+    stateValues = states[stateIndex]
+
+    # Timestamps: days weighted by year (growth) & day of the week, hours weighted by hour of the day
+    days = pd.date_range(str(generatorYearFrom), str(generatorYearTo + 1), freq='D', inclusive='left')
+    dayWeights = yearlyGrowth ** (days.year - generatorYearFrom).to_numpy() * np.array(weekdayWeightsList)[days.weekday]
+    startTime = (days[rng.choice(len(days), rowCount, p=dayWeights / dayWeights.sum())]
+                 + pd.to_timedelta(rng.choice(24, rowCount, p=np.array(hourWeightsList) / sum(hourWeightsList)), unit='h')
+                 + pd.to_timedelta(rng.integers(0, 3600, rowCount), unit='s'))
+    endTime = startTime + pd.to_timedelta(np.round(rng.lognormal(3.5, 0.8, rowCount) * 60), unit='s')
+
+    # Location (around a point of the state)
+    stateCenters = rng.uniform([25.0, -124.0], [48.0, -70.0], (len(states), 2))
+    startLat = np.round(stateCenters[stateIndex, 0] + rng.normal(0, 1.0, rowCount), 6)
+    startLng = np.round(stateCenters[stateIndex, 1] + rng.normal(0, 1.5, rowCount), 6)
+
+    chunkDict['ID'] = ['A-' + str(i) for i in range(chunkStart + 1, chunkStart + rowCount + 1)]
+    chunkDict['Source'] = rng.choice(['MapQuest', 'Bing', 'MapQuest-Bing'], rowCount, p=[0.7, 0.28, 0.02])
+    chunkDict['TMC'] = rng.choice([201.0, 241.0, 245.0, 229.0, 203.0], rowCount, p=[0.8, 0.1, 0.05, 0.03, 0.02])
+    chunkDict['Severity'] = rng.choice(5, rowCount, p=severityProbabilitiesList)
+    chunkDict['Start_Time'] = startTime.strftime('%Y-%m-%d %H:%M:%S')
+    chunkDict['End_Time'] = endTime.strftime('%Y-%m-%d %H:%M:%S')
+    chunkDict['Start_Lat'] = startLat
+    chunkDict['Start_Lng'] = startLng
+    chunkDict['End_Lat'] = np.round(startLat + rng.normal(0, 0.01, rowCount), 6)
+    chunkDict['End_Lng'] = np.round(startLng + rng.normal(0, 0.01, rowCount), 6)
+    chunkDict['Distance(mi)'] = np.round(rng.exponential(0.3, rowCount), 3)
+    chunkDict['Street'] = ['I-' + str(v) for v in rng.integers(1, 100, rowCount)]
+    chunkDict['Description'] = ['Accident on ' + street + '.' for street in chunkDict['Street']]
+    chunkDict['Number'] = rng.integers(1, 20000, rowCount).astype('float64')
+    chunkDict['Side'] = rng.choice(['R', 'L'], rowCount, p=[0.85, 0.15])
+    chunkDict['City'] = getLongTailNames(stateValues, 'City', citiesPerState, rng)
+    chunkDict['County'] = getLongTailNames(stateValues, 'County', countiesPerState, rng)
+    chunkDict['State'] = stateValues
+    chunkDict['Zipcode'] = rng.integers(10000, 99999, rowCount).astype(str)
+    chunkDict['Country'] = 'US'
+    chunkDict['Timezone'] = np.array([stateTimezoneDict.get(state, 'US/Eastern') for state in states])[stateIndex]
+    chunkDict['Airport_Code'] = np.char.add('K', states[stateIndex])
+    chunkDict['Weather_Timestamp'] = chunkDict['Start_Time']
+    chunkDict['Temperature(F)'] = np.round(rng.normal(60, 18, rowCount), 1)
+    chunkDict['Wind_Chill(F)'] = np.round(chunkDict['Temperature(F)'] - rng.exponential(3, rowCount), 1)
+    chunkDict['Humidity(%)'] = np.round(rng.uniform(10, 100, rowCount))
+    chunkDict['Pressure(in)'] = np.round(rng.normal(29.9, 0.3, rowCount), 2)
+    chunkDict['Visibility(mi)'] = np.round(np.minimum(rng.exponential(8, rowCount), 10), 1)
+    chunkDict['Wind_Direction'] = rng.choice(['Calm', 'N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW', 'Variable'], rowCount)
+    chunkDict['Wind_Speed(mph)'] = np.round(rng.exponential(7, rowCount), 1)
+    chunkDict['Precipitation(in)'] = np.round(rng.exponential(0.05, rowCount), 2)
+
+    # Weather conditions: long tail (Zipf like) frequencies
+    weatherWeights = 1.0 / np.arange(1, len(weatherConditionsList) + 1) ** 1.6
+    chunkDict['Weather_Condition'] = np.array(weatherConditionsList)[rng.choice(len(weatherConditionsList), rowCount, p=weatherWeights / weatherWeights.sum())]
+
+    # Road features (mostly False)
+    for col in accidentsColumnsList[accidentsColumnsList.index('Amenity'):accidentsColumnsList.index('Turning_Loop') + 1]:
+        chunkDict[col] = rng.random(rowCount) < (0.15 if col in ['Traffic_Signal', 'Junction', 'Crossing'] else 0.01)
+
+    # Day / Night (by hour of the day)
+    isDay = (startTime.hour >= 6) & (startTime.hour < 19)
+    for col in ['Sunrise_Sunset', 'Civil_Twilight', 'Nautical_Twilight', 'Astronomical_Twilight']:
+        chunkDict[col] = np.where(isDay, 'Day', 'Night')
+
+    chunkDF = pd.DataFrame(chunkDict, columns=accidentsColumnsList)
+
+    # Missing values
+    for col, nullRate in nullRatesDict.items():
+        chunkDF.loc[rng.random(rowCount) < nullRate, col] = np.nan
+
+    return chunkDF
+
+####################################################################################################################################################################################
+# Function: Get names (e.g. cities) within each state - a few frequent & many rare ones
+####################################################################################################################################################################################
+def getLongTailNames(stateValues: np.ndarray, kind: str, namesPerState: int, rng: np.random.Generator) -> np.ndarray:
+
+    nameWeights = 1.0 / np.arange(1, namesPerState + 1)
+    nameIndex = rng.choice(namesPerState, len(stateValues), p=nameWeights / nameWeights.sum())
+
+    return np.char.add(np.char.add(stateValues.astype(str), ' ' + kind + ' '), nameIndex.astype(str))
+
+####################################################################################################################################################################################
+# Function: Get the number of rows from a size (e.g. 100k, 1M, 5000000)
+####################################################################################################################################################################################
+def getRowCount(size: str) -> int:
+
+    multipliers = {"k": 1000, "m": 1000000}
+    size = size.strip().lower()
+    if size[-1] in multipliers:
+        return int(float(size[:-1]) * multipliers[size[-1]])
+    return int(size)
+
+####################################################################################################################################################################################
+# Function: Get the path of the generated data file of a size
+####################################################################################################################################################################################
+def getGeneratedFile(size: str, seed: int = 0) -> str:
+    return os.path.join(benchmarkFilePath, 'Data', 'US_Accidents_{}_seed{}.csv'.format(size, seed))
+
+
+####################################################################################################################################################################################
+# Main logic
+####################################################################################################################################################################################
+
+def main():
+
+    argParser = argparse.ArgumentParser(description="Generate synthetic US Accidents data files (US_Accidents schema) for benchmarks")
+    argParser.add_argument('sizes', nargs='?', default='100k', help="numbers of rows, comma separated (e.g. 100k,1M,5M,10M)")
+    argParser.add_argument('--seed', type=int, default=0, help="random seed (same seed & size = same file)")
+    argParser.add_argument('--output', help="output file (only with 1 size; default: " + getGeneratedFile('<size>') + ")")
+    args = argParser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    if args.output is not None and len(sizes) > 1:
+        argParser.error("--output can only be used with 1 size")
+
+    for size in sizes:
+        generateAccidentsFile(getRowCount(size), args.output or getGeneratedFile(size, args.seed), args.seed)
+
+
+if __name__ == '__main__':
+    main()
+
+####################################################################################################################################################################################
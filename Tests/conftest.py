@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are run from the SourceCode directory & import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'SourceCode'))
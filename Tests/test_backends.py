@@ -0,0 +1,56 @@
+####################################################################################################################################################################################
+# Tests of the dataframe backends (UsAccidentsAnalysisBackends): same accidents cube as the pandas pipeline
+####################################################################################################################################################################################
+
+import gzip
+import shutil
+import pytest
+
+import UsAccidentsAnalysisBackends
+
+from UsAccidentsAnalysisFunctions import finalizeAccidentsCube
+from UsAccidentsAnalysisFunctions import getCubeParts
+from UsAccidentsAnalysisBackends import getBackendCube
+from UsAccidentsAnalysisBackends import isBackendAvailable
+from UsAccidentsAnalysisBackends import isSameAccidentsCube
+from UsAccidentsAnalysisBackends import backendPackagesDict
+from UsAccidentsDataGenerator import generateAccidentsFile
+
+
+@pytest.fixture(scope='module')
+def inputFile(tmp_path_factory):
+
+    inputFile = str(tmp_path_factory.mktemp('Resources') / 'US_Accidents.csv')
+    generateAccidentsFile(20000, inputFile, seed=7)
+    return inputFile
+
+
+@pytest.mark.parametrize('backend', ['polars', 'pyarrow'])
+@pytest.mark.parametrize('analysisNames', [None, ['state', 'hour'], ['county', 'zipcode']])
+def test_backend_parity(inputFile, backend, analysisNames):
+
+    if not isBackendAvailable(backend):
+        pytest.skip("{} package not installed".format(backendPackagesDict[backend]))
+
+    cubeParts = getCubeParts(analysisNames) if analysisNames is not None else None
+    pandasCube = finalizeAccidentsCube(getBackendCube(inputFile, cubeParts, 'pandas'))
+    backendCube = finalizeAccidentsCube(getBackendCube(inputFile, cubeParts, backend))
+
+    assert isSameAccidentsCube(pandasCube, backendCube)
+
+
+def test_polars_compressed_batches_parity(inputFile, tmp_path, monkeypatch):
+
+    if not isBackendAvailable('polars'):
+        pytest.skip("polars package not installed")
+
+    # Compressed input read in several batches of lines
+    compressedFile = str(tmp_path / 'US_Accidents.csv.gz')
+    with open(inputFile, 'rb') as f, gzip.open(compressedFile, 'wb') as g:
+        shutil.copyfileobj(f, g)
+    monkeypatch.setattr(UsAccidentsAnalysisBackends, 'polarsBatchMB', 0.5)
+
+    pandasCube = finalizeAccidentsCube(getBackendCube(inputFile, None, 'pandas'))
+    polarsCube = finalizeAccidentsCube(getBackendCube(compressedFile, None, 'polars'))
+
+    assert isSameAccidentsCube(pandasCube, polarsCube)
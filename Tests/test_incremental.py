@@ -0,0 +1,95 @@
+####################################################################################################################################################################################
+# Tests of the incremental mode (UsAccidentsAnalysisIncremental)
+####################################################################################################################################################################################
+
+import os
+import fnmatch
+import pytest
+
+import UsAccidentsAnalysisIncremental
+from UsAccidentsAnalysisIncremental import getIncrementalCube
+from UsAccidentsAnalysisFunctions import getStreamedCube
+from UsAccidentsAnalysisBackends import isSameAccidentsCube
+from UsAccidentsDataGenerator import generateAccidentsFile
+
+
+@pytest.fixture
+def inputDir(tmp_path, monkeypatch):
+
+    # State & input files in a temp directory, input read in this process
+    stateDir = tmp_path / 'State'
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'stateFilePath', str(stateDir))
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'stateCubeFile', str(stateDir / 'cube.npz'))
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'stateManifestFile', str(stateDir / 'manifest.json'))
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'inputFilePath', str(tmp_path / 'Resources') + '/')
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'inputFileName', 'US_Accidents.csv')
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'incrementalInputPattern', str(tmp_path / 'Resources' / 'US_Accidents_*.csv'))
+    monkeypatch.setattr(UsAccidentsAnalysisIncremental, 'inputFileProcesses', 1)
+
+    os.makedirs(tmp_path / 'Resources')
+    return tmp_path / 'Resources'
+
+
+def test_append_to_file_cut_mid_line(inputDir, tmp_path):
+
+    fullFile = str(tmp_path / 'full.csv')
+    generateAccidentsFile(5000, fullFile, seed=1)
+    with open(fullFile, 'rb') as f:
+        fullBytes = f.read()
+
+    # Cut in the middle of a line (as a file still being written)
+    cutByte = len(fullBytes) // 2
+    while fullBytes[cutByte - 1:cutByte] == b'\n':
+        cutByte = cutByte + 1
+    inputFile = inputDir / 'US_Accidents.csv'
+    inputFile.write_bytes(fullBytes[:cutByte])
+
+    # First run: the complete lines only
+    completeFile = tmp_path / 'complete.csv'
+    completeFile.write_bytes(fullBytes[:fullBytes.rindex(b'\n', 0, cutByte) + 1])
+    assert isSameAccidentsCube(getIncrementalCube(), getStreamedCube(str(completeFile)))
+
+    # Rest of the file appended: same counts as the whole file read at once
+    with open(inputFile, 'ab') as f:
+        f.write(fullBytes[cutByte:])
+    assert isSameAccidentsCube(getIncrementalCube(), getStreamedCube(fullFile))
+
+
+def test_partial_line_only_is_not_read(inputDir, tmp_path):
+
+    fullFile = str(tmp_path / 'full.csv')
+    generateAccidentsFile(1000, fullFile, seed=2)
+    with open(fullFile, 'rb') as f:
+        fullBytes = f.read()
+
+    inputFile = inputDir / 'US_Accidents.csv'
+    inputFile.write_bytes(fullBytes)
+    getIncrementalCube()
+
+    # A partial line appended: nothing new to read
+    with open(inputFile, 'ab') as f:
+        f.write(fullBytes[fullBytes.index(b'\n') + 1:][:40])
+    assert isSameAccidentsCube(getIncrementalCube(), getStreamedCube(fullFile))
+
+
+def test_copy_of_input_file_is_skipped(inputDir, tmp_path):
+
+    inputFile = str(inputDir / 'US_Accidents.csv')
+    generateAccidentsFile(1000, inputFile, seed=3)
+    accidentsCube = getIncrementalCube()
+
+    # A monthly drop that is a copy of the input file: not counted again
+    with open(inputFile, 'rb') as f:
+        (inputDir / 'US_Accidents_2019_01.csv').write_bytes(f.read())
+    assert isSameAccidentsCube(getIncrementalCube(), accidentsCube)
+
+
+def test_default_pattern_does_not_match_input_file_copies():
+
+    from Configs import inputFileName
+    from Configs import incrementalInputPattern
+
+    dropPattern = os.path.basename(incrementalInputPattern)
+    assert not fnmatch.fnmatch(inputFileName, dropPattern)
+    assert not fnmatch.fnmatch(inputFileName + '.gz', dropPattern)
+    assert fnmatch.fnmatch(inputFileName.replace('.', '_2019_01.', 1), dropPattern)
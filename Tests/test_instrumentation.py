@@ -0,0 +1,45 @@
+####################################################################################################################################################################################
+# Tests of the instrumentation of the stages (UsAccidentsAnalysisInstrumentation)
+####################################################################################################################################################################################
+
+import tracemalloc
+import numpy as np
+import pytest
+
+from UsAccidentsAnalysisInstrumentation import measureStage
+from UsAccidentsAnalysisInstrumentation import runStage
+
+
+@pytest.fixture
+def tracing():
+
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def allocateMB(sizeMB: int) -> float:
+    return np.ones(sizeMB * 1024 * 1024 // 8).sum()
+
+
+def test_inner_stage_keeps_outer_peak(tracing):
+
+    # 50 MB allocated & freed, then an inner stage: the outer stage still has the 50 MB peak
+    def outerStage():
+        allocateMB(50)
+        return runStage('inner', allocateMB, 1)
+
+    assert measureStage('outer', outerStage)[1]['peakAllocatedMB'] >= 50
+
+
+def test_outer_stage_includes_inner_peak(tracing):
+
+    # 20 MB held while an inner stage allocates 30 MB
+    def outerStage():
+        heldArray = np.ones(20 * 1024 * 1024 // 8)
+        innerMeasures = measureStage('inner', allocateMB, 30)[1]
+        return heldArray.sum(), innerMeasures
+
+    (total, innerMeasures), outerMeasures = measureStage('outer', outerStage)
+    assert 30 <= innerMeasures['peakAllocatedMB'] < 40
+    assert outerMeasures['peakAllocatedMB'] >= 50